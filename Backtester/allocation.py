@@ -0,0 +1,234 @@
+"""
+Capital allocation between strategy sleeves (see Backtester.ensemble):
+    - EqualWeight: the same share for every sleeve
+    - InverseVolatility: shares proportional to 1 / volatility of each sleeve's returns
+    - RiskParity: shares for which every sleeve contributes the same risk (w_i * (C w)_i)
+      to the portfolio variance, from the full covariance matrix C, so correlated sleeves
+      share one risk budget instead of each getting their own
+Allocators get the covariance of the sleeve returns over their lookback from a
+RollingCovariance, which is updated incrementally: each rebalance adds the returns since
+the previous one and removes the ones that left the window, with block merges (matrix
+products over the changed rows only) instead of recomputing the window. Sleeves with no
+variance in the window (no position held) get no weight, unless no sleeve has any.
+"""
+
+import numpy as np
+
+# Removed rows after which RollingCovariance recomputes its moments from the window
+# (in multiples of the window), to drop the round-off the subtractions accumulate
+REFRESH_WINDOWS = 16
+
+# Variance (relative to the largest one) below which a sleeve counts as flat: what is left
+# of a zero variance after the incremental updates is round-off, not risk
+FLAT_VARIANCE = 1e-12
+
+
+def _moments(rows):
+    # (count, mean, co-moment matrix) of a block of rows
+    mean = rows.mean(axis=0)
+    centered = rows - mean
+    return len(rows), mean, centered.T @ centered
+
+
+class RollingCovariance:
+    def __init__(self, n_series, window):
+        """
+        Covariance of the last `window` rows of a (time x series) stream.
+        The rows in the window are kept in a ring buffer so they can be removed again.
+        Args:
+            n_series (int): number of series (columns).
+            window (int): rows in the window.
+        """
+        if window < 2:
+            raise ValueError("the covariance window needs at least 2 rows")
+        self.window = window
+        self.n = 0
+        self.mean = np.zeros(n_series)
+        self._m2 = np.zeros((n_series, n_series))
+        self._buffer = np.empty((window, n_series))
+        self._head = 0          # ring position of the oldest row
+        self._removed = 0       # rows removed since the last refresh
+
+    def update(self, rows):
+        """
+        Appends rows (shape (m, n_series)); rows older than the window drop out.
+        """
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, self._buffer.shape[1])
+        if len(rows) == 0:
+            return
+        if len(rows) >= self.window:
+            # the whole window is new: start over from its rows
+            self._buffer[:] = rows[-self.window:]
+            self._head = 0
+            self.n = self.window
+            _, self.mean, self._m2 = _moments(self._buffer)
+            self._removed = 0
+            return
+
+        self._add(*_moments(rows))
+        overflow = self.n - self.window
+        if overflow > 0:
+            old = self._buffer[(self._head + np.arange(overflow)) % self.window]
+            self._remove(*_moments(old))
+            self._head = (self._head + overflow) % self.window
+            self._removed += overflow
+        # write the new rows after the newest one
+        slots = (self._head + self.n - len(rows) + np.arange(len(rows))) % self.window
+        self._buffer[slots] = rows
+
+        if self._removed >= REFRESH_WINDOWS * self.window:
+            _, self.mean, self._m2 = _moments(self._buffer)
+            self._removed = 0
+
+    def _add(self, m, mean_b, m2_b):
+        # Chan et al. merge of a block into the window
+        n = self.n + m
+        delta = mean_b - self.mean
+        self._m2 += m2_b + np.outer(delta, delta) * (self.n * m / n)
+        self.mean = self.mean + delta * (m / n)
+        self.n = n
+
+    def _remove(self, m, mean_b, m2_b):
+        # the same merge solved for the rows that stay
+        n_a = self.n - m
+        mean_a = (self.n * self.mean - m * mean_b) / n_a
+        delta = mean_b - mean_a
+        self._m2 -= m2_b + np.outer(delta, delta) * (n_a * m / self.n)
+        self.mean = mean_a
+        self.n = n_a
+
+    @property
+    def ready(self):
+        # True once the window is full
+        return self.n >= self.window
+
+    def covariance(self, ddof=1):
+        # (n_series x n_series) sample covariance of the rows in the window
+        if self.n - ddof <= 0:
+            return np.full(self._m2.shape, np.nan)
+        return self._m2 / (self.n - ddof)
+
+
+class Allocator:
+    def __init__(self, lookback=60):
+        """
+        Args:
+            lookback (int): bars of sleeve returns in the covariance estimate (None: the
+                allocator doesn't use one). Until that many bars have passed, the ensemble
+                splits the capital equally.
+        """
+        self.lookback = lookback
+
+    def weights(self, cov):
+        """
+        Target weights (summing to 1) of the sleeves.
+        Args:
+            cov (np.ndarray): (sleeves x sleeves) covariance of the sleeve returns over the
+                lookback.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _equal(k):
+        return np.full(k, 1.0 / k)
+
+    @staticmethod
+    def _active(cov):
+        # sleeves with variance in the window (a sleeve that stayed flat has none)
+        var = np.diag(cov)
+        return var > FLAT_VARIANCE * max(var.max(), 0.0)
+
+
+class EqualWeight(Allocator):
+    def __init__(self, lookback=None):
+        # needs no covariance, so none is tracked
+        super().__init__(lookback)
+
+    def weights(self, cov):
+        return self._equal(len(cov))
+
+
+class InverseVolatility(Allocator):
+    def weights(self, cov):
+        active = self._active(cov)
+        if not active.any():
+            return self._equal(len(cov))
+        w = np.zeros(len(cov))
+        w[active] = 1.0 / np.sqrt(np.diag(cov)[active])
+        return w / w.sum()
+
+
+class RiskParity(Allocator):
+    def __init__(self, lookback=60, budgets=None, tol=1e-10, max_iter=100):
+        """
+        Equal risk contributions (or contributions proportional to `budgets`). The weights
+        are w = y / sum(y) for the minimum of  1/2 y'Cy - sum(b_i log y_i), which is convex
+        with one solution for any covariance; it is found with damped Newton steps (one
+        sleeves x sleeves solve each), starting from the previous rebalance's solution.
+        Args:
+            budgets (array-like): risk share per sleeve; default equal.
+            tol (float): stop when no weight moves by more than this (relative).
+            max_iter (int): Newton steps at most.
+        """
+        super().__init__(lookback)
+        self.budgets = budgets
+        self.tol = tol
+        self.max_iter = max_iter
+        self._last = None           # (active sleeves, y) of the previous call, to start from
+
+    def weights(self, cov):
+        active = self._active(cov)
+        if not active.any():
+            return self._equal(len(cov))
+        c = cov[np.ix_(active, active)]
+        # the weights don't depend on the scale of the covariance; unit scale keeps y ~ 1
+        c = c / np.diag(c).max()
+        b = np.ones(len(c)) if self.budgets is None else np.asarray(self.budgets, dtype=np.float64)[active]
+        b = b / b.sum()
+
+        def objective(y):
+            return 0.5 * y @ c @ y - b @ np.log(y)
+
+        if self._last is not None and np.array_equal(self._last[0], active):
+            y = self._last[1]           # rebalances are close together: the last solution is near
+        else:
+            y = b / np.sqrt(np.diag(c))  # start from inverse volatility
+        f = objective(y)
+        for _ in range(self.max_iter):
+            grad = c @ y - b / y
+            step = np.linalg.solve(c + np.diag(b / (y * y)), grad)
+            # halve the step until it stays positive and lowers the objective
+            t = 1.0
+            while True:
+                new = y - t * step
+                if (new > 0).all():
+                    f_new = objective(new)
+                    if f_new <= f:
+                        break
+                t *= 0.5
+                if t < 1e-12:
+                    new, f_new = y, f
+                    break
+            moved = np.abs(new - y).max() / new.min()
+            y, f = new, f_new
+            if moved < self.tol:
+                break
+        self._last = (active, y)
+
+        w = np.zeros(len(cov))
+        w[active] = y / y.sum()
+        return w
+
+
+def risk_contributions(weights, cov):
+    # share of the portfolio variance each sleeve contributes (sums to 1)
+    weights = np.asarray(weights, dtype=np.float64)
+    contrib = weights * (cov @ weights)
+    return contrib / contrib.sum()
+
+
+ALLOCATORS = {
+    'equal': EqualWeight,
+    'inverse_vol': InverseVolatility,
+    'risk_parity': RiskParity,
+}
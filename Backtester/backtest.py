@@ -15,43 +15,212 @@ except ModuleNotFoundError:
     if str(project_root) not in sys.path:
         sys.path.append(str(project_root))
     import Backtester.portfolio as portfolio
+import Backtester.vectorized as vectorized
+from Backtester.metrics import infer_periods_per_year
+from Backtester.profiling import NULL_PROFILER
+from Strategy.base import signal_array
+import numpy as np
+import pandas as pd
+
+ENGINES = ('loop', 'vectorized')
 
 class Backtest:
-    def __init__(self, data, strategy, ticker='EURUSD=X', initial_capital=100000, transaction_cost=0.001):
+    def __init__(self, data, strategy, ticker='EURUSD=X', initial_capital=100000, transaction_cost=0.001,
+                 engine='loop', signal_cache=None, profiler=None, execution=None, sizing=None,
+                 borrow_rate=0.0, margin_rate=0.0, min_trade_weight=0.01):
         """
         Runs a backtest for a given strategy and dataset.
         Args:
             data (pd.DataFrame): time series data (must include 'Close').
-            strategy (object): strategy instance with generate_signals(data).
+            strategy (object): strategy instance: a Strategy.base.SignalStrategy (signals from
+                NumPy price views), or any object with generate_signals(data, price_col).
+            ticker (str or list): one ticker, or a list of tickers traded together on a
+                shared cash balance (multi-asset mode, see MultiAssetPortfolio).
             initial_capital (float): starting portfolio value.
+            engine (str): 'loop' walks the bars one by one (reference engine),
+                'vectorized' resolves the same trades with NumPy array operations.
+            signal_cache (SignalCache): optional Strategy.cache.SignalCache; signals for the same
+                strategy parameters and prices are then reused instead of regenerated.
+            profiler (Profiler): optional Backtester.profiling.Profiler; times the signal,
+                bar loop and history phases.
+            execution (Broker): optional Backtester.execution.Broker. Signals then become
+                orders that fill on later bars against the ticker's Open/High/Low/Volume
+                columns (slippage, partial fills) instead of at the signal bar's close.
+            sizing (Sizer): optional Backtester.sizing sizer. Signals then become target weights
+                (-1 = short) and a TargetPortfolio rebalances to them every bar; works for one
+                ticker or a list.
+            borrow_rate, margin_rate (float): annual short borrow fee and margin loan interest
+                charged by the TargetPortfolio (sizing mode only), per bar at the bar
+                frequency of `data`.
+            min_trade_weight (float): in sizing mode, rebalancing trades smaller than this share
+                of equity are skipped (0.01 = 1%), so weights that drift a little don't trade
+                every bar.
         """
-
-        self.data = data.copy()
+        if engine not in ENGINES:
+            raise ValueError(f"engine must be one of {ENGINES}, got '{engine}'")
+        multi_asset = isinstance(ticker, (list, tuple))
+        if multi_asset and engine == 'vectorized':
+            raise ValueError("the vectorized engine supports a single ticker; use engine='loop' for a list")
+        if execution is not None and (multi_asset or engine != 'loop'):
+            raise ValueError("order execution needs engine='loop' and a single ticker")
+        if sizing is not None and (execution is not None or engine != 'loop'):
+            raise ValueError("position sizing needs engine='loop' and no order execution")
+
+        # read only: the signals live in self.signals, not in a column added to a copy
+        self.data = data
+        self.signals = None
         self.strategy = strategy
         self.ticker = ticker
-        self.portfolio = portfolio.Portfolio(initial_capital=initial_capital, transaction_cost=transaction_cost)
+        self.engine = engine
+        self.signal_cache = signal_cache
+        self.profiler = profiler or NULL_PROFILER
+        self.sizing = sizing
+        if sizing is not None:
+            self.portfolio = portfolio.TargetPortfolio(ticker if multi_asset else [ticker],
+                                                       initial_capital=initial_capital,
+                                                       transaction_cost=transaction_cost,
+                                                       borrow_rate=borrow_rate, margin_rate=margin_rate,
+                                                       min_trade_weight=min_trade_weight,
+                                                       periods_per_year=infer_periods_per_year(data.index))
+        elif multi_asset:
+            self.portfolio = portfolio.MultiAssetPortfolio(ticker, initial_capital=initial_capital,
+                                                           transaction_cost=transaction_cost)
+        else:
+            self.portfolio = portfolio.Portfolio(initial_capital=initial_capital, transaction_cost=transaction_cost)
+        self.execution = execution.attach(self.portfolio) if execution is not None else None
         self.results = None
 
     def run(self):
+        if self.sizing is not None:
+            return self._run_targets()
+        if isinstance(self.portfolio, portfolio.MultiAssetPortfolio):
+            return self._run_multi_asset()
 
         price_col = f'{self.ticker}.Close'
 
-        df_signals = self.strategy.generate_signals(
-            self.data,
-            price_col=price_col
-        )
-        self.data['Signal'] = df_signals[f"{price_col}_Signal"]
+        with self.profiler.phase('backtest.signals'):
+            self.signals = self._generate_signals(price_col)
+
+        if self.engine == 'vectorized':
+            return self._run_vectorized(price_col)
+        if self.execution is not None:
+            return self._run_orders(price_col)
 
-        for date, row in self.data.iterrows():
-            price = row[price_col]
-            signal = row['Signal']
+        self.portfolio.reserve(len(self.data))
+        with self.profiler.phase('backtest.bar_loop', items=len(self.data)):
+            for (date, row), signal in zip(self.data.iterrows(), self.signals):
+                price = row[price_col]
 
-            self.portfolio.update_positions(date, self.ticker, signal, price)
+                self.portfolio.update_positions(date, self.ticker, signal, price)
+
+                # current_prices = {self.ticker: price}
+                self.portfolio.record_daily_value(date, {self.ticker: price})
+
+        with self.profiler.phase('backtest.history'):
+            self.results = self.portfolio.get_history()
+        return self.results
 
-            # current_prices = {self.ticker: price}
-            self.portfolio.record_daily_value(date, {self.ticker: price})
+    def _generate_signals(self, price_col):
+        # Signal values for one price column (1-D) or a list of them (2-D, one column each),
+        # served from the signal cache when one is set
+        def compute():
+            return signal_array(self.strategy, self.data, price_col)
+
+        if self.signal_cache is None:
+            return compute()
+        return self.signal_cache.get_or_compute(self.strategy, self.data, price_col, compute)
+
+    def _run_vectorized(self, price_col):
+        # Same trades as the loop above, resolved over whole arrays
+        pf = self.portfolio
+        with self.profiler.phase('backtest.bar_loop', items=len(self.data)):
+            sim = vectorized.simulate(
+                self.data[price_col].to_numpy(dtype=float),
+                self.signals,
+                initial_capital=pf.initial_capital,
+                transaction_cost=pf.transaction_cost,
+            )
+
+        with self.profiler.phase('backtest.record'):
+            dates = self.data.index
+            pf.record_trades(dates, self.ticker, sim.trades)
+            pf.record_history(dates, sim.total_value)
+
+        # leave the portfolio in the same end state as the loop would
+        if sim.trades:
+            pf.cash = sim.trades[-1][5]
+        if len(sim.units) and sim.units[-1] > 0:
+            pf.positions[self.ticker] = int(sim.units[-1])
+
+        with self.profiler.phase('backtest.history'):
+            self.results = pf.get_history()
+        return self.results
+
+    def _run_orders(self, price_col):
+        # Signals go to the broker as orders; each bar first fills the orders placed before it,
+        # then places the orders of its own signal
+        broker = self.execution
+        close = self.data[price_col].to_numpy(dtype=float)
+
+        def column(field, default):
+            col = f'{self.ticker}.{field}'
+            return self.data[col].to_numpy(dtype=float) if col in self.data else default
+
+        # without OHLC columns every bar is a single price
+        open_, high, low = column('Open', close), column('High', close), column('Low', close)
+        volume = np.nan_to_num(column('Volume', np.zeros(len(close))), nan=0.0)
+        signals = self.signals
+
+        self.portfolio.reserve(len(self.data))
+        with self.profiler.phase('backtest.bar_loop', items=len(self.data)):
+            for t, date in enumerate(self.data.index):
+                broker.process_bar(date, self.ticker, open_[t], high[t], low[t], volume[t])
+                broker.on_signal(date, self.ticker, signals[t], close[t])
+                self.portfolio.record_daily_value(date, {self.ticker: close[t]})
+
+        with self.profiler.phase('backtest.history'):
+            self.results = self.portfolio.get_history()
+        return self.results
+
+    def _run_multi_asset(self):
+        # One signal and one price per asset id on every bar; the portfolio works on whole arrays
+        price_cols = [f'{t}.Close' for t in self.portfolio.tickers]
+        prices = self.data[price_cols].to_numpy(dtype=float)
+        with self.profiler.phase('backtest.signals'):
+            signals = np.asarray(self._generate_signals(price_cols), dtype=float)
+        # mark to market on the last known price; assets never priced yet can't be held
+        marks = np.nan_to_num(pd.DataFrame(prices).ffill().to_numpy(), nan=0.0)
+
+        self.portfolio.reserve(len(self.data))
+        with self.profiler.phase('backtest.bar_loop', items=len(self.data)):
+            for t, date in enumerate(self.data.index):
+                self.portfolio.update_positions(date, signals[t], prices[t])
+                self.portfolio.record_daily_value(date, marks[t])
+
+        with self.profiler.phase('backtest.history'):
+            self.results = self.portfolio.get_history()
+        return self.results
 
-        self.results = self.portfolio.get_history()
+    def _run_targets(self):
+        # Signals -> target weights for every bar at once; each bar is then one vectorized
+        # rebalance of the whole book plus a financing charge
+        pf = self.portfolio
+        price_cols = [f'{t}.Close' for t in pf.tickers]
+        prices = self.data[price_cols].to_numpy(dtype=float)
+        with self.profiler.phase('backtest.signals'):
+            signals = self._generate_signals(price_cols if len(price_cols) > 1 else price_cols[0])
+            weights = self.sizing.weights(signals, prices)
+        marks = np.nan_to_num(pd.DataFrame(prices).ffill().to_numpy(), nan=0.0)
+
+        pf.reserve(len(self.data))
+        with self.profiler.phase('backtest.bar_loop', items=len(self.data)):
+            for t, date in enumerate(self.data.index):
+                pf.rebalance(date, weights[t], prices[t], marks[t])
+                pf.accrue(date, marks[t])
+                pf.record_daily_value(date, marks[t])
+
+        with self.profiler.phase('backtest.history'):
+            self.results = pf.get_history()
         return self.results
 
     def summary(self):
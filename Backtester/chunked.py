@@ -0,0 +1,157 @@
+"""
+Out-of-core backtests for data that doesn't fit in memory:
+    - the date range is streamed from the columnar store (Data.store.ColumnStore) in blocks
+      of chunk_rows bars; only the ticker's price column is read
+    - each block is run together with the last `strategy.warmup` bars before it, the history
+      its rolling indicators need, so its signals are the ones a run over the whole range
+      would give; the overlap bars themselves are not traded again (a block's rolling sums
+      start at its overlap, so they can differ from the full run's in the last bits; the
+      strategies decide ties with Strategy.indicators.exceeds, which absorbs that)
+    - the trades come from the vectorized engine (Backtester.vectorized.simulate), started
+      from the cash and units the previous block ended with
+    - the equity curve and the trade log are appended to CSV files block by block, and the
+      metrics are accumulated in a StreamingMetrics
+Peak memory therefore depends on chunk_rows and the warmup, not on the number of bars.
+The output files have the layout of a normal run (results_timeseries.csv, trade_log.csv),
+so `python main.py report` can plot them afterwards.
+
+Strategies must say how much history a signal depends on with a `warmup` property; ones
+whose signals depend on the whole path (warmup None or missing, e.g. mean reversion with
+exit='mean') can't be split into blocks and are rejected.
+"""
+import os
+
+try:
+    import Backtester.portfolio as portfolio
+except ModuleNotFoundError:
+    # Allow running this file directly by adding the project root to sys.path
+    import sys
+    from pathlib import Path
+    project_root = Path(__file__).resolve().parents[1]
+    if str(project_root) not in sys.path:
+        sys.path.append(str(project_root))
+    import Backtester.portfolio as portfolio
+import Backtester.vectorized as vectorized
+from Backtester.metrics import StreamingMetrics, infer_periods_per_year
+from Backtester.profiling import NULL_PROFILER
+from Strategy.base import signal_array
+
+# Bars per block when none is given
+CHUNK_ROWS = 1_000_000
+
+# Column order of the trade log (a full run's order: its first trade is always a buy)
+TRADE_COLUMNS = ['Date', 'Ticker', 'Signal', 'Units', 'Price', 'Cost', 'Remaining', 'Revenue']
+
+
+class ChunkedResult:
+    """
+    Output of ChunkedBacktest.run().
+        - metrics: StreamingMetrics over the whole equity curve
+        - cash, units: portfolio state after the last bar
+        - bars, trades: number of bars and trades
+        - results_path, trades_path: the CSV files written
+    """
+
+    def __init__(self, metrics, cash, units, bars, trades, results_path, trades_path):
+        self.metrics = metrics
+        self.cash = cash
+        self.units = units
+        self.bars = bars
+        self.trades = trades
+        self.results_path = results_path
+        self.trades_path = trades_path
+
+
+class ChunkedBacktest:
+    def __init__(self, store, strategy, ticker='EURUSD=X', initial_capital=100000, transaction_cost=0.001,
+                 chunk_rows=CHUNK_ROWS, start=None, end=None, profiler=None):
+        """
+        Runs a single-ticker backtest block by block.
+        Args:
+            store (ColumnStore): columnar store with the '<ticker>.Close' column.
+            strategy (object): strategy (see Strategy.base.signal_array) with a `warmup`
+                property (bars of history a signal depends on).
+            ticker (str): ticker traded.
+            initial_capital (float): starting portfolio value.
+            transaction_cost (float): cost per trade (e.g., 0.001 = 0.1%)
+            chunk_rows (int): new bars per block.
+            start, end (str): inclusive date range, as in ColumnStore.load().
+            profiler (Profiler): optional Backtester.profiling.Profiler.
+        """
+        warmup = getattr(strategy, 'warmup', None)
+        if warmup is None:
+            raise ValueError(f"{type(strategy).__name__} has no finite warmup (its signals depend on the "
+                             f"whole history), so it can't be run in chunks")
+        if chunk_rows <= 0:
+            raise ValueError("chunk_rows must be positive")
+        self.store = store
+        self.strategy = strategy
+        self.ticker = ticker
+        self.price_col = f'{ticker}.Close'
+        self.warmup = int(warmup)
+        self.chunk_rows = chunk_rows
+        self.start = start
+        self.end = end
+        self.profiler = profiler or NULL_PROFILER
+        # cash and positions carry the state from one block to the next
+        self.portfolio = portfolio.Portfolio(initial_capital=initial_capital, transaction_cost=transaction_cost)
+
+    def run(self, results_path, trades_path):
+        """
+        Streams the whole date range.
+        Args:
+            results_path (str): CSV of the equity curve (Date, TotalValue), overwritten.
+            trades_path (str): CSV of the trades, overwritten.
+        Returns:
+            ChunkedResult
+        """
+        for path in (results_path, trades_path):
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        pf = self.portfolio
+        metrics = None
+        bars = trades = 0
+
+        with open(results_path, 'w', newline='') as results_file, open(trades_path, 'w', newline='') as trades_file:
+            chunks = self.store.iter_chunks([self.price_col], self.chunk_rows, start=self.start, end=self.end,
+                                            overlap=self.warmup)
+            for frame, new in chunks:
+                with self.profiler.phase('chunked.signals', items=len(frame)):
+                    signals = signal_array(self.strategy, frame, self.price_col)[-new:]
+                block = frame.iloc[-new:]
+                dates = block.index
+
+                with self.profiler.phase('chunked.simulate', items=new):
+                    sim = vectorized.simulate(block[self.price_col].to_numpy(dtype=float), signals,
+                                              initial_capital=pf.cash, transaction_cost=pf.transaction_cost,
+                                              initial_units=pf.positions.get(self.ticker, 0))
+                # carry the end state into the next block
+                if sim.trades:
+                    pf.cash = sim.trades[-1][5]
+                if sim.units[-1] > 0:
+                    pf.positions[self.ticker] = int(sim.units[-1])
+                else:
+                    pf.positions.pop(self.ticker, None)
+
+                with self.profiler.phase('chunked.write', items=new):
+                    pf.history.clear()
+                    pf.trades.clear()
+                    pf.record_history(dates, sim.total_value)
+                    pf.record_trades(dates, self.ticker, sim.trades)
+                    pf.get_history().to_csv(results_file, header=bars == 0)
+                    if sim.trades:
+                        pf.get_trade_log().reindex(columns=TRADE_COLUMNS).to_csv(trades_file, header=trades == 0, index=False)
+
+                if metrics is None:
+                    # annualization from the bar spacing of the first block
+                    metrics = StreamingMetrics(periods_per_year=infer_periods_per_year(dates))
+                metrics.update_many(sim.total_value, dates)
+                bars += new
+                trades += len(sim.trades)
+
+            if bars == 0:
+                results_file.write('Date,TotalValue\n')
+            if trades == 0:
+                trades_file.write(','.join(TRADE_COLUMNS) + '\n')
+
+        return ChunkedResult(metrics or StreamingMetrics(), pf.cash, pf.positions.get(self.ticker, 0),
+                             bars, trades, results_path, trades_path)
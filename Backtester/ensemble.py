@@ -0,0 +1,254 @@
+"""
+Multi-strategy ensembles:
+    - several sleeves (a strategy on a ticker, e.g. moving average, momentum and mean
+      reversion on EURUSD) run over one loaded frame; the price column of each ticker is
+      read once and the sleeves of the same strategy class get their signals from one
+      batched indicator pass (the strategy's generate_signal_grid, as in the sweeps)
+    - every sleeve trades its own sub-account with the vectorized engine, which gives the
+      return stream of the sleeve
+    - an allocator (Backtester.allocation) splits the capital between the sleeves: equal
+      weights, inverse volatility or risk parity over the covariance of the sleeve returns
+    - the capital is rebalanced to the target weights on a schedule (every N bars or at
+      the end of every pandas period such as 'W' or 'ME'); in between, each sleeve's share
+      drifts with its returns
+    - the covariance is updated incrementally between rebalances (RollingCovariance), so
+      a rebalance costs O(new bars x sleeves^2), not a recomputation of the window
+The ensemble equity has the layout of a normal run (Date index, 'TotalValue'), so the
+reports work on it unchanged.
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    import Backtester.vectorized as vectorized
+except ModuleNotFoundError:
+    # Allow running this file directly by adding the project root to sys.path
+    import sys
+    from pathlib import Path
+    project_root = Path(__file__).resolve().parents[1]
+    if str(project_root) not in sys.path:
+        sys.path.append(str(project_root))
+    import Backtester.vectorized as vectorized
+from Backtester.allocation import ALLOCATORS, RiskParity, RollingCovariance
+from Backtester.metrics import StreamingMetrics, infer_periods_per_year
+from Backtester.profiling import NULL_PROFILER
+from Data.resample import Resampler
+from Strategy.base import signal_array
+from Strategy.cache import strategy_params
+
+
+class Sleeve:
+    def __init__(self, strategy, ticker='EURUSD=X', name=None):
+        """
+        One strategy trading one ticker inside an ensemble.
+        Args:
+            strategy (object): strategy (see Strategy.base.signal_array).
+            ticker (str): ticker traded, matching the '<ticker>.Close' column.
+            name (str): column name in the outputs; defaults to the strategy class with
+                its parameters (and the ticker when the ensemble trades several).
+        """
+        self.strategy = strategy
+        self.ticker = ticker
+        self.price_col = f'{ticker}.Close'
+        self.name = name
+
+    def default_name(self, with_ticker=False):
+        params = ','.join(f'{k}={v}' for k, v in strategy_params(self.strategy).items())
+        name = f'{type(self.strategy).__name__}({params})'
+        return f'{name}@{self.ticker}' if with_ticker else name
+
+
+class EnsembleResult:
+    """
+    Output of Ensemble.run().
+        - equity: DataFrame with the ensemble 'TotalValue' (same shape as Backtest.run output)
+        - sleeves: each sleeve's own equity curve (one column per sleeve, every sleeve
+          started with the full initial capital)
+        - holdings: capital held in each sleeve on every bar
+        - weights: target weights set at each rebalance (indexed by the bar they were set on)
+        - turnover: traded share of the capital at each rebalance
+    """
+
+    def __init__(self, equity, sleeves, holdings, weights, turnover):
+        self.equity = equity
+        self.sleeves = sleeves
+        self.holdings = holdings
+        self.weights = weights
+        self.turnover = turnover
+
+    def summary(self):
+        # compute_all_metrics() of the ensemble and of every sleeve on its own, one row each
+        per_year = infer_periods_per_year(self.equity.index)
+        curves = {'Ensemble': self.equity['TotalValue'], **{name: self.sleeves[name] for name in self.sleeves}}
+        rows = {name: StreamingMetrics.from_values(values.to_numpy(dtype=np.float64),
+                                                   periods_per_year=per_year).compute_all_metrics()
+                for name, values in curves.items()}
+        return pd.DataFrame.from_dict(rows, orient='index').rename_axis('Run')
+
+
+def rebalance_bars(index, rebalance):
+    """
+    Bars at whose close the weights are reset: bar 0 (the starting allocation) plus the
+    last bar of every `rebalance` period (an int number of bars or a pandas offset such as
+    'W' or 'ME'); None never rebalances after the start. The last bar is never included.
+    """
+    n = len(index)
+    if rebalance is None or n < 2:
+        ends = np.empty(0, dtype=np.int64)
+    elif isinstance(rebalance, (int, np.integer)):
+        if rebalance <= 0:
+            raise ValueError("rebalance must be a positive number of bars")
+        ends = np.arange(rebalance, n, rebalance) - 1
+    else:
+        ends = Resampler(index, rebalance).starts[1:] - 1
+    return np.unique(np.concatenate([[0], ends[ends < n - 1]])).astype(np.int64)
+
+
+class Ensemble:
+    def __init__(self, sleeves, allocator=None, rebalance='ME', initial_capital=100000, transaction_cost=0.001,
+                 rebalance_cost=0.0, profiler=None):
+        """
+        Runs several sleeves on one portfolio and allocates the capital between them.
+        Args:
+            sleeves (list): Sleeve objects (plain strategies become sleeves on 'EURUSD=X').
+            allocator (Allocator or str): one of Backtester.allocation.ALLOCATORS or an
+                instance; default risk parity over 60 bars.
+            rebalance (int or str): rebalance every N bars, or at the end of every pandas
+                period (e.g. 'W', 'ME', 'QE'); None keeps the starting weights.
+            initial_capital (float): starting portfolio value.
+            transaction_cost (float): cost per trade inside every sleeve (e.g., 0.001 = 0.1%)
+            rebalance_cost (float): cost of moving capital between sleeves, per unit of
+                turnover (0.001 = 0.1% of the capital moved).
+            profiler (Profiler): optional Backtester.profiling.Profiler.
+        """
+        sleeves = [s if isinstance(s, Sleeve) else Sleeve(s) for s in sleeves]
+        if not sleeves:
+            raise ValueError("an ensemble needs at least one sleeve")
+        with_ticker = len({s.ticker for s in sleeves}) > 1
+        for s in sleeves:
+            s.name = s.name or s.default_name(with_ticker)
+        names = [s.name for s in sleeves]
+        if len(set(names)) != len(names):
+            raise ValueError(f"sleeve names must be unique, got {names}")
+
+        if allocator is None:
+            allocator = RiskParity()
+        elif isinstance(allocator, str):
+            if allocator not in ALLOCATORS:
+                raise ValueError(f"allocator must be one of {list(ALLOCATORS)}, got '{allocator}'")
+            allocator = ALLOCATORS[allocator]()
+
+        self.sleeves = sleeves
+        self.allocator = allocator
+        self.rebalance = rebalance
+        self.initial_capital = initial_capital
+        self.transaction_cost = transaction_cost
+        self.rebalance_cost = rebalance_cost
+        self.profiler = profiler or NULL_PROFILER
+
+    def _signals(self, data):
+        # One int8 signal row per sleeve. Sleeves of a class with generate_signal_grid share
+        # one batched pass per ticker over the union of their parameter values.
+        signals = [None] * len(self.sleeves)
+        groups = {}
+        for i, sleeve in enumerate(self.sleeves):
+            if hasattr(type(sleeve.strategy), 'generate_signal_grid'):
+                groups.setdefault((type(sleeve.strategy), sleeve.price_col), []).append(i)
+            else:
+                signals[i] = signal_array(sleeve.strategy, data, sleeve.price_col)
+
+        for (cls, price_col), members in groups.items():
+            params = [strategy_params(self.sleeves[i].strategy) for i in members]
+            grid = {name: list(dict.fromkeys(p[name] for p in params)) for name in params[0]}
+            combos, grid_signals = cls.generate_signal_grid(data, price_col, grid)
+            row_of = {tuple(sorted(p.items())): row for row, p in enumerate(combos)}
+            for i, p in zip(members, params):
+                row = row_of.get(tuple(sorted(p.items())))
+                # parameters the batched path doesn't know about: the strategy's own signals
+                signals[i] = grid_signals[row] if row is not None else \
+                    signal_array(self.sleeves[i].strategy, data, price_col)
+        return signals
+
+    def run(self, data):
+        """
+        Args:
+            data (pd.DataFrame): frame with the '<ticker>.Close' column of every sleeve.
+        Returns:
+            EnsembleResult
+        """
+        price_cols = list(dict.fromkeys(s.price_col for s in self.sleeves))
+        for col in price_cols:
+            if col not in data.columns:
+                raise ValueError(f"Column '{col}' not found in dataframe")
+        n, k = len(data), len(self.sleeves)
+        names = [s.name for s in self.sleeves]
+
+        with self.profiler.phase('ensemble.signals', items=n * k):
+            signals = self._signals(data)
+
+        # each sleeve on its own sub-account with the full capital; only its returns are used
+        with self.profiler.phase('ensemble.simulate', items=n * k):
+            prices = {col: data[col].to_numpy(dtype=np.float64) for col in price_cols}
+            curves = np.empty((n, k))
+            for j, sleeve in enumerate(self.sleeves):
+                curves[:, j] = vectorized.simulate(prices[sleeve.price_col], signals[j],
+                                                   initial_capital=self.initial_capital,
+                                                   transaction_cost=self.transaction_cost).total_value
+            returns = np.zeros((n, k))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                returns[1:] = curves[1:] / curves[:-1] - 1.0
+            # bars without a valid value (missing prices) count as flat
+            returns[~np.isfinite(returns)] = 0.0
+
+        with self.profiler.phase('ensemble.allocate', items=n * k):
+            values, holdings, points, weights, turnover = self._allocate(returns, data.index)
+
+        index = data.index
+        return EnsembleResult(
+            equity=pd.DataFrame({'TotalValue': values}, index=index),
+            sleeves=pd.DataFrame(curves, index=index, columns=names),
+            holdings=pd.DataFrame(holdings, index=index, columns=names),
+            weights=pd.DataFrame(weights, index=index[points], columns=names),
+            turnover=pd.Series(turnover, index=index[points], name='Turnover'),
+        )
+
+    def _allocate(self, returns, index):
+        # Walks the rebalance bars: target weights from the covariance of the returns so far,
+        # then the holdings drift with the sleeve returns until the next rebalance.
+        n, k = returns.shape
+        values = np.empty(n)
+        holdings = np.empty((n, k))
+        points = rebalance_bars(index, self.rebalance)
+        weights = np.empty((len(points), k))
+        turnover = np.empty(len(points))
+        if n == 0:
+            return values, holdings, points, weights, turnover
+
+        lookback = self.allocator.lookback
+        cov = RollingCovariance(k, lookback) if lookback else None
+        seen = 0                                # returns up to this bar are in the covariance
+        values[0] = self.initial_capital
+        holdings[0] = 0.0                       # all cash before the starting allocation
+
+        ends = np.append(points[1:], n - 1)
+        for j, (bar, end) in enumerate(zip(points, ends)):
+            if cov is not None:
+                cov.update(returns[seen + 1:bar + 1])
+                seen = bar
+            target = self.allocator.weights(cov.covariance()) if cov is not None and cov.ready \
+                else np.full(k, 1.0 / k)
+
+            value = values[bar]
+            # the starting allocation only funds the sleeves, so it has no cost
+            turnover[j] = np.abs(target - holdings[bar] / value).sum() if bar > 0 and value else 0.0
+            value *= 1.0 - self.rebalance_cost * turnover[j]
+            weights[j] = target
+            holdings[bar] = target * value
+            values[bar] = value
+
+            # every sleeve's capital grows with its own returns until the next rebalance
+            growth = np.cumprod(1.0 + returns[bar + 1:end + 1], axis=0)
+            holdings[bar + 1:end + 1] = holdings[bar] * growth
+            values[bar + 1:end + 1] = holdings[bar + 1:end + 1].sum(axis=1)
+        return values, holdings, points, weights, turnover
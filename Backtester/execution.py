@@ -0,0 +1,441 @@
+"""
+Order execution between the strategy signals and the Portfolio:
+    - market, limit and stop orders that rest until filled, cancelled or expired
+    - orders placed on a bar are matched against the following bars (a signal computed
+      from a close can't trade at that same close): market orders fill at the next open,
+      limits and stops when the bar's high/low reaches their price (at the open if it gaps)
+    - slippage models: fixed basis points, or a share of the bar's high-low range that
+      grows with the order's share of the bar volume
+    - partial fills: with max_participation an order takes at most that share of a bar's
+      volume and the rest keeps resting; the part of a buy the cash can't cover is
+      cancelled (as a broker rejects it for insufficient funds)
+    - resting limits and stops live in heaps per ticker and side, keyed by their price,
+      so a bar only touches the orders it fills (O(log n) each) and never scans the book
+
+Broker.on_signal() turns the +1/-1/0 signals of the strategies into orders with the
+same position rules as Portfolio.update_positions (+1 buys with all the cash, -1 closes
+the position). Orders can also be placed directly with Broker.submit().
+"""
+
+import heapq
+import itertools
+import math
+from collections import deque
+
+import pandas as pd
+
+try:
+    from Backtester.portfolio import BUY, SELL, _SIDES
+except ModuleNotFoundError:
+    # Allow running this file directly by adding the project root to sys.path
+    import sys
+    from pathlib import Path
+    project_root = Path(__file__).resolve().parents[1]
+    if str(project_root) not in sys.path:
+        sys.path.append(str(project_root))
+    from Backtester.portfolio import BUY, SELL, _SIDES
+
+MARKET, LIMIT, STOP = 'market', 'limit', 'stop'
+ORDER_TYPES = (MARKET, LIMIT, STOP)
+
+OPEN, FILLED, CANCELLED, EXPIRED = 'open', 'filled', 'cancelled', 'expired'
+
+
+class Order:
+    __slots__ = ('id', 'ticker', 'side', 'kind', 'units', 'price', 'filled', 'notional',
+                 'status', 'placed', 'expires')
+
+    def __init__(self, order_id, ticker, side, kind, units, price=None, placed=None, expires=None):
+        """
+        One order.
+        Args:
+            side (int): BUY or SELL (Backtester.portfolio codes).
+            kind (str): MARKET, LIMIT or STOP.
+            units (int): units wanted.
+            price (float): limit price (LIMIT) or trigger price (STOP).
+            placed (pd.Timestamp): date of the bar the order was placed on.
+            expires (int): last bar number (of its ticker's book) the order may fill on.
+        """
+        self.id = order_id
+        self.ticker = ticker
+        self.side = side
+        self.kind = kind
+        self.units = units
+        self.price = price
+        self.filled = 0
+        self.notional = 0.0  # sum of units * fill price, for the average fill price
+        self.status = OPEN
+        self.placed = placed
+        self.expires = expires
+
+    @property
+    def remaining(self):
+        return self.units - self.filled
+
+    @property
+    def avg_price(self):
+        return self.notional / self.filled if self.filled else float('nan')
+
+    def __repr__(self):
+        return (f'Order({self.id}, {self.ticker}, {_SIDES[self.side]} {self.units} {self.kind}'
+                f'{"" if self.price is None else f" @ {self.price}"}, filled={self.filled}, {self.status})')
+
+
+class FixedSlippage:
+    def __init__(self, bps=0.0):
+        """Fills market and stop orders `bps` basis points worse than the reference price."""
+        self.rate = bps / 10_000
+
+    def __call__(self, side, price, units, high, low, volume):
+        return price * (1 + side * self.rate)
+
+
+class VolumeSlippage:
+    def __init__(self, range_fraction=0.1, exponent=0.5):
+        """
+        Market impact from the bar itself:
+            slippage = range_fraction * (high - low) * (units / volume) ** exponent
+        so an order that is a large share of the bar's volume pays a larger share of the
+        bar's range (square-root impact by default). Bars without volume (FX quotes report
+        0) are charged the full range_fraction.
+        """
+        self.range_fraction = range_fraction
+        self.exponent = exponent
+
+    def __call__(self, side, price, units, high, low, volume):
+        participation = min(units / volume, 1.0) if volume > 0 else 1.0
+        return price + side * self.range_fraction * (high - low) * participation ** self.exponent
+
+
+class OrderBook:
+    """
+    Resting orders of one ticker.
+    Market orders wait in a FIFO queue. Limits and stops sit in four heaps whose top is
+    the order the market reaches first:
+        buy limits  - highest price      sell limits - lowest price
+        buy stops   - lowest trigger     sell stops  - highest trigger
+    Cancelled and expired orders are left in place and dropped when they reach the top.
+    """
+
+    def __init__(self):
+        self.market = deque()
+        self.buy_limits = []
+        self.sell_limits = []
+        self.buy_stops = []
+        self.sell_stops = []
+        self.bar = 0  # bars matched so far (order expiry is counted in this ticker's bars)
+
+    def __len__(self):
+        # entries held, including not yet dropped cancelled/expired ones
+        return (len(self.market) + len(self.buy_limits) + len(self.sell_limits)
+                + len(self.buy_stops) + len(self.sell_stops))
+
+    def add(self, order):
+        if order.kind == MARKET:
+            self.market.append(order)
+        elif order.kind == LIMIT:
+            if order.side == BUY:
+                heapq.heappush(self.buy_limits, (-order.price, order.id, order))
+            else:
+                heapq.heappush(self.sell_limits, (order.price, order.id, order))
+        elif order.side == BUY:
+            heapq.heappush(self.buy_stops, (order.price, order.id, order))
+        else:
+            heapq.heappush(self.sell_stops, (-order.price, order.id, order))
+
+    def _live(self, order):
+        if order.status == OPEN and order.expires is not None and self.bar > order.expires:
+            order.status = EXPIRED
+        return order.status == OPEN
+
+    def _top(self, heap):
+        # best live order of a heap, dropping dead entries on the way
+        while heap:
+            order = heap[0][2]
+            if self._live(order):
+                return order
+            heapq.heappop(heap)
+        return None
+
+    def match(self, open_, high, low, execute):
+        """
+        Matches one new bar against the book.
+        Args:
+            open_, high, low (float): the bar's prices.
+            execute (callable): execute(order, price, slip) fills what it can of the order
+                at `price` (slip=True lets the broker apply slippage) and returns the units filled.
+        A queue stops at the first order still open after execute() (the bar's volume ran
+        out): that order keeps its priority for the next bar.
+        """
+        self.bar += 1
+        market = self.market
+
+        # 1. market orders, in arrival order, at the open
+        while market:
+            order = market[0]
+            if not self._live(order):
+                market.popleft()
+                continue
+            execute(order, open_, True)
+            if order.status == OPEN:
+                break
+            market.popleft()
+
+        # 2. stops reached by the bar become market orders, filled at the stop
+        #    (or at the open when the bar gaps through it)
+        triggered = []
+        while (order := self._top(self.buy_stops)) is not None and high >= order.price:
+            heapq.heappop(self.buy_stops)
+            triggered.append((max(open_, order.price), order))
+        while (order := self._top(self.sell_stops)) is not None and low <= order.price:
+            heapq.heappop(self.sell_stops)
+            triggered.append((min(open_, order.price), order))
+        for price, order in triggered:
+            if not market:
+                execute(order, price, True)
+            if order.status == OPEN:
+                market.append(order)  # partly filled: the rest trades at the next open
+
+        # 3. limits the bar reached, best price first, at the limit (or the better open)
+        while (order := self._top(self.buy_limits)) is not None and low <= order.price:
+            execute(order, min(open_, order.price), False)
+            if order.status == OPEN:
+                break
+            heapq.heappop(self.buy_limits)
+        while (order := self._top(self.sell_limits)) is not None and high >= order.price:
+            execute(order, max(open_, order.price), False)
+            if order.status == OPEN:
+                break
+            heapq.heappop(self.sell_limits)
+
+
+class Broker:
+    def __init__(self, portfolio=None, slippage=None, max_participation=None, order_type=MARKET,
+                 offset=0.0, expire_after=None):
+        """
+        Routes orders to per-ticker order books and books the fills on a Portfolio.
+        Args:
+            portfolio (Portfolio): account the fills are booked on (Backtest attaches its own).
+            slippage (callable): FixedSlippage, VolumeSlippage or any
+                f(side, price, units, high, low, volume) -> fill price; applied to market and
+                triggered stop orders (limits fill at their price). None = no slippage.
+            max_participation (float): largest share of a bar's volume one ticker's orders may
+                take (e.g. 0.1); the rest stays open. Bars with no volume are not capped.
+            order_type (str): order placed by on_signal: MARKET, LIMIT (buy `offset` below /
+                sell above the signal price) or STOP (buy above / sell below it).
+            offset (float): distance of on_signal's limit/stop price, as a fraction of the price.
+            expire_after (int): bars an on_signal order may rest before it expires (None = good
+                till cancelled).
+        """
+        if order_type not in ORDER_TYPES:
+            raise ValueError(f"order_type must be one of {ORDER_TYPES}, got '{order_type}'")
+        self.portfolio = portfolio
+        self.slippage = slippage
+        self.max_participation = max_participation
+        self.order_type = order_type
+        self.offset = offset
+        self.expire_after = expire_after
+
+        self.books = {}
+        self.orders = []    # every order placed, for the order log
+        self._open = {}     # order id -> order, for cancel()
+        self._pending = {}  # (ticker, side) -> {order id: order}, oldest first, for on_signal
+        self._ids = itertools.count()
+        self._bar = None    # (date, high, low, volume) of the bar being matched
+        self._volume_left = math.inf
+
+    def attach(self, portfolio):
+        self.portfolio = portfolio
+        return self
+
+    def _book(self, ticker):
+        book = self.books.get(ticker)
+        if book is None:
+            book = self.books[ticker] = OrderBook()
+        return book
+
+    def submit(self, date, ticker, side, units, kind=MARKET, price=None, expire_after=None):
+        """
+        Places an order; it can fill from the next bar processed for its ticker on.
+        Args:
+            date: date of the bar the order is placed on.
+            side (int): BUY or SELL.
+            units (int): units wanted.
+            kind (str): MARKET, LIMIT or STOP.
+            price (float): limit or trigger price (required for LIMIT and STOP).
+            expire_after (int): bars the order may rest (None = good till cancelled).
+        Returns:
+            Order
+        """
+        if kind not in ORDER_TYPES:
+            raise ValueError(f"kind must be one of {ORDER_TYPES}, got '{kind}'")
+        if kind != MARKET and (price is None or not price > 0):
+            raise ValueError(f"a {kind} order needs a positive price")
+        if side not in _SIDES:
+            raise ValueError("side must be BUY (1) or SELL (-1)")
+        units = int(units)
+        if units <= 0:
+            raise ValueError("units must be positive")
+
+        book = self._book(ticker)
+        expires = None if expire_after is None else book.bar + expire_after
+        order = Order(next(self._ids), ticker, side, kind, units, price=price, placed=date, expires=expires)
+        self.orders.append(order)
+        self._open[order.id] = order
+        self._pending.setdefault((ticker, side), {})[order.id] = order
+        book.add(order)
+        return order
+
+    def cancel(self, order):
+        # cancel an order (or order id) that hasn't filled completely yet; True if it was open
+        order = self._open.get(order if isinstance(order, int) else order.id)
+        if order is None:
+            return False
+        if order.status != OPEN:
+            self._forget(order)     # expired in the book since it was indexed
+            return False
+        self._finish(order, CANCELLED)
+        return True
+
+    def _has_pending(self, ticker, side):
+        # True if the ticker has a live order on that side. Orders that expired in the book
+        # are dropped on the way, so each one is skipped once: O(1) amortized per call
+        pending = self._pending.get((ticker, side))
+        if not pending:
+            return False
+        book = self._book(ticker)
+        dead = []
+        live = False
+        for order in pending.values():
+            if book._live(order):
+                live = True
+                break
+            dead.append(order)
+        for order in dead:
+            self._forget(order)
+        return live
+
+    def open_orders(self, ticker=None):
+        # live orders of one ticker (or of all), oldest first
+        keys = [k for k in self._pending if ticker is None or k[0] == ticker]
+        live = []
+        for key in keys:
+            book = self._book(key[0])
+            for order in list(self._pending[key].values()):
+                if book._live(order):
+                    live.append(order)
+                else:
+                    self._forget(order)
+        return sorted(live, key=lambda o: o.id)
+
+    def process_bar(self, date, ticker, open_, high, low, volume=0.0):
+        # matches one bar of a ticker against its resting orders and books the fills
+        book = self.books.get(ticker)
+        if book is None:
+            return
+        self._bar = (date, high, low, volume)
+        cap = self.max_participation
+        self._volume_left = cap * volume if cap and volume > 0 else math.inf
+        book.match(open_, high, low, self._execute)
+
+    def _execute(self, order, price, slip):
+        # fill as much of `order` as volume, cash and the position allow
+        date, high, low, volume = self._bar
+        pf = self.portfolio
+        units = order.remaining
+        if self._volume_left < units:
+            units = int(self._volume_left)
+        if units <= 0:
+            return 0
+
+        if slip and self.slippage is not None:
+            # slipped prices stay inside the bar's range
+            price = min(max(self.slippage(order.side, price, units, high, low, volume), low), high)
+
+        rejected = False
+        if order.side == BUY:
+            affordable = int(pf.cash // (price * (1 + pf.transaction_cost)))
+            if affordable < units:
+                # insufficient funds: fill what the cash covers, reject the rest
+                units, rejected = affordable, True
+        else:
+            held = pf.positions.get(order.ticker, 0)
+            if held <= 0:
+                # nothing left to sell: the order can never fill
+                self._finish(order, CANCELLED)
+                return 0
+            units = min(units, held)
+        if units > 0:
+            pf.apply_fill(date, order.ticker, order.side, units, price)
+            order.filled += units
+            order.notional += units * price
+            self._volume_left -= units
+        if not order.remaining:
+            self._finish(order, FILLED)
+        elif rejected:
+            self._finish(order, CANCELLED)
+        return units
+
+    def _finish(self, order, status):
+        order.status = status
+        self._forget(order)
+
+    def _forget(self, order):
+        # drops a finished (or expired) order from the open-order indexes
+        self._open.pop(order.id, None)
+        pending = self._pending.get((order.ticker, order.side))
+        if pending is not None:
+            pending.pop(order.id, None)
+
+    def on_signal(self, date, ticker, signal, price):
+        """
+        Turns a strategy signal into orders, with the rules of Portfolio.update_positions:
+            +1 buys as many units as the cash allows (unless a buy is already pending),
+            -1 cancels pending buys and sells the whole position.
+        Args:
+            price (float): the signal bar's close; the reference for sizing and for the
+                limit/stop price.
+        """
+        if signal == 1:
+            if self._has_pending(ticker, BUY):
+                return
+            if self.order_type == LIMIT:
+                order_price = price * (1 - self.offset)
+            elif self.order_type == STOP:
+                order_price = price * (1 + self.offset)
+            else:
+                order_price = None
+            units = int(self.portfolio.cash // ((order_price or price) * (1 + self.portfolio.transaction_cost)))
+            if units > 0:
+                self.submit(date, ticker, BUY, units, kind=self.order_type, price=order_price,
+                            expire_after=self.expire_after)
+
+        elif signal == -1:
+            for order in list(self._pending.get((ticker, BUY), {}).values()):
+                self.cancel(order)  # expired ones are just dropped
+            held = self.portfolio.positions.get(ticker, 0)
+            if held <= 0 or self._has_pending(ticker, SELL):
+                return
+            if self.order_type == LIMIT:
+                order_price = price * (1 + self.offset)
+            elif self.order_type == STOP:
+                order_price = price * (1 - self.offset)
+            else:
+                order_price = None
+            self.submit(date, ticker, SELL, held, kind=self.order_type, price=order_price,
+                        expire_after=self.expire_after)
+
+    def get_order_log(self):
+        # one row per order placed: what was asked, what filled and how it ended
+        return pd.DataFrame([{
+            'Order': o.id,
+            'Placed': o.placed,
+            'Ticker': o.ticker,
+            'Side': _SIDES[o.side],
+            'Type': o.kind,
+            'Price': o.price,
+            'Units': o.units,
+            'Filled': o.filled,
+            'AvgFillPrice': o.avg_price,
+            'Status': o.status,
+        } for o in self.orders])
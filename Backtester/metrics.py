@@ -5,21 +5,65 @@ Computes and plots:
     - CAGR (compound annual growth rate)
     - Win rate / hit ratio
     - Daily returns distribution
+Annualization uses the bar frequency of the results (infer_periods_per_year), so minute
+and hourly runs get their own factor instead of the daily 252.
 """
 
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 
+# Bars per year of the named frequencies
+PERIODS_PER_YEAR = {'daily': 252, 'weekly': 50, 'monthly': 12}
+TRADING_DAYS = 252
+YEAR = pd.Timedelta(days=365.25)
+
+
+def infer_periods_per_year(index, trading_days=TRADING_DAYS):
+    """
+    Annualization factor (bars per year) of a DatetimeIndex.
+        - daily or slower bars: from the median spacing (PERIODS_PER_YEAR for daily, weekly
+          and monthly bars, 365.25 days / spacing beyond that)
+        - intraday bars: median number of bars per calendar day x trading_days, so a 24h FX
+          feed and a 6.5h equity session of minute bars each get their own factor
+    Falls back to daily when there are fewer than two timestamps.
+    """
+    if not isinstance(index, pd.DatetimeIndex) or len(index) < 2:
+        return PERIODS_PER_YEAR['daily']
+    ns = index.asi8
+    spacing = np.median(np.diff(ns)) / 86_400e9  # days
+    if spacing >= 1:
+        if spacing < 4:
+            return PERIODS_PER_YEAR['daily']
+        if spacing < 20:
+            return PERIODS_PER_YEAR['weekly']
+        if spacing < 60:
+            return PERIODS_PER_YEAR['monthly']
+        return 365.25 / spacing
+    # bars per day, counted on the days that have bars
+    _, per_day = np.unique(ns // 86_400_000_000_000, return_counts=True)
+    return float(np.median(per_day)) * trading_days
+
+
+def _years(start, end):
+    # elapsed time in years (works for spans shorter than a day)
+    return (pd.Timestamp(end) - pd.Timestamp(start)) / YEAR
+
 
 class PerformanceMetrics:
-    def __init__(self, result_df, freq = 'daily'):
+    def __init__(self, result_df, freq = 'auto'):
         """
         results_df: DataFrame with at least ['TotalValue'] column (from backtest output)
-        freq: 'daily', 'weekly', or 'monthly' (used for annualization)
+        freq: 'auto' (inferred from the index), 'daily', 'weekly', 'monthly', or the number
+              of bars per year (used for annualization)
         """
         self.df = result_df.copy()
         self.freq = freq
+        if freq == 'auto':
+            self.periods_per_year = infer_periods_per_year(result_df.index)
+        elif isinstance(freq, str):
+            self.periods_per_year = PERIODS_PER_YEAR[freq]
+        else:
+            self.periods_per_year = freq
         self._prepare_returns()
 
     def _prepare_returns(self):
@@ -30,7 +74,7 @@ class PerformanceMetrics:
     def sharpe_ratio(self, risk_free_rate = 0.02):
         mean_return = self.df['DailyReturn'].mean()
         std_return = self.df['DailyReturn'].std()
-        trading_days = {'daily':252, 'weekly':50, 'monthly':12}[self.freq]
+        trading_days = self.periods_per_year
 
         sharpe = (mean_return * trading_days - risk_free_rate) / (std_return * np.sqrt(trading_days))
         return sharpe
@@ -45,8 +89,7 @@ class PerformanceMetrics:
     def cagr(self):
         start_val = self.df['TotalValue'].iloc[0]
         end_val = self.df['TotalValue'].iloc[-1]
-        num_days = (self.df.index[-1] - self.df.index[0]).days
-        years = num_days / 365.25
+        years = _years(self.df.index[0], self.df.index[-1])
         return (end_val / start_val) ** (1/years) -1
 
     # 4. Win rate / hit ratio
@@ -57,6 +100,8 @@ class PerformanceMetrics:
 
     # 5. Daily returns distribution
     def plot_return_distribution(self):
+        import matplotlib.pyplot as plt  # only needed for this plot
+
         plt.figure(figsize=(8, 5))
         plt.hist(self.df['DailyReturn'], bins=50, color='skyblue', edgecolor='black')
         plt.title("Daily Returns Distribution")
@@ -68,7 +113,7 @@ class PerformanceMetrics:
     def summary(self):
         metrics = {
             "Sharpe Ratio": round(self.sharpe_ratio(), 3),
-            "Max Drawdown": round(self.max_drawdown(), 3),
+            "Max Drawdown": round(self.compute_max_drawdown(), 3),
             "CAGR": f"{self.cagr() * 100:.2f}%",
             "Win Rate": f"{self.win_rate() * 100:.2f}%"
         }
@@ -80,7 +125,7 @@ class PerformanceMetrics:
         std_return = self.df['DailyReturn'].std()
         if std_return == 0:
             return 0
-        return (mean_return / std_return) * (252 ** 0.5)
+        return (mean_return / std_return) * (self.periods_per_year ** 0.5)
 
     def compute_max_drawdown(self):
         """Compute maximum drawdown."""
@@ -95,23 +140,21 @@ class PerformanceMetrics:
         downside_std = self.df.loc[self.df['DailyReturn'] < 0, 'DailyReturn'].std()
         if downside_std == 0:
             return 0
-        return (mean_return / downside_std) * (252 ** 0.5)
+        return (mean_return / downside_std) * (self.periods_per_year ** 0.5)
 
     def compute_all_metrics(self):
         """
         Compute all key performance metrics for the backtest.
         Returns a dictionary of metric names and values.
         """
-        df = self.df.copy()
-
-        # Basic returns
-        df['CumulativeReturn'] = (1 + df['DailyReturn']).cumprod() - 1
+        # Basic returns (no copy of the frame needed, only the last cumulative value is used)
+        cumulative_return = (1 + self.df['DailyReturn']).cumprod() - 1
 
         # Compute metrics
         sharpe_ratio = self.compute_sharpe_ratio()
         max_drawdown = self.compute_max_drawdown()
-        total_return = df['CumulativeReturn'].iloc[-1]
-        volatility = df['DailyReturn'].std() * (252 ** 0.5)
+        total_return = cumulative_return.iloc[-1]
+        volatility = self.df['DailyReturn'].std() * (self.periods_per_year ** 0.5)
         sortino_ratio = self.compute_sortino_ratio() if hasattr(self, "compute_sortino_ratio") else None
 
         # Return metrics dictionary
@@ -125,6 +168,155 @@ class PerformanceMetrics:
 
         return metrics
 
+
+class StreamingMetrics:
+    """
+    Single-pass version of PerformanceMetrics for equity curves that don't fit in pandas.
+    Feed TotalValue one value at a time (update) or in chunks (update_many); only O(1)
+    running state is kept:
+        - Welford mean/variance of the returns (chunks are merged with Chan's formula)
+        - the same for the negative returns (downside deviation for Sortino)
+        - running peak and max drawdown of the cumulative return
+        - win count, and the endpoints needed for total return and CAGR
+    compute_all_metrics() returns the same keys and definitions as
+    PerformanceMetrics.compute_all_metrics(), e.g. the drawdown is measured from the first
+    return onwards. NaN values are skipped (the next return is taken against the last valid value).
+    """
+
+    def __init__(self, periods_per_year=TRADING_DAYS):
+        # periods_per_year: bars per year, e.g. infer_periods_per_year(index) for intraday bars
+        self.periods_per_year = periods_per_year
+        self.n = 0                      # number of returns seen
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.n_down = 0
+        self._down_mean = 0.0
+        self._down_m2 = 0.0
+        self.wins = 0
+        self._cumulative = 1.0          # product of (1 + return)
+        self._peak = -np.inf
+        self._max_drawdown = 0.0
+        self._prev_value = None         # last valid value (returns are taken against it)
+        self.first_value = None         # value at the first return (as used by PerformanceMetrics.cagr)
+        self.last_value = None
+        self.first_date = None
+        self.last_date = None
+
+    @staticmethod
+    def _merge(n_a, mean_a, m2_a, values):
+        # Chan et al. parallel update of (count, mean, M2) with a chunk of values
+        n_b = len(values)
+        if n_b == 0:
+            return n_a, mean_a, m2_a
+        mean_b = values.mean()
+        m2_b = ((values - mean_b) ** 2).sum()
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        return n, mean_a + delta * n_b / n, m2_a + m2_b + delta * delta * n_a * n_b / n
+
+    def update(self, value, date=None):
+        self.update_many([value], None if date is None else [date])
+
+    def update_many(self, values, dates=None):
+        """
+        Adds a chunk of consecutive TotalValue observations.
+        Args:
+            values (array-like): portfolio values in time order.
+            dates (array-like): matching timestamps (only needed for CAGR).
+        """
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        if not valid.all():
+            values = values[valid]
+            dates = None if dates is None else np.asarray(dates)[valid]
+        if len(values) == 0:
+            return
+
+        if self._prev_value is None:
+            # the first value only anchors the first return
+            self._prev_value = values[0]
+            values = values[1:]
+            dates = None if dates is None else dates[1:]
+            if len(values) == 0:
+                return
+
+        prev = np.concatenate(([self._prev_value], values[:-1]))
+        returns = values / prev - 1
+
+        if self.first_value is None:
+            self.first_value = values[0]
+            self.first_date = None if dates is None else dates[0]
+        self.last_value = values[-1]
+        self._prev_value = values[-1]
+        if dates is not None:
+            self.last_date = dates[-1]
+
+        self.n, self._mean, self._m2 = self._merge(self.n, self._mean, self._m2, returns)
+        down = returns[returns < 0]
+        self.n_down, self._down_mean, self._down_m2 = self._merge(self.n_down, self._down_mean, self._down_m2, down)
+        self.wins += int((returns > 0).sum())
+
+        cumulative = self._cumulative * np.cumprod(1 + returns)
+        peak = np.maximum(np.maximum.accumulate(cumulative), self._peak)
+        self._max_drawdown = min(self._max_drawdown, ((cumulative - peak) / peak).min())
+        self._cumulative = cumulative[-1]
+        self._peak = peak[-1]
+
+    def _std(self):
+        return np.sqrt(self._m2 / (self.n - 1)) if self.n > 1 else np.nan
+
+    def _downside_std(self):
+        return np.sqrt(self._down_m2 / (self.n_down - 1)) if self.n_down > 1 else np.nan
+
+    def total_return(self):
+        return self._cumulative - 1 if self.n else np.nan
+
+    def volatility(self):
+        return self._std() * np.sqrt(self.periods_per_year)
+
+    def sharpe_ratio(self):
+        std = self._std()
+        if std == 0:
+            return 0
+        return (self._mean / std) * np.sqrt(self.periods_per_year)
+
+    def sortino_ratio(self):
+        downside_std = self._downside_std()
+        if downside_std == 0:
+            return 0
+        return (self._mean / downside_std) * np.sqrt(self.periods_per_year)
+
+    def max_drawdown(self):
+        return self._max_drawdown if self.n else np.nan
+
+    def win_rate(self):
+        return self.wins / self.n if self.n else np.nan
+
+    def cagr(self):
+        if self.first_date is None or self.last_date is None:
+            raise ValueError("CAGR needs dates; pass dates= to update_many()")
+        years = _years(self.first_date, self.last_date)
+        return (self.last_value / self.first_value) ** (1 / years) - 1
+
+    def compute_all_metrics(self):
+        """Same output as PerformanceMetrics.compute_all_metrics()."""
+        return {
+            "Total Return": self.total_return(),
+            "Volatility (Annualized)": self.volatility(),
+            "Sharpe Ratio": self.sharpe_ratio(),
+            "Sortino Ratio": self.sortino_ratio(),
+            "Max Drawdown": self.max_drawdown()
+        }
+
+    @classmethod
+    def from_values(cls, values, dates=None, chunk_size=1_000_000, **kwargs):
+        # Runs a whole (possibly memory-mapped) equity curve through the accumulator in chunks
+        acc = cls(**kwargs)
+        for start in range(0, len(values), chunk_size):
+            acc.update_many(values[start:start + chunk_size],
+                            None if dates is None else dates[start:start + chunk_size])
+        return acc
+
 #
 # if __name__ == "__main__":
 #     import pandas as pd
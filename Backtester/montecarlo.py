@@ -0,0 +1,208 @@
+"""
+Monte Carlo / bootstrap robustness checks:
+    - resamples the per-bar returns of a backtest (circular block bootstrap, keeps
+      short-range autocorrelation and volatility clusters) or the returns of its
+      round-trip trades (reshuffled order, or drawn with replacement)
+    - computes Total Return, Volatility, Sharpe, Sortino and Max Drawdown for every
+      path at once on a (paths x time) NumPy array, with the definitions of
+      PerformanceMetrics.compute_all_metrics()
+    - works through the paths in chunks, so 100k paths only ever hold one chunk in memory
+    - seedable: the same seed and arguments give the same distributions
+
+The output is one row of metrics per path plus a summary with confidence intervals.
+"""
+
+import numpy as np
+import pandas as pd
+
+METHODS = ('block', 'resample', 'reshuffle')
+METRICS = ('Total Return', 'Volatility (Annualized)', 'Sharpe Ratio', 'Sortino Ratio', 'Max Drawdown')
+
+# Upper bound on the elements of one (paths x time) chunk when chunk_size is not given
+# (4M float64 = 32 MB per temporary array)
+_CHUNK_ELEMENTS = 4_000_000
+
+
+def equity_returns(results_df):
+    # per-bar returns of a backtest, as PerformanceMetrics builds its DailyReturn column
+    return results_df['TotalValue'].pct_change().dropna().to_numpy(dtype=np.float64)
+
+
+def trade_returns(trade_log):
+    """
+    Returns of the round-trip trades in a trade log (Portfolio or TargetPortfolio).
+    The trades are replayed as signed position changes per ticker (BUY +units, SELL -units).
+    A round trip runs from a flat position until it is flat again: a long closed by SELLs, a
+    short closed by BUYs, over any number of partial fills or rebalances in between. A trade
+    that flips the position (long to short or back) closes one round trip and opens the next
+    with the units left over; its amount is split pro rata.
+    return = (money received - money paid during the round trip) / money paid to open it
+    (the cost of the BUYs of a long, the revenue of the SELLs of a short), which for a plain
+    long is revenue of the SELLs / cost of the BUYs - 1. Positions still open at the end of
+    the log are left out.
+    """
+    if trade_log.empty:
+        return np.empty(0)
+    missing = pd.Series(np.nan, index=trade_log.index)
+    cost = trade_log['Cost'] if 'Cost' in trade_log else missing
+    revenue = trade_log['Revenue'] if 'Revenue' in trade_log else missing
+
+    returns = []
+    state = {}  # ticker -> (signed units held, money put into the position, net cash flow)
+    for ticker, signal, units, c, r in zip(trade_log['Ticker'], trade_log['Signal'], trade_log['Units'], cost, revenue):
+        direction = 1 if signal == 'BUY' else -1
+        amount = c if direction == 1 else r
+        position, invested, net = state.get(ticker, (0, 0.0, 0.0))
+
+        if position and np.sign(position) != direction:
+            # reduces the position: the units up to flat belong to the open round trip
+            closing = min(units, abs(position))
+            share = closing / units
+            net -= direction * amount * share
+            position += direction * closing
+            if position == 0:
+                returns.append(net / invested if invested else np.nan)
+                invested = net = 0.0
+            units -= closing
+            amount *= 1 - share
+
+        if units:
+            # opens or adds to a position
+            position += direction * units
+            invested += amount
+            net -= direction * amount
+        state[ticker] = (position, invested, net)
+    return np.asarray(returns, dtype=np.float64)
+
+
+def path_metrics(paths, periods_per_year=252):
+    """
+    Metrics of many return paths at once.
+    Args:
+        paths (np.ndarray): returns, shape (n_paths, n_periods).
+        periods_per_year (int): annualization factor (252 for daily bars).
+    Returns:
+        dict metric name -> array of n_paths values (keys as in METRICS).
+    """
+    paths = np.atleast_2d(np.asarray(paths, dtype=np.float64))
+    scale = np.sqrt(periods_per_year)
+
+    mean = paths.mean(axis=1)
+    std = paths.std(axis=1, ddof=1) if paths.shape[1] > 1 else np.full(len(paths), np.nan)
+
+    # downside deviation: sample std of the negative returns of each path
+    neg = paths < 0
+    n_down = neg.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        down_mean = np.where(neg, paths, 0.0).sum(axis=1) / n_down
+        down_m2 = np.square(np.where(neg, paths - down_mean[:, None], 0.0)).sum(axis=1)
+        down_std = np.where(n_down > 1, np.sqrt(down_m2 / (n_down - 1)), np.nan)
+        sharpe = np.where(std == 0, 0.0, mean / std * scale)
+        sortino = np.where(down_std == 0, 0.0, mean / down_std * scale)
+
+    # cumulative growth and drawdown (measured from the first return, like PerformanceMetrics)
+    cumulative = np.add(paths, 1.0)
+    np.cumprod(cumulative, axis=1, out=cumulative)
+    peak = np.maximum.accumulate(cumulative, axis=1)
+    drawdown = (cumulative - peak) / peak
+
+    return {
+        'Total Return': cumulative[:, -1] - 1,
+        'Volatility (Annualized)': std * scale,
+        'Sharpe Ratio': sharpe,
+        'Sortino Ratio': sortino,
+        'Max Drawdown': drawdown.min(axis=1),
+    }
+
+
+def block_bootstrap(returns, n_paths, horizon, block_size, rng):
+    # circular moving-block bootstrap: paths are glued from blocks of consecutive returns
+    # starting at random bars (wrapping around the end)
+    n = len(returns)
+    n_blocks = -(-horizon // block_size)
+    starts = rng.integers(0, n, size=(n_paths, n_blocks))
+    idx = (starts[:, :, None] + np.arange(block_size)) % n
+    return returns[idx.reshape(n_paths, -1)[:, :horizon]]
+
+
+def _paths(returns, n_paths, method, horizon, block_size, rng):
+    if method == 'block':
+        return block_bootstrap(returns, n_paths, horizon, block_size, rng)
+    if method == 'resample':
+        return returns[rng.integers(0, len(returns), size=(n_paths, horizon))]
+    # reshuffle: every path is a permutation of the same returns
+    return rng.permuted(np.broadcast_to(returns, (n_paths, len(returns))), axis=1)
+
+
+class MonteCarloResult:
+    """
+    Output of monte_carlo().
+        - distributions: DataFrame, one row of metrics per path
+        - observed: metrics of the original return series (same definitions)
+    """
+
+    def __init__(self, distributions, observed):
+        self.distributions = distributions
+        self.observed = observed
+
+    def summary(self, confidence=0.95):
+        """
+        One row per metric: observed value, mean and std over the paths, and the
+        two-sided percentile interval at `confidence`.
+        """
+        tail = (1 - confidence) / 2
+        dist = self.distributions
+        return pd.DataFrame({
+            'Observed': pd.Series(self.observed),
+            'Mean': dist.mean(),
+            'Std': dist.std(),
+            f'Lower ({tail:.1%})': dist.quantile(tail),
+            'Median': dist.median(),
+            f'Upper ({1 - tail:.1%})': dist.quantile(1 - tail),
+        }).loc[list(METRICS)]
+
+
+def monte_carlo(returns, n_paths=10_000, method='block', block_size=20, horizon=None, seed=None,
+                chunk_size=None, periods_per_year=252):
+    """
+    Resamples a return series into many paths and computes their metric distributions.
+    Args:
+        returns (array-like): per-bar returns (equity_returns) or trade returns (trade_returns).
+        n_paths (int): number of simulated paths.
+        method (str): 'block' = circular block bootstrap, 'resample' = i.i.d. draws with
+            replacement, 'reshuffle' = random permutations (same returns in a new order, so
+            the total return is fixed and only the path, e.g. the drawdown, changes).
+        block_size (int): block length for 'block'.
+        horizon (int): length of each path; defaults to len(returns) ('reshuffle' always uses it).
+        seed (int): seed for reproducible paths.
+        chunk_size (int): paths generated at once; defaults to what fits in ~4M elements.
+        periods_per_year (int): annualization (252 for daily bars; for trade returns use the
+            number of trades per year, or 1 to leave ratios per trade).
+    Returns:
+        MonteCarloResult
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}, got '{method}'")
+    returns = np.asarray(returns, dtype=np.float64)
+    returns = returns[~np.isnan(returns)]
+    if len(returns) < 2:
+        raise ValueError("need at least two returns to resample")
+    if block_size < 1:
+        raise ValueError("block_size must be at least 1")
+    horizon = len(returns) if horizon is None or method == 'reshuffle' else int(horizon)
+    chunk_size = chunk_size or max(1, _CHUNK_ELEMENTS // horizon)
+
+    # one child seed per chunk: the same seed gives the same paths for the same chunk_size
+    n_chunks = -(-n_paths // chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+
+    out = {name: np.empty(n_paths) for name in METRICS}
+    for c, child in enumerate(seeds):
+        start = c * chunk_size
+        m = min(chunk_size, n_paths - start)
+        paths = _paths(returns, m, method, horizon, block_size, np.random.default_rng(child))
+        for name, values in path_metrics(paths, periods_per_year).items():
+            out[name][start:start + m] = values
+
+    observed = {name: float(v[0]) for name, v in path_metrics(returns[None, :], periods_per_year).items()}
+    return MonteCarloResult(pd.DataFrame(out, columns=list(METRICS)), observed)
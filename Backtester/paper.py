@@ -0,0 +1,56 @@
+"""
+Bar-by-bar paper trading:
+    - feeds each new bar to the strategy's incremental on_bar()
+    - executes the signal on a Portfolio straight away
+    - records the portfolio value for that bar
+
+Each bar costs O(1) (no DataFrame copies, no rolling() over the history), and
+over the same history it produces the same trades as Backtest.run.
+"""
+try:
+    import Backtester.portfolio as portfolio
+except ModuleNotFoundError:
+    # Allow running this file directly by adding the project root to sys.path
+    import sys
+    from pathlib import Path
+    project_root = Path(__file__).resolve().parents[1]
+    if str(project_root) not in sys.path:
+        sys.path.append(str(project_root))
+    import Backtester.portfolio as portfolio
+
+
+class PaperTrader:
+    def __init__(self, strategy, ticker='EURUSD=X', initial_capital=100000, transaction_cost=0.001):
+        """
+        Args:
+            strategy (object): strategy instance with on_bar(price) and reset(); strategies
+                with needs_dates = True (e.g. Strategy.timeframe.HigherTimeframe) get
+                on_bar(price, date).
+            ticker (str): ticker being traded.
+            initial_capital (float): starting portfolio value.
+            transaction_cost (float): cost per trade (e.g., 0.001 = 0.1%)
+        """
+        self.strategy = strategy
+        self.strategy.reset()
+        self.ticker = ticker
+        self.portfolio = portfolio.Portfolio(initial_capital=initial_capital, transaction_cost=transaction_cost)
+
+    def on_bar(self, date, price):
+        # one new bar: signal -> trade -> mark to market; returns the signal
+        if getattr(self.strategy, 'needs_dates', False):
+            signal = self.strategy.on_bar(price, date)
+        else:
+            signal = self.strategy.on_bar(price)
+        self.portfolio.update_positions(date, self.ticker, signal, price)
+        self.portfolio.record_daily_value(date, {self.ticker: price})
+        return signal
+
+    def run(self, bars):
+        """
+        Replays a sequence of bars, e.g. a price Series (date -> price).
+        Returns the portfolio history like Backtest.run.
+        """
+        items = bars.items() if hasattr(bars, 'items') else bars
+        for date, price in items:
+            self.on_bar(date, price)
+        return self.portfolio.get_history()
@@ -5,10 +5,131 @@ Handles:
     - open positions
     - total portfolio value
     - logging trades and P&L (Profit and Loss)
+
+History and trades are recorded into preallocated NumPy column buffers (int64
+nanosecond dates, float64 values, small integer codes for the side and the
+ticker) that double in size when full, instead of one dict per bar.
+get_history()/get_trade_log() wrap those buffers in DataFrames without copying.
 """
 
+import numpy as np
 import pandas as pd
 
+BUY, SELL = 1, -1  # trade side codes stored in the trade buffer
+_SIDES = {BUY: 'BUY', SELL: 'SELL'}
+
+HISTORY_FIELDS = (('Date', np.int64), ('TotalValue', np.float64))
+TRADE_FIELDS = (
+    ('Date', np.int64),
+    ('Ticker', np.int32),      # id into the portfolio's ticker list
+    ('Side', np.int8),         # BUY / SELL
+    ('Units', np.int64),
+    ('Price', np.float64),
+    ('Amount', np.float64),    # cost of a BUY, revenue of a SELL
+    ('Remaining', np.float64),
+)
+
+
+def _to_ns(date):
+    # nanoseconds since the epoch, the int64 behind a datetime64[ns]
+    if isinstance(date, pd.Timestamp):
+        return date.value
+    return pd.Timestamp(date).value
+
+
+class RecordBuffer:
+    def __init__(self, fields, capacity=1024):
+        """
+        Growable columnar record buffer: one preallocated NumPy array per field.
+        Rows are written in place and the arrays double when full, so appending is
+        amortized O(1) with no per-row Python objects.
+        Args:
+            fields (tuple): (name, dtype) pairs, in row order.
+            capacity (int): rows allocated up front.
+        """
+        self.names = [name for name, _ in fields]
+        self._cols = [np.empty(max(capacity, 1), dtype=dtype) for _, dtype in fields]
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def capacity(self):
+        return len(self._cols[0])
+
+    def reserve(self, capacity):
+        # grow every column to hold at least `capacity` rows
+        if capacity <= self.capacity:
+            return
+        for j, col in enumerate(self._cols):
+            grown = np.empty(capacity, dtype=col.dtype)
+            grown[:self._n] = col[:self._n]
+            self._cols[j] = grown
+
+    def append(self, *row):
+        # one row, values in field order
+        n = self._n
+        if n == len(self._cols[0]):
+            self.reserve(2 * n)
+        for col, value in zip(self._cols, row):
+            col[n] = value
+        self._n = n + 1
+
+    def extend(self, *columns):
+        # many rows at once, one array per field in field order
+        m = len(columns[0])
+        if self._n + m > self.capacity:
+            self.reserve(max(2 * self.capacity, self._n + m))
+        for col, values in zip(self._cols, columns):
+            col[self._n:self._n + m] = values
+        self._n += m
+
+    def column(self, name):
+        # view of the filled part of one column (no copy)
+        return self._cols[self.names.index(name)][:self._n]
+
+    def clear(self):
+        self._n = 0
+
+
+def history_frame(history):
+    # DataFrame with a 'Date' DatetimeIndex and a 'TotalValue' column, viewing the buffer
+    index = pd.DatetimeIndex(history.column('Date').view('M8[ns]'), name='Date')
+    return pd.DataFrame({'TotalValue': history.column('TotalValue')}, index=index, copy=False)
+
+
+def trade_frame(trades, tickers):
+    """
+    DataFrame of the trade buffer with the columns of the original dict trade log:
+    Date, Ticker, Signal ('BUY'/'SELL'), Units, Price, Cost or Revenue (NaN for the
+    other side), Remaining. Cost/Revenue appear in the order they first occurred.
+    """
+    if not len(trades):
+        return pd.DataFrame()
+    side = trades.column('Side')
+    amount = trades.column('Amount')
+    buys = side == BUY
+    amount_cols = {
+        'Cost': np.where(buys, amount, np.nan),
+        'Revenue': np.where(buys, np.nan, amount),
+    }
+    first, second = ('Cost', 'Revenue') if buys[0] else ('Revenue', 'Cost')
+
+    cols = {
+        'Date': trades.column('Date').view('M8[ns]'),
+        'Ticker': np.asarray(tickers, dtype=object)[trades.column('Ticker')],
+        'Signal': np.where(buys, _SIDES[BUY], _SIDES[SELL]).astype(object),
+        'Units': trades.column('Units'),
+        'Price': trades.column('Price'),
+        first: amount_cols[first],
+        'Remaining': trades.column('Remaining'),
+    }
+    if (buys != buys[0]).any():
+        cols[second] = amount_cols[second]
+    return pd.DataFrame(cols, copy=False)
+
+
 class Portfolio:
     def __init__(self, initial_capital=100000, transaction_cost=0.001):
         """
@@ -22,8 +143,31 @@ class Portfolio:
                                     # can decrease or increase
         self.transaction_cost = transaction_cost # Stores the transaction cost percentage as an instance attribute.
         self.positions = {}  #{ticker: number_of_units} #Initializes an empty dictionary to hold current open positions.
-        self.portfolio_history = []             #stores the daily portfolio value
-        self.trade_log = []                     #stores all the trades
+        self.history = RecordBuffer(HISTORY_FIELDS)   #stores the daily portfolio value
+        self.trades = RecordBuffer(TRADE_FIELDS, capacity=64)  #stores all the trades
+        self.tickers = []       # ticker id -> ticker, for the Ticker column of the trade buffer
+        self._ticker_ids = {}
+
+    def reserve(self, n_bars):
+        # preallocate the history for a run of known length (avoids regrowing the buffer)
+        self.history.reserve(n_bars)
+
+    def _ticker_id(self, ticker):
+        tid = self._ticker_ids.get(ticker)
+        if tid is None:
+            tid = self._ticker_ids[ticker] = len(self.tickers)
+            self.tickers.append(ticker)
+        return tid
+
+    @property
+    def portfolio_history(self):
+        # list of {'Date', 'TotalValue'} dicts, as older code expects
+        return self.get_history().reset_index().to_dict('records')
+
+    @property
+    def trade_log(self):
+        # list of trade dicts, as older code expects
+        return self.get_trade_log().to_dict('records')
 
     def update_positions(self,date,ticker,signal,price):
         #Excecutes the trade based on signal: +1=Buy, -1=Sell, 0=Hold
@@ -37,6 +181,18 @@ class Portfolio:
             # self.cash // ... — maximum full units affordable.
             if units <= 0:
                 return
+            self.apply_fill(date, ticker, BUY, units, price)
+
+        # Sell position and the condition also checks ticker in self.positions so you only try to
+        # sell if you hold that ticker.
+        elif signal == -1 and ticker in self.positions:
+            self.apply_fill(date, ticker, SELL, self.positions[ticker], price)
+
+    def apply_fill(self, date, ticker, side, units, price):
+        # Books one executed trade: `units` (> 0) bought or sold at `price`.
+        # Used by update_positions and by Backtester.execution.Broker for its (partial) fills;
+        # the caller makes sure the cash covers a buy and a sell doesn't exceed the position.
+        if side == BUY:
             cost = units * price * (1 +self.transaction_cost) #Total cost paid for the buy, including the
             # transaction cost.
             #Example: if you buy 100 units at price 1.25 and transaction_cost 0.001 → cost = 100 * 1.25 * 1.001.
@@ -46,36 +202,20 @@ class Portfolio:
                 #Adds units (the newly bought amount)
                 # this means that multiple buys will accumulate units(positing scaling)
 
-            self.trade_log.append({
-                'Date': date,
-                'Ticker': ticker,
-                'Signal': 'BUY',
-                'Units': units,
-                'Price': price,
-                'Cost': cost,
-                'Remaining': self.cash
-            })
-
-        # Sell position and the condition also checks ticker in self.positions so you only try to
-        # sell if you hold that ticker.
-        elif signal == -1 and ticker in self.positions:
-            units = self.positions[ticker]
+            self.trades.append(_to_ns(date), self._ticker_id(ticker), BUY, units, price, cost, self.cash)
+        else:
             revenue = units * price * (1 - self.transaction_cost)
             #Calculates proceeds received by selling the units after transaction cost on the sell side.
             # 1 - transaction_cost reduces revenue by the fee fraction.
             self.cash += revenue # adds the sales proceed to the available cash
-            del self.positions[ticker] # removes the position entry because i have sold all unites, this means
-            # position closed
-
-            self.trade_log.append({
-                'Date': date,
-                'Ticker': ticker,
-                'Signal': 'SELL',
-                'Units': units,
-                'Price': price,
-                'Revenue': revenue,
-                'Remaining': self.cash
-            })
+            left = self.positions[ticker] - units
+            if left:
+                self.positions[ticker] = left # partial sell: the rest stays open
+            else:
+                del self.positions[ticker] # removes the position entry because i have sold all unites, this means
+                # position closed
+
+            self.trades.append(_to_ns(date), self._ticker_id(ticker), SELL, units, price, revenue, self.cash)
 
     def total_value(self,current_prices):
         #Calculates the total portfolio value = cash + sum of all open positions
@@ -94,39 +234,273 @@ class Portfolio:
         # saves the portoflio's daily value (used for performance tracking)
 
         value = self.total_value(current_prices) #compute current portfolio equity.
-        self.portfolio_history.append({
-            'Date': date,
-            'TotalValue' : value
-        })
+        self.history.append(_to_ns(date), value)
+
+    def record_history(self, dates, values):
+        # bulk version of record_daily_value, used by the vectorized engine which already
+        # knows the TotalValue of every bar
+        self.history.extend(pd.DatetimeIndex(dates).asi8, values)
+
+    def record_trades(self, dates, ticker, trades):
+        # bulk version of the trade logging in update_positions
+        # trades: iterable of (bar_index, side, units, price, amount, remaining) where side is
+        # 'BUY' or 'SELL' and amount is the cost of a BUY or the revenue of a SELL
+        if not trades:
+            return
+        bars, sides, units, prices, amounts, remaining = zip(*trades)
+        self.trades.extend(
+            pd.DatetimeIndex(dates).asi8[list(bars)],
+            np.full(len(bars), self._ticker_id(ticker)),
+            [BUY if side == 'BUY' else SELL for side in sides],
+            units, prices, amounts, remaining,
+        )
 
     def get_history(self):
         # returns dataframe containing portfolio of value over time
-
-        df = pd.DataFrame(self.portfolio_history)
-        # Converts self.portfolio_history (list of dicts) into a pandas.DataFrame and returns it.
-        df['Date'] = pd.to_datetime(df['Date'])
-        df.set_index('Date', inplace=True)
-        return df
+        # (a view of the history buffer: Date index, TotalValue column)
+        return history_frame(self.history)
 
     def get_trade_log(self):
         # returns the dataframe of executed trades
+        return trade_frame(self.trades, self.tickers)
 
-        return pd.DataFrame(self.trade_log)
-        # Converts self.trade_log to a pandas.DataFrame and returns it.
 
+class MultiAssetPortfolio:
+    def __init__(self, tickers, initial_capital=100000, transaction_cost=0.001):
+        """
+        Portfolio over many tickers sharing one cash balance.
+        Positions live in a NumPy array indexed by asset id (the position of the ticker in
+        `tickers`), so marking the book to market is one dot product per bar.
+        Args:
+            tickers (list): ticker symbols; asset id i is tickers[i].
+            initial_capital (float): starting cash in USD.
+            transaction_cost (float): cost per trade (e.g., 0.001 = 0.1%)
+        """
+        self.tickers = list(tickers)
+        self.asset_ids = {t: i for i, t in enumerate(self.tickers)}
+        self.initial_capital = initial_capital
+        self.cash = initial_capital
+        self.transaction_cost = transaction_cost
+        self.units = np.zeros(len(self.tickers), dtype=np.int64)  # units held per asset id
+        self.history = RecordBuffer(HISTORY_FIELDS)
+        self.trades = RecordBuffer(TRADE_FIELDS, capacity=64)  # Ticker column holds the asset id
 
+    def reserve(self, n_bars):
+        self.history.reserve(n_bars)
 
-#Process finished with exit code 0 - 09/10/25
+    @property
+    def portfolio_history(self):
+        return self.get_history().reset_index().to_dict('records')
+
+    @property
+    def trade_log(self):
+        return self.get_trade_log().to_dict('records')
+
+    @property
+    def positions(self):
+        # {ticker: number_of_units} for the open positions, same shape as Portfolio.positions
+        return {self.tickers[i]: int(self.units[i]) for i in np.flatnonzero(self.units)}
+
+    def update_positions(self, date, signals, prices):
+        """
+        Executes one bar for every asset at once.
+        Same rules as Portfolio.update_positions, per asset:
+            -1 sells the whole position, +1 buys as many whole units as the cash allows.
+        Sells are filled first; the cash is then split equally between the assets with a
+        buy signal on this bar. Assets with a NaN price are skipped.
+        Args:
+            signals (np.ndarray): +1/-1/0 per asset id.
+            prices (np.ndarray): price per asset id.
+        """
+        tradable = ~np.isnan(prices)
+
+        # 1. Sells: close every held position with a -1 signal
+        sells = np.flatnonzero((signals == -1) & tradable & (self.units > 0))
+        if sells.size:
+            units = self.units[sells]
+            revenue = units * prices[sells] * (1 - self.transaction_cost)
+            remaining = self.cash + np.cumsum(revenue)
+            self.cash = float(remaining[-1])
+            self.units[sells] = 0
+            self._log_trades(date, SELL, sells, units, prices[sells], revenue, remaining)
+
+        # 2. Buys: split the available cash between the assets with a +1 signal
+        buys = np.flatnonzero((signals == 1) & tradable)
+        if buys.size:
+            budget = self.cash / buys.size
+            unit_cost = prices[buys] * (1 + self.transaction_cost)
+            units = np.floor_divide(budget, unit_cost).astype(np.int64)
+            filled = units > 0
+            if filled.any():
+                buys, units = buys[filled], units[filled]
+                cost = units * prices[buys] * (1 + self.transaction_cost)
+                remaining = self.cash - np.cumsum(cost)
+                self.cash = float(remaining[-1])
+                self.units[buys] += units
+                self._log_trades(date, BUY, buys, units, prices[buys], cost, remaining)
+
+    def _log_trades(self, date, side, asset_ids, units, prices, amounts, remaining):
+        # one row per filled asset, written as whole columns
+        n = len(asset_ids)
+        self.trades.extend(np.full(n, _to_ns(date)), asset_ids, np.full(n, side), units, prices, amounts, remaining)
+
+    def total_value(self, prices):
+        # cash + market value of every position, as one dot product
+        # prices: finite array indexed by asset id (Backtest forward-fills missing prices)
+        return self.cash + float(self.units @ prices)
+
+    def record_daily_value(self, date, prices):
+        self.history.append(_to_ns(date), self.total_value(prices))
+
+    def get_history(self):
+        return history_frame(self.history)
+
+    def get_trade_log(self):
+        return trade_frame(self.trades, self.tickers)
+
+
+EXPOSURE_FIELDS = (
+    ('Date', np.int64),
+    ('Long', np.float64),       # market value of the long positions
+    ('Short', np.float64),      # market value of the short positions (positive number)
+    ('Financing', np.float64),  # borrow fee + margin interest charged on this bar
+)
+
+
+class TargetPortfolio:
+    def __init__(self, tickers, initial_capital=100000, transaction_cost=0.001, borrow_rate=0.0,
+                 margin_rate=0.0, periods_per_year=252, min_trade_weight=0.01):
+        """
+        Long/short portfolio that rebalances to target weights every bar.
+        Units are held in a signed array by asset id (negative = short), so a rebalance
+        is a few array operations whatever the number of tickers:
+            target units = trunc(weight * equity / price), trades = target - held.
+        Shorting credits the sale proceeds to cash; buying more than the cash is a margin loan.
+        Args:
+            tickers (list): ticker symbols; asset id i is tickers[i].
+            initial_capital (float): starting cash in USD.
+            transaction_cost (float): cost per trade (e.g., 0.001 = 0.1%), on buys and sells.
+            borrow_rate (float): annual fee on the market value of the short positions.
+            margin_rate (float): annual interest on borrowed cash (long value above equity).
+            periods_per_year (int): bars per year, to charge the annual rates per bar.
+            min_trade_weight (float): skip trades smaller than this share of equity (so small
+                drifts don't trade every bar); trades that close a position always go through.
+                0 rebalances exactly every bar.
+        """
+        self.tickers = list(tickers)
+        self.asset_ids = {t: i for i, t in enumerate(self.tickers)}
+        self.initial_capital = initial_capital
+        self.cash = initial_capital
+        self.transaction_cost = transaction_cost
+        self.borrow_rate = borrow_rate
+        self.margin_rate = margin_rate
+        self.periods_per_year = periods_per_year
+        self.min_trade_weight = min_trade_weight
+        self.units = np.zeros(len(self.tickers), dtype=np.int64)  # signed units per asset id
+        self.history = RecordBuffer(HISTORY_FIELDS)
+        self.exposure = RecordBuffer(EXPOSURE_FIELDS)
+        self.trades = RecordBuffer(TRADE_FIELDS, capacity=64)  # Ticker column holds the asset id
 
+    def reserve(self, n_bars):
+        self.history.reserve(n_bars)
+        self.exposure.reserve(n_bars)
 
+    @property
+    def portfolio_history(self):
+        return self.get_history().reset_index().to_dict('records')
 
+    @property
+    def trade_log(self):
+        return self.get_trade_log().to_dict('records')
 
+    @property
+    def positions(self):
+        # {ticker: signed units} for the open positions
+        return {self.tickers[i]: int(self.units[i]) for i in np.flatnonzero(self.units)}
 
+    def total_value(self, prices):
+        # equity: cash + signed market value of every position
+        # prices: finite array indexed by asset id (Backtest forward-fills missing prices)
+        return self.cash + float(self.units @ prices)
 
+    def rebalance(self, date, weights, prices, marks=None):
+        """
+        Trades every asset to its target weight of the current equity.
+        Args:
+            weights (np.ndarray): signed target weight per asset id (0.5 = half the equity
+                long, -0.5 = half the equity short).
+            prices (np.ndarray): trade price per asset id; NaN = not tradable this bar
+                (the position is left as it is).
+            marks (np.ndarray): finite prices for the equity; defaults to prices.
+        """
+        marks = prices if marks is None else marks
+        equity = self.total_value(marks)
+        tradable = ~np.isnan(prices)
+        if equity <= 0:
+            return
+
+        target = self.units.copy()
+        target[tradable] = np.trunc(weights[tradable] * equity / prices[tradable])
+        delta = target - self.units
+        if self.min_trade_weight > 0:
+            small = np.abs(delta) * np.nan_to_num(prices) < self.min_trade_weight * equity
+            delta[small & (target != 0)] = 0
+        traded = np.flatnonzero(delta)
+        if not traded.size:
+            return
+
+        # sells first (they raise cash), then buys, logged in that order
+        d, p = delta[traded], prices[traded]
+        for side, mask in ((SELL, d < 0), (BUY, d > 0)):
+            if not mask.any():
+                continue
+            units = np.abs(d[mask])
+            if side == BUY:
+                amounts = units * p[mask] * (1 + self.transaction_cost)
+                remaining = self.cash - np.cumsum(amounts)
+            else:
+                amounts = units * p[mask] * (1 - self.transaction_cost)
+                remaining = self.cash + np.cumsum(amounts)
+            self.cash = float(remaining[-1])
+            n = len(units)
+            self.trades.extend(np.full(n, _to_ns(date)), traded[mask], np.full(n, side), units, p[mask],
+                               amounts, remaining)
+        self.units += delta
 
+    def accrue(self, date, marks):
+        # charges one bar of borrow fee and margin interest, and records the exposure
+        value = self.units * marks
+        long_value = float(np.maximum(value, 0.0).sum())
+        short_value = float(np.maximum(-value, 0.0).sum())
+        equity = self.cash + long_value - short_value
+        loan = max(long_value - equity, 0.0)
+        financing = (short_value * self.borrow_rate + loan * self.margin_rate) / self.periods_per_year
+        self.cash -= financing
+        self.exposure.append(_to_ns(date), long_value, short_value, financing)
 
+    def record_daily_value(self, date, prices):
+        self.history.append(_to_ns(date), self.total_value(prices))
 
+    def get_history(self):
+        return history_frame(self.history)
 
+    def get_exposure(self):
+        """
+        Per-bar exposure: Long and Short market value, Gross (long + short), Net
+        (long - short) and the Financing charged, indexed by Date.
+        """
+        index = pd.DatetimeIndex(self.exposure.column('Date').view('M8[ns]'), name='Date')
+        long_value, short_value = self.exposure.column('Long'), self.exposure.column('Short')
+        return pd.DataFrame({
+            'Long': long_value,
+            'Short': short_value,
+            'Gross': long_value + short_value,
+            'Net': long_value - short_value,
+            'Financing': self.exposure.column('Financing'),
+        }, index=index)
 
+    def get_trade_log(self):
+        return trade_frame(self.trades, self.tickers)
 
 
+#Process finished with exit code 0 - 09/10/25
@@ -0,0 +1,159 @@
+"""
+Timing and profiling instrumentation:
+    - per-phase wall and CPU time (data loading, signals, bar loop, metrics, plots)
+    - throughput for phases that process bars (bars/sec)
+    - optional allocation counts and peak memory per phase (tracemalloc)
+    - optional cProfile capture of the whole run
+    - writes profile.json / profile_phases.csv (and the cProfile stats) to a folder
+
+Code is instrumented with `with profiler.phase('name'):`. When profiling is off the
+NULL_PROFILER is used, whose phase() hands back one shared no-op context manager,
+so the disabled cost is a method call per phase (phases are coarse, never per bar).
+"""
+
+import cProfile
+import contextlib
+import csv
+import functools
+import io
+import json
+import os
+import pstats
+import time
+import tracemalloc
+
+
+class _NullProfiler:
+    enabled = False
+    _null = contextlib.nullcontext()
+
+    def phase(self, name, items=None):
+        return self._null
+
+
+NULL_PROFILER = _NullProfiler()
+
+
+def profiled(name, count_rows=False):
+    """
+    Decorator that adds a `profiler=None` keyword to a function and times each call as
+    one phase. count_rows=True uses len() of the first argument as the phase's item count.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, profiler=None, **kwargs):
+            if profiler is None or not profiler.enabled:
+                return fn(*args, **kwargs)
+            items = len(args[0]) if count_rows and args else None
+            with profiler.phase(name, items=items):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Profiler:
+    enabled = True
+
+    def __init__(self, trace_memory=False, cprofile=False):
+        """
+        Args:
+            trace_memory (bool): record allocations and peak memory per phase (tracemalloc;
+                slows the profiled code down noticeably).
+            cprofile (bool): capture a cProfile of everything between start() and stop().
+        """
+        self.trace_memory = trace_memory
+        self.phases = []
+        self._cprofile = cProfile.Profile() if cprofile else None
+        self._started = None
+        self.total_wall = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self._cprofile is not None:
+            self._cprofile.enable()
+        return self
+
+    def stop(self):
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        if self._started is not None:
+            self.total_wall = time.perf_counter() - self._started
+
+    @contextlib.contextmanager
+    def phase(self, name, items=None):
+        """
+        Times one phase of the run.
+        Args:
+            name (str): phase name, e.g. 'backtest.bar_loop'.
+            items (int): number of bars processed, used for the throughput column.
+        Phases should not be nested when trace_memory is on (the peak is reset per phase).
+        """
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall0
+            record = {
+                'phase': name,
+                'wall_s': wall,
+                'cpu_s': time.process_time() - cpu0,
+                'items': items,
+                'items_per_sec': items / wall if items and wall > 0 else None,
+            }
+            if tracing:
+                _, peak = tracemalloc.get_traced_memory()
+                diff = tracemalloc.take_snapshot().compare_to(before, 'filename')
+                record['alloc_blocks'] = sum(d.count_diff for d in diff if d.count_diff > 0)
+                record['alloc_bytes'] = sum(d.size_diff for d in diff if d.size_diff > 0)
+                record['peak_bytes'] = peak
+            self.phases.append(record)
+
+    def cprofile_text(self, limit=30):
+        # top functions by cumulative time, as text
+        if self._cprofile is None:
+            return None
+        out = io.StringIO()
+        pstats.Stats(self._cprofile, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+
+    def to_dict(self):
+        return {
+            'total_wall_s': self.total_wall,
+            'trace_memory': self.trace_memory,
+            'cprofile': self._cprofile is not None,
+            'phases': self.phases,
+        }
+
+    def save(self, outdir):
+        """
+        Writes profile.json and profile_phases.csv to outdir, plus profile.pstats and
+        profile_top.txt when cProfile was on. Returns the list of written paths.
+        """
+        os.makedirs(outdir, exist_ok=True)
+        paths = [os.path.join(outdir, 'profile.json'), os.path.join(outdir, 'profile_phases.csv')]
+
+        with open(paths[0], 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+        fields = ['phase', 'wall_s', 'cpu_s', 'items', 'items_per_sec', 'alloc_blocks', 'alloc_bytes', 'peak_bytes']
+        with open(paths[1], 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(self.phases)
+
+        if self._cprofile is not None:
+            stats_path = os.path.join(outdir, 'profile.pstats')
+            top_path = os.path.join(outdir, 'profile_top.txt')
+            self._cprofile.dump_stats(stats_path)
+            with open(top_path, 'w') as f:
+                f.write(self.cprofile_text())
+            paths += [stats_path, top_path]
+        return paths
@@ -0,0 +1,443 @@
+"""
+Long-lived local backtest service:
+    - the feature data is loaded once and copied into shared memory (sweep.SharedFrame);
+      the worker processes attach to it when they start, so a job only sends its small
+      spec (strategy, params, ticker, dates) to a worker, never the data
+    - jobs wait in a bounded asyncio queue in front of a process pool with one dispatcher
+      per worker; when the queue is full a submit waits for room, and since the server
+      stops reading that connection in the meantime, the client is slowed down by TCP
+      itself (backpressure) instead of the queue growing without limit
+    - identical jobs submitted while one is queued or running are not run twice: the
+      later submitters are attached to the running job and get the same events
+    - each job streams its events back as it goes: accepted (with its state and queue
+      position), started, then result (metrics) or error; a submission attached to a job
+      that is already running gets accepted with state 'running' and no started event
+
+The protocol is one JSON object per line over a local TCP socket:
+    -> {"op": "submit", "id": 1, "job": {"strategy": "momentum", "params": {"lookback": 20}}}
+    <- {"event": "accepted", "id": 1, "job_id": "...", "deduplicated": false, "state": "queued", "position": 0}
+    <- {"event": "started", "job_id": "..."}
+    <- {"event": "result", "job_id": "...", "bars": 1106, "metrics": {...}, "seconds": 0.02}
+    -> {"op": "status"}
+    <- {"event": "status", "queued": 0, "running": 0, "processes": 4, "completed": 1, ...}
+A job can also set ticker, start, end, engine, initial_capital and transaction_cost.
+JobClient (async) and submit() (blocking, for scripts) are the client side.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    from Backtester.sweep import STRATEGIES, SharedFrame, _init_worker, _worker, run_one
+except ModuleNotFoundError:
+    # Allow running this file directly by adding the project root to sys.path
+    import sys
+    from pathlib import Path
+    project_root = Path(__file__).resolve().parents[1]
+    if str(project_root) not in sys.path:
+        sys.path.append(str(project_root))
+    from Backtester.sweep import STRATEGIES, SharedFrame, _init_worker, _worker, run_one
+from Backtester.backtest import ENGINES
+from Data.store import end_timestamp
+
+HOST = '127.0.0.1'
+PORT = 8765
+
+# Defaults of the optional job fields
+JOB_DEFAULTS = {
+    'params': {},
+    'ticker': 'EURUSD=X',
+    'start': None,
+    'end': None,
+    'engine': 'vectorized',
+    'initial_capital': 100000,
+    'transaction_cost': 0.001,
+}
+
+# Longest request line accepted (bytes)
+LINE_LIMIT = 1 << 20
+
+
+def normalize_job(job, columns=None):
+    """
+    A job spec with every field filled in, checked before it is queued.
+    Args:
+        job (dict): at least 'strategy'; see JOB_DEFAULTS for the other fields.
+        columns (list): columns of the loaded data, to check the ticker against.
+    Returns:
+        dict with the fields of JOB_DEFAULTS plus 'strategy'.
+    """
+    if not isinstance(job, dict) or 'strategy' not in job:
+        raise ValueError("a job needs at least a 'strategy'")
+    unknown = set(job) - set(JOB_DEFAULTS) - {'strategy'}
+    if unknown:
+        raise ValueError(f"unknown job fields: {sorted(unknown)}")
+    spec = {**JOB_DEFAULTS, **job}
+    if spec['strategy'] not in STRATEGIES:
+        raise ValueError(f"strategy must be one of {list(STRATEGIES)}, got '{spec['strategy']}'")
+    if spec['engine'] not in ENGINES:
+        raise ValueError(f"engine must be one of {ENGINES}, got '{spec['engine']}'")
+    if not isinstance(spec['params'], dict):
+        raise ValueError("params must be an object of parameter -> value")
+    STRATEGIES[spec['strategy']](**spec['params'])  # a wrong parameter name fails here, not in a worker
+    if columns is not None and f"{spec['ticker']}.Close" not in columns:
+        raise ValueError(f"Column '{spec['ticker']}.Close' not found in dataframe")
+    spec['initial_capital'] = float(spec['initial_capital'])
+    spec['transaction_cost'] = float(spec['transaction_cost'])
+    return spec
+
+
+def job_id(spec):
+    # identical specs (whatever the key order) get the same id; that is what deduplicates them
+    payload = json.dumps(spec, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(payload, digest_size=8).hexdigest()
+
+
+def run_job(data, spec):
+    """
+    Runs one normalized job on the shared frame (the slice is a view, not a copy).
+    Returns:
+        dict with 'bars' and 'metrics'.
+    """
+    index = data.index.asi8
+    lo = 0 if spec['start'] is None else int(np.searchsorted(index, pd.Timestamp(spec['start']).value, side='left'))
+    hi = len(index) if spec['end'] is None else int(np.searchsorted(index, end_timestamp(spec['end']).value, side='right'))
+    if hi - lo < 2:
+        raise ValueError(f"fewer than two bars between {spec['start']} and {spec['end']}")
+
+    row = run_one(data.iloc[lo:hi], spec['strategy'], spec['params'], spec['ticker'],
+                  spec['initial_capital'], spec['transaction_cost'], spec['engine'])
+    metrics = {k: v for k, v in row.items() if k != 'strategy' and k not in spec['params']}
+    return {'bars': hi - lo, 'metrics': metrics}
+
+
+def _run_task(spec):
+    # runs in a worker process, on the frame attached by sweep._init_worker
+    start = time.perf_counter()
+    out = run_job(_worker['data'], spec)
+    out['seconds'] = time.perf_counter() - start
+    return out
+
+
+def _dumps(message):
+    # metrics can be NaN/inf: Python's json writes and reads them back
+    return (json.dumps(message, default=float) + '\n').encode()
+
+
+class _Job:
+    def __init__(self, job_id, spec):
+        self.id = job_id
+        self.spec = spec
+        self.subscribers = []   # connections that get this job's events
+        self.state = 'queued'
+
+
+class _Connection:
+    def __init__(self, writer):
+        # outgoing messages go through a queue, so a slow client never blocks a dispatcher
+        self.writer = writer
+        self.outbox = asyncio.Queue()
+        self.sender = asyncio.create_task(self._send())
+
+    def send(self, message):
+        self.outbox.put_nowait(message)
+
+    async def _send(self):
+        while True:
+            message = await self.outbox.get()
+            if message is None:
+                break
+            self.writer.write(_dumps(message))
+            await self.writer.drain()
+
+    async def close(self):
+        self.send(None)
+        try:
+            await self.sender
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        self.writer.close()
+
+
+class JobServer:
+    def __init__(self, data, processes=None, max_queue=64, host=HOST, port=PORT):
+        """
+        Args:
+            data (pd.DataFrame): feature frame (numeric columns, date index), shared with
+                the workers.
+            processes (int): worker processes (and jobs run at once); defaults to the CPU count.
+            max_queue (int): jobs waiting for a worker before submits have to wait.
+            host, port: where to listen (port 0 picks a free port, see self.port).
+        """
+        self.data = data
+        self.processes = processes or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.host = host
+        self.port = port
+        self.jobs = {}          # job id -> _Job, while queued or running
+        self.completed = 0
+        self.failed = 0
+        self.deduplicated = 0
+        self._queue = None
+        self._server = None
+        self._shared = None
+        self._pool = None
+        self._dispatchers = []
+        self._handlers = set()  # connection tasks, closed with the server
+
+    async def start(self):
+        self._shared = SharedFrame(self.data)
+        self._pool = ProcessPoolExecutor(max_workers=self.processes, initializer=_init_worker,
+                                         initargs=(self._shared.spec,))
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.processes)]
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=LINE_LIMIT)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for task in list(self._handlers):
+            task.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        for task in self._dispatchers:
+            task.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        self._dispatchers = []
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        if self._shared is not None:
+            self._shared.close()
+            self._shared = None
+
+    def status(self):
+        running = sum(job.state == 'running' for job in self.jobs.values())
+        return {'event': 'status', 'queued': len(self.jobs) - running, 'running': running,
+                'processes': self.processes, 'max_queue': self.max_queue, 'completed': self.completed,
+                'failed': self.failed, 'deduplicated': self.deduplicated,
+                'bars': len(self.data), 'start': str(self.data.index[0]) if len(self.data) else None,
+                'end': str(self.data.index[-1]) if len(self.data) else None}
+
+    async def submit(self, spec, conn, request_id=None):
+        # Queues a normalized job (or attaches to the identical one in flight)
+        jid = job_id(spec)
+        job = self.jobs.get(jid)
+        if job is not None:
+            self.deduplicated += 1
+            if conn not in job.subscribers:
+                job.subscribers.append(conn)
+            conn.send({'event': 'accepted', 'id': request_id, 'job_id': jid, 'deduplicated': True,
+                       'state': job.state, 'position': None if job.state == 'running' else self._queue.qsize()})
+            return
+
+        job = self.jobs[jid] = _Job(jid, spec)
+        job.subscribers.append(conn)
+        # waits while the queue is full: this connection isn't read until there is room
+        try:
+            await self._queue.put(job)
+        except asyncio.CancelledError:
+            del self.jobs[jid]  # never queued: identical submits mustn't wait on it
+            self._publish(job, {'event': 'error', 'job_id': jid, 'error': 'server closing'})
+            raise
+        conn.send({'event': 'accepted', 'id': request_id, 'job_id': jid, 'deduplicated': False,
+                   'state': job.state, 'position': self._queue.qsize() - 1})
+
+    def _publish(self, job, message):
+        for conn in job.subscribers:
+            conn.send(message)
+
+    async def _dispatch(self):
+        # one per worker process: takes the next job, runs it in the pool, streams its events
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            job.state = 'running'
+            self._publish(job, {'event': 'started', 'job_id': job.id})
+            try:
+                out = await loop.run_in_executor(self._pool, _run_task, job.spec)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.failed += 1
+                message = {'event': 'error', 'job_id': job.id, 'error': f'{type(exc).__name__}: {exc}'}
+            else:
+                self.completed += 1
+                message = {'event': 'result', 'job_id': job.id, 'job': job.spec, **out}
+            finally:
+                del self.jobs[job.id]
+            self._publish(job, message)
+
+    async def _handle(self, reader, writer):
+        conn = _Connection(writer)
+        self._handlers.add(asyncio.current_task())
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, ValueError) as exc:
+                    # ValueError: a line longer than LINE_LIMIT
+                    conn.send({'event': 'error', 'error': str(exc)})
+                    break
+                if not line:
+                    break
+                await self._request(line, conn)
+        except asyncio.CancelledError:
+            pass  # the server is closing
+        finally:
+            self._handlers.discard(asyncio.current_task())
+            for job in self.jobs.values():
+                if conn in job.subscribers:
+                    job.subscribers.remove(conn)
+            await conn.close()
+
+    async def _request(self, line, conn):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            op = request.get('op')
+            if op == 'submit':
+                await self.submit(normalize_job(request.get('job'), self.data.columns), conn, request_id)
+            elif op == 'status':
+                conn.send({**self.status(), 'id': request_id})
+            else:
+                raise ValueError(f"op must be 'submit' or 'status', got {op!r}")
+        except (ValueError, TypeError, AttributeError) as exc:
+            conn.send({'event': 'error', 'id': request_id, 'error': f'{type(exc).__name__}: {exc}'})
+
+
+async def serve(data, processes=None, max_queue=64, host=HOST, port=PORT, ready=None):
+    """
+    Runs a JobServer until cancelled (Ctrl-C).
+    Args:
+        ready (callable): called with the started server (e.g. to print its address).
+    """
+    server = await JobServer(data, processes=processes, max_queue=max_queue, host=host, port=port).start()
+    if ready is not None:
+        ready(server)
+    await server.serve_forever()
+
+
+class JobClient:
+    def __init__(self, host=HOST, port=PORT):
+        """
+        Async client: one connection, any number of jobs in flight on it.
+            async with JobClient() as client:
+                result = await client.run({'strategy': 'momentum', 'params': {'lookback': 10}})
+        """
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+        self._next_id = 0
+        self._pending = {}      # request id -> queue of the replies before a job id is known
+        self._streams = {}      # job id -> queues of the submissions waiting on it
+        self._listener = None
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port, limit=LINE_LIMIT)
+        self._listener = asyncio.create_task(self._listen())
+        return self
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _listen(self):
+        # routes every reply to the submission (request id) or job (job id) waiting for it
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            queue = self._pending.pop(message.get('id'), None) if message.get('id') is not None else None
+            if queue is not None:
+                if message.get('event') == 'accepted':
+                    self._streams.setdefault(message['job_id'], []).append(queue)
+                queue.put_nowait(message)
+                continue
+            for queue in self._streams.get(message.get('job_id'), []):
+                queue.put_nowait(message)
+            if message.get('event') in ('result', 'error'):
+                self._streams.pop(message.get('job_id'), None)
+        for queue in list(self._pending.values()) + [q for qs in self._streams.values() for q in qs]:
+            queue.put_nowait({'event': 'error', 'error': 'connection closed by the server'})
+
+    async def _send(self, request):
+        self._next_id += 1
+        request = {**request, 'id': self._next_id}
+        queue = self._pending[self._next_id] = asyncio.Queue()
+        self._writer.write(_dumps(request))
+        await self._writer.drain()
+        return queue
+
+    async def events(self, job):
+        """
+        Submits a job and yields its events (accepted, started, then result or error).
+        """
+        queue = await self._send({'op': 'submit', 'job': job})
+        while True:
+            message = await queue.get()
+            yield message
+            if message.get('event') in ('result', 'error'):
+                return
+
+    async def run(self, job):
+        # Submits a job and returns its result message; raises RuntimeError on an error event
+        async for message in self.events(job):
+            if message['event'] == 'error':
+                raise RuntimeError(message['error'])
+            if message['event'] == 'result':
+                return message
+
+    async def status(self):
+        queue = await self._send({'op': 'status'})
+        return await queue.get()
+
+
+def submit(job, host=HOST, port=PORT, on_event=None):
+    """
+    Blocking helper for scripts: runs one job on a running server and returns its result
+    message. on_event (callable) gets every event as it arrives. In a notebook (which
+    already runs an event loop) use `await JobClient().run(job)` instead.
+    """
+    async def main():
+        async with JobClient(host, port) as client:
+            async for message in client.events(job):
+                if on_event is not None:
+                    on_event(message)
+                if message['event'] == 'error':
+                    raise RuntimeError(message['error'])
+                if message['event'] == 'result':
+                    return message
+
+    return asyncio.run(main())
@@ -0,0 +1,157 @@
+"""
+Position sizing: turns strategy signals into target weights (share of equity per ticker,
+negative = short) that TargetPortfolio rebalances to every bar.
+    - FixedFractional: the same fraction of equity for every open position
+    - VolatilityTarget: each position sized so its annualized volatility hits a target
+    - Kelly: a fraction of the Kelly bet, from the rolling mean and variance of the returns
+      the signal direction would have earned
+All sizers work on whole (time x ticker) arrays; a ticker's weight at a bar only uses
+prices up to that bar's close. The sum of absolute weights (gross leverage) is capped
+at max_leverage by scaling every weight of the bar down.
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    from Strategy.indicators import rolling_mean_std_matrix
+except ModuleNotFoundError:
+    # Allow running this file directly by adding the project root to sys.path
+    import sys
+    from pathlib import Path
+    project_root = Path(__file__).resolve().parents[1]
+    if str(project_root) not in sys.path:
+        sys.path.append(str(project_root))
+    from Strategy.indicators import rolling_mean_std_matrix
+
+
+def _returns(prices):
+    # simple returns of a (time x ticker) price array, NaN on the first bar
+    prices = np.asarray(prices, dtype=np.float64)
+    out = np.full(prices.shape, np.nan)
+    out[1:] = prices[1:] / prices[:-1] - 1
+    return out
+
+
+class Sizer:
+    def __init__(self, allow_short=True, hold=False, max_leverage=1.0):
+        """
+        Args:
+            allow_short (bool): -1 signals open shorts; False turns them into flat (0).
+            hold (bool): treat signals as entry/exit events and keep the last non-zero
+                direction through 0 signals (for strategies like mean reversion that only
+                signal on the bar they enter); False means 0 = flat.
+            max_leverage (float): cap on the sum of absolute weights per bar (1.0 = no
+                leverage, 2.0 = up to twice the equity long + short).
+        """
+        self.allow_short = allow_short
+        self.hold = hold
+        self.max_leverage = max_leverage
+
+    def directions(self, signals):
+        # +1/-1/0 target direction per bar and ticker
+        direction = np.sign(np.nan_to_num(np.asarray(signals, dtype=np.float64)))
+        if self.hold:
+            direction = pd.DataFrame(direction).replace(0.0, np.nan).ffill().fillna(0.0).to_numpy()
+        if not self.allow_short:
+            np.maximum(direction, 0.0, out=direction)
+        return direction
+
+    def sizes(self, direction, prices):
+        # unsigned share of equity per (bar, ticker); subclasses implement this
+        raise NotImplementedError
+
+    def weights(self, signals, prices):
+        """
+        Target weights for every bar.
+        Args:
+            signals (np.ndarray): strategy signals, shape (time,) or (time, tickers).
+            prices (np.ndarray): prices, same shape.
+        Returns:
+            np.ndarray (time, tickers) of signed weights.
+        """
+        signals = np.asarray(signals, dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)
+        if signals.ndim == 1:
+            signals = signals[:, None]
+        if prices.ndim == 1:
+            prices = prices[:, None]
+        direction = self.directions(signals)
+        weights = np.nan_to_num(direction * self.sizes(direction, prices))
+
+        gross = np.abs(weights).sum(axis=1, keepdims=True)
+        over = gross > self.max_leverage
+        if over.any():
+            weights *= np.where(over, self.max_leverage / np.where(over, gross, 1.0), 1.0)
+        return weights
+
+
+class FixedFractional(Sizer):
+    def __init__(self, fraction=1.0, **kwargs):
+        """
+        Every open position gets `fraction` of the equity (e.g. 0.1 = 10% per ticker).
+        Unlike Portfolio.update_positions, which buys once on a +1 and holds until a -1, the
+        position is rebalanced to the fraction on every bar and a 0 signal goes flat (see
+        `hold`), so fraction=1.0 on one ticker trades differently from the default backtest.
+        """
+        super().__init__(**kwargs)
+        self.fraction = fraction
+
+    def sizes(self, direction, prices):
+        return np.full(direction.shape, float(self.fraction))
+
+
+class VolatilityTarget(Sizer):
+    def __init__(self, target=0.10, lookback=20, periods_per_year=252, max_weight=1.0, **kwargs):
+        """
+        weight = target / annualized rolling volatility of the ticker's returns, so quiet
+        tickers get larger positions than volatile ones.
+        Args:
+            target (float): annualized volatility per position (0.10 = 10%).
+            lookback (int): bars in the volatility estimate (no position until it's full).
+            max_weight (float): cap per position.
+        """
+        super().__init__(**kwargs)
+        self.target = target
+        self.lookback = lookback
+        self.periods_per_year = periods_per_year
+        self.max_weight = max_weight
+
+    def sizes(self, direction, prices):
+        _, std = rolling_mean_std_matrix(_returns(prices), [self.lookback])
+        vol = std[0] * np.sqrt(self.periods_per_year)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            size = np.where(vol > 0, self.target / vol, np.nan)
+        return np.minimum(size, self.max_weight)
+
+
+class Kelly(Sizer):
+    def __init__(self, lookback=60, fraction=0.5, max_weight=1.0, **kwargs):
+        """
+        Fractional Kelly sizing: weight = fraction * mean / variance of the returns earned
+        by following the signal (yesterday's direction times today's return) over the last
+        `lookback` bars. Directions with a negative edge get no position.
+        Args:
+            fraction (float): share of the full Kelly bet (0.5 = half Kelly, the usual
+                choice since the estimates are noisy).
+            max_weight (float): cap per position.
+        """
+        super().__init__(**kwargs)
+        self.lookback = lookback
+        self.fraction = fraction
+        self.max_weight = max_weight
+
+    def sizes(self, direction, prices):
+        earned = _returns(prices)
+        earned[1:] *= direction[:-1]
+        means, stds = rolling_mean_std_matrix(earned, [self.lookback])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            kelly = np.where(stds[0] > 0, means[0] / np.square(stds[0]), np.nan)
+        return np.clip(self.fraction * kelly, 0.0, self.max_weight)
+
+
+SIZERS = {
+    'fixed': FixedFractional,
+    'vol_target': VolatilityTarget,
+    'kelly': Kelly,
+}
@@ -0,0 +1,264 @@
+"""
+Parameter sweeps:
+    - expands a parameter grid into one Backtest per combination
+    - shares the feature frame with worker processes through shared memory
+      (each worker attaches once instead of unpickling the frame per task)
+    - collects the compute_all_metrics() output of every run (StreamingMetrics,
+      straight from the TotalValue array without building a PerformanceMetrics frame)
+    - returns one DataFrame ranked by a chosen metric
+    - with the vectorized engine, computes the signals of the whole grid in one
+      batched pass (Strategy.indicators) and only runs execution per combination
+"""
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+try:
+    from Backtester.backtest import Backtest
+except ModuleNotFoundError:
+    # Allow running this file directly by adding the project root to sys.path
+    import sys
+    from pathlib import Path
+    project_root = Path(__file__).resolve().parents[1]
+    if str(project_root) not in sys.path:
+        sys.path.append(str(project_root))
+    from Backtester.backtest import Backtest
+from Backtester.metrics import StreamingMetrics, TRADING_DAYS, infer_periods_per_year
+import Backtester.vectorized as vectorized
+from Strategy.cache import SignalCache
+from Strategy.mean_reversion import BollingerMeanReversionStrategy
+from Strategy.momentum import MomentumStrategy
+from Strategy.moving_average import MovingAverageCrossover
+
+STRATEGIES = {
+    'moving_average': MovingAverageCrossover,
+    'momentum': MomentumStrategy,
+    'mean_reversion': BollingerMeanReversionStrategy,
+}
+
+# Grid keys that configure the Backtest instead of the strategy; sweeping them reuses signals
+RUN_PARAMS = ('initial_capital', 'transaction_cost')
+
+# Signals generated in this process, shared by runs that only differ in RUN_PARAMS
+_signal_cache = SignalCache()
+
+
+def expand_grid(param_grid):
+    """
+    Turns {'short_window': [10, 20], 'long_window': [100, 200]} into the list of
+    every combination as keyword dicts.
+    """
+    names = list(param_grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(param_grid[n] for n in names))]
+
+
+class SharedArray:
+    """
+    NumPy array copied once into a shared memory block.
+    `spec` (block name, shape, dtype) is all a worker needs to map it again.
+    """
+
+    def __init__(self, arr):
+        arr = np.ascontiguousarray(arr)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        block = np.ndarray(arr.shape, dtype=arr.dtype, buffer=self._shm.buf)
+        block[:] = arr
+        self.spec = {'name': self._shm.name, 'shape': arr.shape, 'dtype': arr.dtype.str}
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SharedFrame(SharedArray):
+    """
+    Numeric DataFrame copied once into a shared memory block.
+    Only the small `spec` (block name, shape, columns, index) is sent to workers,
+    which rebuild a DataFrame directly on top of the shared buffer.
+    """
+
+    def __init__(self, df):
+        super().__init__(df.to_numpy(dtype=np.float64))
+        self.spec.update({
+            'columns': list(df.columns),
+            'index': df.index.to_numpy(),
+            'index_name': df.index.name,
+        })
+
+
+def attach_array(spec):
+    """
+    Opens the shared block described by `spec` and returns (shm, ndarray view).
+    Keep the shm handle alive for as long as the array is used.
+    Workers share the parent's resource tracker, and the parent unlinks the block.
+    """
+    shm = shared_memory.SharedMemory(name=spec['name'])
+    return shm, np.ndarray(spec['shape'], dtype=np.dtype(spec['dtype']), buffer=shm.buf)
+
+
+def attach_frame(spec):
+    """Same as attach_array but returns a DataFrame view for a SharedFrame spec."""
+    shm, block = attach_array(spec)
+    index = pd.Index(spec['index'], name=spec['index_name'])
+    return shm, pd.DataFrame(block, index=index, columns=spec['columns'], copy=False)
+
+
+def _split_params(params):
+    # {'window': 20, 'transaction_cost': 0.002} -> ({'window': 20}, {'transaction_cost': 0.002})
+    strategy_params = {k: v for k, v in params.items() if k not in RUN_PARAMS}
+    run_params = {k: v for k, v in params.items() if k in RUN_PARAMS}
+    return strategy_params, run_params
+
+
+def run_one(data, strategy_name, params, ticker, initial_capital, transaction_cost, engine):
+    """
+    Runs one backtest and returns its parameters together with its metrics.
+    `params` may also override initial_capital/transaction_cost; the signals are then
+    taken from the signal cache when the same strategy parameters already ran here.
+    """
+    strategy_params, run_params = _split_params(params)
+    settings = {'initial_capital': initial_capital, 'transaction_cost': transaction_cost, **run_params}
+    strategy = STRATEGIES[strategy_name](**strategy_params)
+    bt = Backtest(data, strategy, ticker=ticker, engine=engine, signal_cache=_signal_cache, **settings)
+    results = bt.run()
+    metrics = StreamingMetrics.from_values(results['TotalValue'].to_numpy(),
+                                           periods_per_year=infer_periods_per_year(data.index)).compute_all_metrics()
+    return {'strategy': strategy_name, **params, **metrics}
+
+
+def run_signals(prices, signals, strategy_name, params, initial_capital, transaction_cost,
+                periods_per_year=TRADING_DAYS):
+    """Runs the vectorized engine on precomputed signals (batched sweeps)."""
+    sim = vectorized.simulate(prices, signals, initial_capital=initial_capital, transaction_cost=transaction_cost)
+    metrics = StreamingMetrics.from_values(sim.total_value, periods_per_year=periods_per_year).compute_all_metrics()
+    return {'strategy': strategy_name, **params, **metrics}
+
+
+# Per-worker state, set once by the pool initializers
+_worker = {}
+
+
+def _init_worker(spec):
+    _worker['shm'], _worker['data'] = attach_frame(spec)
+
+
+def _run_task(task):
+    return run_one(_worker['data'], *task)
+
+
+def _init_batched_worker(frame_spec, signals_spec):
+    _worker['shm'], _worker['data'] = attach_frame(frame_spec)
+    _worker['signals_shm'], _worker['signals'] = attach_array(signals_spec)
+
+
+def _run_batched_task(task):
+    row, strategy_name, params, initial_capital, transaction_cost, periods_per_year = task
+    data = _worker['data']
+    return run_signals(data.iloc[:, 0].to_numpy(), _worker['signals'][row],
+                       strategy_name, params, initial_capital, transaction_cost, periods_per_year)
+
+
+def _signal_grid(data, strategy, param_grid, price_col):
+    # Precomputes every combination's signals with the strategy's batched indicator path.
+    # Returns (combos, rows, signals) or None when the grid can't use it.
+    cls = STRATEGIES[strategy]
+    if not hasattr(cls, 'generate_signal_grid'):
+        return None
+    params, signals = cls.generate_signal_grid(data, price_col, param_grid)
+    if not params or not set(param_grid) <= set(params[0]):
+        return None  # grid has parameters the batched path doesn't know about
+    row_of = {tuple(sorted(p.items())): i for i, p in enumerate(params)}
+    combos = expand_grid(param_grid)
+    rows = [row_of[tuple(sorted({**params[0], **c}.items()))] for c in combos]
+    return combos, rows, signals
+
+
+def _chunksize(n_tasks, processes):
+    return max(1, n_tasks // (processes * 4))
+
+
+def _sweep_batched(prices, strategy, grid, run_combos, initial_capital, transaction_cost, processes):
+    # one task per (strategy combination, run combination); all runs of a combination share its signal row
+    combos, rows, signals = grid
+    periods_per_year = infer_periods_per_year(prices.index)
+    tasks = []
+    for row, params in zip(rows, combos):
+        for run_params in run_combos:
+            settings = {'initial_capital': initial_capital, 'transaction_cost': transaction_cost, **run_params}
+            tasks.append((row, strategy, {**params, **run_params}, settings['initial_capital'],
+                          settings['transaction_cost'], periods_per_year))
+
+    if processes == 1 or len(tasks) <= 1:
+        price = prices.iloc[:, 0].to_numpy(dtype=float)
+        return [run_signals(price, signals[row], *rest) for row, *rest in tasks]
+
+    with SharedFrame(prices) as shared_prices, SharedArray(signals) as shared_signals:
+        with ProcessPoolExecutor(max_workers=min(processes, len(tasks)), initializer=_init_batched_worker,
+                                 initargs=(shared_prices.spec, shared_signals.spec)) as pool:
+            return list(pool.map(_run_batched_task, tasks, chunksize=_chunksize(len(tasks), processes)))
+
+
+def run_sweep(data, strategy, param_grid, ticker='EURUSD=X', initial_capital=100000, transaction_cost=0.001,
+              engine='vectorized', processes=None, rank_by='Sharpe Ratio', ascending=False, batched=True):
+    """
+    Runs one backtest per parameter combination and ranks the results.
+    Args:
+        data (pd.DataFrame): feature frame (numeric columns, date index).
+        strategy (str): one of STRATEGIES.
+        param_grid (dict): parameter name -> list of values, e.g. {'lookback': [10, 20, 40]}.
+            'initial_capital' and 'transaction_cost' can be swept too; their runs reuse the
+            signals of the same strategy parameters.
+        engine (str): Backtest engine used for every run.
+        processes (int): worker processes; None uses os.cpu_count(), 1 runs in this process.
+        rank_by (str): metric column used for ranking.
+        ascending (bool): rank smallest first (e.g. for 'Volatility (Annualized)').
+        batched (bool): with the vectorized engine, compute the signals of the whole grid at
+            once (Strategy.indicators) so workers only run the execution engine.
+    Returns:
+        pd.DataFrame with one row per combination, best first, and a 'Rank' column.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"strategy must be one of {list(STRATEGIES)}, got '{strategy}'")
+    price_col = f'{ticker}.Close'
+    if price_col not in data.columns:
+        raise ValueError(f"Column '{price_col}' not found in dataframe")
+
+    processes = processes or os.cpu_count() or 1
+
+    strategy_grid, run_grid = _split_params(param_grid)
+    run_combos = expand_grid(run_grid)
+
+    grid = _signal_grid(data, strategy, strategy_grid, price_col) if batched and engine == 'vectorized' else None
+    if grid is not None:
+        rows = _sweep_batched(data[[price_col]], strategy, grid, run_combos, initial_capital, transaction_cost,
+                              processes)
+    else:
+        # run combinations innermost, so the runs sharing signals land in the same worker chunk
+        tasks = [(strategy, {**params, **run_params}, ticker, initial_capital, transaction_cost, engine)
+                 for params in expand_grid(strategy_grid) for run_params in run_combos]
+        if processes == 1 or len(tasks) <= 1:
+            rows = [run_one(data, *task) for task in tasks]
+        else:
+            with SharedFrame(data) as shared:
+                with ProcessPoolExecutor(max_workers=min(processes, len(tasks)),
+                                         initializer=_init_worker, initargs=(shared.spec,)) as pool:
+                    rows = list(pool.map(_run_task, tasks, chunksize=_chunksize(len(tasks), processes)))
+
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return df
+    df = df.sort_values(rank_by, ascending=ascending, na_position='last', kind='stable').reset_index(drop=True)
+    df.insert(0, 'Rank', np.arange(1, len(df) + 1))
+    return df
+
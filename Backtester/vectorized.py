@@ -0,0 +1,125 @@
+"""
+Vectorized execution engine:
+    - resolves buys/sells from a signal array without walking every bar in Python
+    - only visits the bars where the portfolio state actually changes (trades)
+    - rebuilds cash, units and TotalValue for every bar with NumPy array ops
+
+It follows the exact rules of Portfolio.update_positions (all-in buys on +1,
+full exits on -1, flat transaction cost) so its equity curve and trade log
+match the iterrows loop in Backtest.run bar for bar.
+"""
+
+import numpy as np
+
+_SEARCH_BLOCK = 1024  # how many candidate bars to test at once when looking ahead
+
+
+class VectorizedResult:
+    """
+    Output of simulate().
+        - cash, units, total_value: one value per bar (after that bar's trade)
+        - trades: list of (bar_index, side, units, price, amount, remaining)
+          where side is 'BUY' or 'SELL' and amount is the cost or the revenue.
+    """
+
+    def __init__(self, cash, units, total_value, trades):
+        self.cash = cash
+        self.units = units
+        self.total_value = total_value
+        self.trades = trades
+
+
+def _next_affordable(buy_idx, buy_thresh, k, stop, cash):
+    # Returns the position (in buy_idx) of the first buy candidate in [k, stop)
+    # whose price incl. costs is <= cash, or stop if there is none.
+    # Candidates are scanned in blocks so one lookup never touches the whole array.
+    while k < stop:
+        end = min(k + _SEARCH_BLOCK, stop)
+        hits = np.flatnonzero(buy_thresh[k:end] <= cash)
+        if hits.size:
+            return k + int(hits[0])
+        k = end
+    return stop
+
+
+def simulate(prices, signals, initial_capital=100000, transaction_cost=0.001, initial_units=0):
+    """
+    Runs the Portfolio trading rules over whole arrays.
+    Args:
+        prices (array-like): price per bar.
+        signals (array-like): +1 = buy, -1 = sell, anything else = hold.
+        initial_capital (float): starting cash.
+        transaction_cost (float): cost per trade (e.g., 0.001 = 0.1%)
+        initial_units (int): units already held before the first bar (to continue a run
+            block by block, with initial_capital = the cash left by the previous block).
+    Returns:
+        VectorizedResult
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    signals = np.asarray(signals)
+    n = len(prices)
+
+    buy_idx = np.flatnonzero(signals == 1)
+    sell_idx = np.flatnonzero(signals == -1)
+    # price per unit including the buy-side cost; a buy can only fill if this is <= cash
+    buy_thresh = prices[buy_idx] * (1 + transaction_cost)
+
+    cash = initial_capital
+    units = int(initial_units)
+    event_bars, event_cash, event_units = [], [], []
+    trades = []
+
+    t = 0  # first bar that has not been processed yet
+    while True:
+        k = np.searchsorted(buy_idx, t)
+        if units == 0:
+            # flat: sells are no-ops, so the next event is the first affordable buy
+            next_sell = n
+            stop = len(buy_idx)
+        else:
+            # long: the next event is either a top-up buy or the next sell
+            s = np.searchsorted(sell_idx, t)
+            next_sell = int(sell_idx[s]) if s < len(sell_idx) else n
+            stop = np.searchsorted(buy_idx, next_sell)
+
+        k = _next_affordable(buy_idx, buy_thresh, k, stop, cash)
+
+        if k < stop:
+            i = int(buy_idx[k])
+            price = prices[i]
+            t = i + 1
+            # same expressions as Portfolio.update_positions so the floats are identical
+            new_units = int(cash // (price * (1 + transaction_cost)))
+            if new_units <= 0:
+                continue
+            cost = new_units * price * (1 + transaction_cost)
+            cash -= cost
+            units += new_units
+            trades.append((i, 'BUY', new_units, price, cost, cash))
+        elif next_sell < n:
+            i = next_sell
+            price = prices[i]
+            t = i + 1
+            revenue = units * price * (1 - transaction_cost)
+            cash += revenue
+            trades.append((i, 'SELL', units, price, revenue, cash))
+            units = 0
+        else:
+            break
+
+        event_bars.append(i)
+        event_cash.append(cash)
+        event_units.append(units)
+
+    # Forward-fill the state from each event to every bar: bar t uses the last event <= t
+    event_bars = np.asarray(event_bars, dtype=np.int64)
+    slot = np.searchsorted(event_bars, np.arange(n), side='right') - 1
+    # index -1 (bars before the first trade) picks the appended initial state
+    cash_arr = np.asarray(event_cash + [initial_capital], dtype=np.float64)[slot]
+    units_arr = np.asarray(event_units + [int(initial_units)], dtype=np.int64)[slot]
+
+    # Portfolio.total_value: cash + price * units for an open position, cash otherwise
+    holding = np.where(units_arr > 0, prices * units_arr, 0.0)
+    total_value = cash_arr + holding
+
+    return VectorizedResult(cash_arr, units_arr, total_value, trades)
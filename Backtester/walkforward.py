@@ -0,0 +1,245 @@
+"""
+Walk-forward optimization:
+    - splits the date index into rolling (fixed length) or anchored (expanding)
+      train windows, each followed by a test window
+    - on every train window, picks the best parameter combination of the grid by a metric
+    - runs the winner on the following test window (out of sample)
+    - stitches the test windows into one out-of-sample equity curve
+
+The signals of every candidate are computed once over the whole history (batched
+indicators where the strategy has them) and shared with the fold workers through
+shared memory, so folds only pay for trade execution. Indicators are causal, so a
+slice of the full-history signals is what the strategy would have produced at the
+time, with the indicators already warmed up at the start of each window.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+try:
+    from Backtester.sweep import STRATEGIES, RUN_PARAMS, SharedArray, attach_array, expand_grid, _signal_grid
+except ModuleNotFoundError:
+    # Allow running this file directly by adding the project root to sys.path
+    import sys
+    from pathlib import Path
+    project_root = Path(__file__).resolve().parents[1]
+    if str(project_root) not in sys.path:
+        sys.path.append(str(project_root))
+    from Backtester.sweep import STRATEGIES, RUN_PARAMS, SharedArray, attach_array, expand_grid, _signal_grid
+from Backtester.metrics import StreamingMetrics, TRADING_DAYS, infer_periods_per_year
+import Backtester.vectorized as vectorized
+from Strategy.base import signal_array
+
+
+class Fold:
+    """One train/test split, as bar positions: train = [train_start, train_end), test = [test_start, test_end)."""
+
+    def __init__(self, number, train_start, train_end, test_start, test_end):
+        self.number = number
+        self.train_start = train_start
+        self.train_end = train_end
+        self.test_start = test_start
+        self.test_end = test_end
+
+    def __repr__(self):
+        return (f'Fold({self.number}, train=[{self.train_start}, {self.train_end}), '
+                f'test=[{self.test_start}, {self.test_end}))')
+
+
+class WalkForwardResult:
+    """
+    Output of walk_forward().
+        - equity: DataFrame with the stitched out-of-sample 'TotalValue' and the 'Fold'
+          each bar came from (same shape as Backtest.run output, plus 'Fold')
+        - folds: one row per fold with its windows, the chosen parameters, the
+          in-sample score and the out-of-sample metrics
+    """
+
+    def __init__(self, equity, folds):
+        self.equity = equity
+        self.folds = folds
+
+
+def _window_length(index, start, size):
+    # end position of a window of `size` bars (int) or of a pandas offset such as '365D' or '2YS'
+    if isinstance(size, (int, np.integer)):
+        return start + int(size)
+    return int(index.searchsorted(index[start] + to_offset(size), side='left'))
+
+
+def split_windows(index, train, test, step=None, anchored=False):
+    """
+    Splits a date index into consecutive train/test folds.
+    Args:
+        index (pd.DatetimeIndex): bar dates.
+        train: train window length, in bars (int) or as a pandas offset ('730D', '2YS', ...).
+        test: test window length, same units as train.
+        step: how far each fold moves forward, at least test (so test windows don't overlap);
+            defaults to test. A larger step leaves gaps between the test windows.
+        anchored (bool): keep every train window starting at the first bar (expanding
+            window) instead of rolling a fixed-length one.
+    Returns:
+        list of Fold; the last test window is cut at the end of the data.
+    """
+    n = len(index)
+    step = test if step is None else step
+    if n and _window_length(index, 0, step) < _window_length(index, 0, test):
+        raise ValueError("step must be at least the test window, so test windows don't overlap")
+    folds = []
+    train_start = 0
+    train_end = _window_length(index, 0, train)
+    while train_end < n:
+        test_end = min(_window_length(index, train_end, test), n)
+        folds.append(Fold(len(folds), 0 if anchored else train_start, train_end, train_end, test_end))
+        if test_end >= n:
+            break
+        next_end = _window_length(index, train_end, step)
+        if next_end <= train_end:
+            raise ValueError("step must move the windows forward by at least one bar")
+        if not anchored:
+            # roll the start by the same number of bars the end moved
+            train_start += next_end - train_end
+        train_end = next_end
+    return folds
+
+
+def candidate_signals(data, strategy, param_grid, price_col):
+    """
+    Signals of every parameter combination over the whole history.
+    Uses the strategy's batched generate_signal_grid when the grid allows it, else
+    the strategy's own signals once per combination.
+    Returns:
+        (combos, signals): list of param dicts and an int8 array (len(combos), len(data)).
+    """
+    grid = _signal_grid(data, strategy, param_grid, price_col)
+    if grid is not None:
+        combos, rows, signals = grid
+        return combos, np.ascontiguousarray(signals[rows], dtype=np.int8)
+
+    combos = expand_grid(param_grid)
+    signals = np.empty((len(combos), len(data)), dtype=np.int8)
+    for i, params in enumerate(combos):
+        signals[i] = signal_array(STRATEGIES[strategy](**params), data, price_col)
+    return combos, signals
+
+
+def _score(prices, signals, initial_capital, transaction_cost, rank_by, periods_per_year):
+    sim = vectorized.simulate(prices, signals, initial_capital=initial_capital, transaction_cost=transaction_cost)
+    metrics = StreamingMetrics.from_values(sim.total_value, periods_per_year=periods_per_year).compute_all_metrics()
+    return sim.total_value, metrics[rank_by]
+
+
+def run_fold(prices, signals, fold, initial_capital, transaction_cost, rank_by='Sharpe Ratio', ascending=False,
+             periods_per_year=TRADING_DAYS):
+    """
+    Optimizes on the fold's train window and runs the winner on its test window.
+    Every window starts flat with initial_capital.
+    Args:
+        prices (np.ndarray): price per bar (whole history).
+        signals (np.ndarray): candidate signals, shape (n_candidates, n_bars).
+        periods_per_year (float): annualization of the ranking metric (bars per year).
+    Returns:
+        (row of the best candidate, its train score, test TotalValue array)
+    """
+    train = slice(fold.train_start, fold.train_end)
+    scores = np.array([_score(prices[train], s[train], initial_capital, transaction_cost, rank_by, periods_per_year)[1]
+                       for s in signals], dtype=float)
+    if np.isnan(scores).all():
+        best = 0
+    else:
+        # NaN scores (e.g. no trades) never win
+        best = int(np.nanargmin(scores) if ascending else np.nanargmax(scores))
+
+    test = slice(fold.test_start, fold.test_end)
+    test_values, _ = _score(prices[test], signals[best][test], initial_capital, transaction_cost, rank_by,
+                            periods_per_year)
+    return best, scores[best], test_values
+
+
+# Per-worker state, set once by the pool initializer
+_worker = {}
+
+
+def _init_worker(prices_spec, signals_spec):
+    _worker['prices_shm'], _worker['prices'] = attach_array(prices_spec)
+    _worker['signals_shm'], _worker['signals'] = attach_array(signals_spec)
+
+
+def _run_fold_task(task):
+    return run_fold(_worker['prices'], _worker['signals'], *task)
+
+
+def walk_forward(data, strategy, param_grid, train, test, step=None, anchored=False, ticker='EURUSD=X',
+                 initial_capital=100000, transaction_cost=0.001, rank_by='Sharpe Ratio', ascending=False,
+                 processes=None):
+    """
+    Walk-forward optimization of one strategy over a parameter grid.
+    Args:
+        data (pd.DataFrame): feature frame with a date index.
+        strategy (str): one of Backtester.sweep.STRATEGIES.
+        param_grid (dict): parameter name -> list of candidate values.
+        train, test, step, anchored: window layout, see split_windows.
+        rank_by (str): metric (a compute_all_metrics key) that picks the winner on each train window.
+        ascending (bool): smaller is better (e.g. for 'Volatility (Annualized)').
+        processes (int): worker processes for the folds; None uses os.cpu_count(), 1 runs here.
+    Returns:
+        WalkForwardResult. The stitched equity compounds the test windows: each window is
+        run from initial_capital and its returns are chained onto the previous window's end value.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"strategy must be one of {list(STRATEGIES)}, got '{strategy}'")
+    if set(param_grid) & set(RUN_PARAMS):
+        raise ValueError(f"walk-forward optimizes strategy parameters only; pass {RUN_PARAMS} as arguments")
+    price_col = f'{ticker}.Close'
+    if price_col not in data.columns:
+        raise ValueError(f"Column '{price_col}' not found in dataframe")
+    if rank_by not in StreamingMetrics().compute_all_metrics():
+        raise ValueError(f"Unknown metric '{rank_by}'")
+
+    folds = split_windows(data.index, train, test, step=step, anchored=anchored)
+    if not folds:
+        raise ValueError("not enough data for one train window plus a test window")
+
+    prices = data[price_col].to_numpy(dtype=float)
+    combos, signals = candidate_signals(data, strategy, param_grid, price_col)
+
+    periods_per_year = infer_periods_per_year(data.index)
+    processes = processes or os.cpu_count() or 1
+    tasks = [(fold, initial_capital, transaction_cost, rank_by, ascending, periods_per_year) for fold in folds]
+    if processes == 1 or len(folds) == 1:
+        outcomes = [run_fold(prices, signals, *task) for task in tasks]
+    else:
+        with SharedArray(prices) as shared_prices, SharedArray(signals) as shared_signals:
+            with ProcessPoolExecutor(max_workers=min(processes, len(folds)), initializer=_init_worker,
+                                     initargs=(shared_prices.spec, shared_signals.spec)) as pool:
+                outcomes = list(pool.map(_run_fold_task, tasks))
+
+    # Stitch: chain each test window's growth onto the end value of the one before
+    index = data.index
+    pieces, fold_ids, rows = [], [], []
+    level = float(initial_capital)
+    for fold, (best, score, values) in zip(folds, outcomes):
+        pieces.append(values * (level / initial_capital))
+        fold_ids.append(np.full(len(values), fold.number))
+        test_metrics = StreamingMetrics.from_values(values, periods_per_year=periods_per_year).compute_all_metrics()
+        level = float(pieces[-1][-1])
+        rows.append({
+            'Fold': fold.number,
+            'Train Start': index[fold.train_start],
+            'Train End': index[fold.train_end - 1],
+            'Test Start': index[fold.test_start],
+            'Test End': index[fold.test_end - 1],
+            **combos[best],
+            f'Train {rank_by}': score,
+            **{f'Test {k}': v for k, v in test_metrics.items()},
+        })
+
+    positions = np.concatenate([np.arange(f.test_start, f.test_end) for f in folds])
+    equity = pd.DataFrame({'TotalValue': np.concatenate(pieces), 'Fold': np.concatenate(fold_ids)},
+                          index=index[positions])
+    equity.index.name = 'Date'
+    return WalkForwardResult(equity, pd.DataFrame(rows))
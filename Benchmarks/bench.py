@@ -0,0 +1,405 @@
+"""
+Benchmarks for the backtest hot paths.
+
+Times (best of --repeat) and measures peak traced memory (tracemalloc) of:
+    - Backtest.run, with the loop and the vectorized engine
+    - order matching (Backtester.execution) against a book of 20k resting limit orders
+    - each strategy's generate_signals (DataFrame API) and signal_array (NumPy protocol)
+    - minute -> hourly OHLCV resampling (Data.resample) and an hourly-signal MA crossover
+    - Portfolio.update_positions + record_daily_value over every bar
+    - PerformanceMetrics.compute_all_metrics
+    - a 9-sleeve risk-parity ensemble (Backtester.ensemble), rebalanced every day
+    - Reports.reporting plotting (equity curve + drawdown), through pyplot and through
+      the downsampling ReportRenderer
+on synthetic price series of 1k to 10M bars, and saves the results as JSON.
+
+`startup` times fresh `python main.py ...` processes (help screens, metrics-only and
+full runs on the bundled data) against a wall-time target per mode.
+
+Usage:
+    python -m Benchmarks.bench run --sizes 1000 100000 --out Benchmarks/results/baseline.json
+    python -m Benchmarks.bench compare Benchmarks/results/baseline.json Benchmarks/results/new.json --threshold 0.1
+    python -m Benchmarks.bench startup
+
+`compare` exits with status 1 when a benchmark got slower (or used more memory) than
+the threshold allows, and `startup` when a mode misses its target, so both can gate a CI job.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import matplotlib
+matplotlib.use('Agg')  # no display needed when plotting headless
+
+import numpy as np
+import pandas as pd
+
+try:
+    from Backtester.backtest import Backtest
+except ModuleNotFoundError:
+    # Allow running this file directly by adding the project root to sys.path
+    from pathlib import Path
+    project_root = Path(__file__).resolve().parents[1]
+    if str(project_root) not in sys.path:
+        sys.path.append(str(project_root))
+    from Backtester.backtest import Backtest
+from Backtester.ensemble import Ensemble, Sleeve
+from Backtester.execution import Broker, LIMIT
+from Backtester.metrics import PerformanceMetrics
+from Backtester.portfolio import Portfolio
+from Data.resample import Resampler
+from Strategy.base import signal_array
+from Strategy.mean_reversion import BollingerMeanReversionStrategy
+from Strategy.momentum import MomentumStrategy
+from Strategy.moving_average import MovingAverageCrossover
+from Strategy.timeframe import HigherTimeframe
+
+TICKER = 'SYN'
+PRICE_COL = f'{TICKER}.Close'
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+
+# Benchmarks that walk every bar in Python are capped so a full run stays in minutes
+# (--no_caps removes the caps)
+SIZE_CAPS = {
+    'backtest_run[loop]': 1_000_000,
+    'portfolio_update': 1_000_000,
+    'order_matching': 1_000_000,
+    'reporting_plots': 1_000_000,
+}
+
+
+# CLI modes timed by `startup`: name -> (main.py arguments, target wall seconds).
+# {out} is a scratch folder; the run modes come first so report has a run to read.
+# Help screens only pay for argparse; --no_plots modes never import matplotlib.
+STARTUP_CASES = {
+    'help': (['--help'], 0.15),
+    'run --help': (['run', '--help'], 0.15),
+    'sweep --help': (['sweep', '--help'], 0.15),
+    'report --help': (['report', '--help'], 0.15),
+    'run --no_plots': (['run', '--no_plots', '--outdir', '{out}'], 1.0),
+    'run': (['run', '--outdir', '{out}'], 3.0),
+    'report --no_plots': (['report', '--no_plots', '--results', '{out}/results_timeseries.csv'], 1.0),
+}
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+
+
+def synthetic_prices(n_bars, seed=0):
+    # Geometric random walk around 1.10 on a minute index (FX-like)
+    rng = np.random.default_rng(seed)
+    prices = 1.10 * np.exp(np.cumsum(rng.normal(0, 0.0005, n_bars)))
+    index = pd.date_range('2000-01-03', periods=n_bars, freq='min', name='Date.')
+    return pd.DataFrame({PRICE_COL: prices}, index=index)
+
+
+def _signals(data):
+    return MovingAverageCrossover(short_window=50, long_window=200).generate_signals(data, price_col=PRICE_COL)[
+        f'{PRICE_COL}_Signal'].to_numpy()
+
+
+def _results(data):
+    return Backtest(data, MomentumStrategy(), ticker=TICKER, engine='vectorized').run()
+
+
+# Each benchmark: name -> (setup(data) -> state, fn(data, state)).
+# Only fn is measured.
+def _bench_backtest(engine):
+    return (lambda data: None,
+            lambda data, _: Backtest(data, MovingAverageCrossover(50, 200), ticker=TICKER, engine=engine).run())
+
+
+def _bench_signals(strategy_cls):
+    return (lambda data: strategy_cls(),
+            lambda data, strategy: strategy.generate_signals(data, price_col=PRICE_COL))
+
+
+def _bench_signal_array(strategy_cls):
+    return (lambda data: strategy_cls(),
+            lambda data, strategy: signal_array(strategy, data, PRICE_COL))
+
+
+def _portfolio_setup(data):
+    return list(data.index), data[PRICE_COL].to_numpy().tolist(), _signals(data).tolist()
+
+
+def _portfolio_run(data, state):
+    dates, prices, signals = state
+    pf = Portfolio()
+    for date, price, signal in zip(dates, prices, signals):
+        pf.update_positions(date, TICKER, signal, price)
+        pf.record_daily_value(date, {TICKER: price})
+    return pf.get_history()
+
+
+def _resample_run(data, _):
+    frame = pd.DataFrame({f'{TICKER}.{field}': data[PRICE_COL].to_numpy() for field in ('Open', 'High', 'Low', 'Close')},
+                         index=data.index)
+    return Resampler(data.index, 'h').ohlcv(frame)
+
+
+def _orders_setup(data):
+    prices = data[PRICE_COL].to_numpy()
+    return prices.tolist(), list(data.index)
+
+
+def _orders_run(data, state):
+    # 10k resting buy limits and 10k sell limits spread around the path's price range;
+    # every bar matches against the book (bar high/low = close +- 0.05%)
+    prices, dates = state
+    pf = Portfolio(initial_capital=1e12, transaction_cost=0.0)
+    broker = Broker(pf)
+    rng = np.random.default_rng(0)
+    lo, hi = min(prices), max(prices)
+    for side, levels in ((1, rng.uniform(lo, hi, 10_000)), (-1, rng.uniform(lo, hi, 10_000))):
+        for price in levels:
+            broker.submit(dates[0], TICKER, side, 1, kind=LIMIT, price=float(price))
+    pf.positions[TICKER] = 10_000  # so the sell limits have units to fill
+    for date, price in zip(dates, prices):
+        broker.process_bar(date, TICKER, price, price * 1.0005, price * 0.9995)
+    return pf
+
+
+def _ensemble_setup(data):
+    # three parameter sets of each strategy; each class shares one batched indicator pass
+    strategies = [MovingAverageCrossover(s, l) for s, l in ((10, 50), (20, 100), (50, 200))] + \
+                 [MomentumStrategy(lb) for lb in (20, 60, 120)] + \
+                 [BollingerMeanReversionStrategy(w, k) for w, k in ((20, 2.0), (40, 2.0), (20, 2.5))]
+    return [Sleeve(strategy, ticker=TICKER) for strategy in strategies]
+
+
+def _ensemble_run(data, sleeves):
+    return Ensemble(sleeves, allocator='risk_parity', rebalance='D').run(data)
+
+
+def _plots_run(data, results):
+    import matplotlib.pyplot as plt
+    from Reports.reporting import plot_equity_curve, plot_drawdown
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plot_equity_curve(results, save_path=os.path.join(tmp, 'equity_curve.png'))
+        plot_drawdown(results, save_path=os.path.join(tmp, 'drawdown.png'))
+    plt.close('all')
+
+
+def _renderer_run(data, results):
+    from Reports.reporting import ReportRenderer
+
+    renderer = ReportRenderer()
+    with tempfile.TemporaryDirectory() as tmp:
+        renderer.render(results, tmp)
+
+
+BENCHMARKS = {
+    'backtest_run[loop]': _bench_backtest('loop'),
+    'backtest_run[vectorized]': _bench_backtest('vectorized'),
+    'generate_signals[moving_average]': _bench_signals(MovingAverageCrossover),
+    'generate_signals[momentum]': _bench_signals(MomentumStrategy),
+    'generate_signals[mean_reversion]': _bench_signals(BollingerMeanReversionStrategy),
+    'signal_array[moving_average]': _bench_signal_array(MovingAverageCrossover),
+    'signal_array[mean_reversion]': _bench_signal_array(BollingerMeanReversionStrategy),
+    'portfolio_update': (_portfolio_setup, _portfolio_run),
+    'resample_ohlcv[1h]': (lambda data: None, _resample_run),
+    'generate_signals[1h moving_average]': _bench_signals(lambda: HigherTimeframe(MovingAverageCrossover(), 'h')),
+    'order_matching': (_orders_setup, _orders_run),
+    'ensemble[risk_parity]': (_ensemble_setup, _ensemble_run),
+    'metrics_compute_all': (_results, lambda data, results: PerformanceMetrics(results).compute_all_metrics()),
+    'reporting_plots': (_results, _plots_run),
+    'reporting_renderer': (_results, _renderer_run),
+}
+
+
+def measure(fn, data, state, repeat):
+    """
+    Returns (best wall seconds over `repeat` runs, peak traced bytes of one extra run).
+    Memory is measured separately because tracemalloc slows the code down.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn(data, state)
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn(data, state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run_benchmarks(sizes, names=None, repeat=3, caps=True, seed=0, log=print):
+    """
+    Runs the selected benchmarks for every size.
+    Returns:
+        dict with 'meta' (versions, time) and 'results' (one entry per benchmark and size).
+    """
+    names = names or list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks {unknown}; choose from {list(BENCHMARKS)}")
+
+    results = []
+    for n_bars in sizes:
+        data = synthetic_prices(n_bars, seed=seed)
+        for name in names:
+            if caps and n_bars > SIZE_CAPS.get(name, float('inf')):
+                log(f'{name:<36} {n_bars:>10,} bars  skipped (cap {SIZE_CAPS[name]:,})')
+                continue
+            setup, fn = BENCHMARKS[name]
+            state = setup(data)
+            seconds, peak = measure(fn, data, state, repeat)
+            results.append({'name': name, 'bars': n_bars, 'seconds': seconds, 'peak_bytes': peak,
+                            'bars_per_sec': n_bars / seconds if seconds else None})
+            log(f'{name:<36} {n_bars:>10,} bars  {seconds:10.4f} s  {peak / 1024 ** 2:10.1f} MiB')
+
+    meta = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'seed': seed,
+    }
+    return {'meta': meta, 'results': results}
+
+
+def measure_startup(repeat=5, scale=1.0, log=print):
+    """
+    Times each STARTUP_CASES mode as a fresh process (best of `repeat`).
+    Args:
+        scale (float): multiplies every target (for slower machines).
+    Returns:
+        (list of result dicts, list of modes over their target)
+    """
+    results, misses = [], []
+    with tempfile.TemporaryDirectory() as out:
+        for name, (argv, target) in STARTUP_CASES.items():
+            cmd = [sys.executable, MAIN] + [a.format(out=out) for a in argv]
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, cwd=os.path.dirname(MAIN))
+                best = min(best, time.perf_counter() - start)
+            target *= scale
+            ok = best <= target
+            results.append({'name': name, 'seconds': best, 'target': target, 'ok': ok})
+            if not ok:
+                misses.append(f'{name}: {best:.3f} s > {target:.3f} s')
+            log(f'{name:<24} {best:8.3f} s   target {target:6.2f} s   {"ok" if ok else "MISSED"}')
+    return results, misses
+
+
+def compare(baseline, current, threshold=0.10, mem_threshold=None):
+    """
+    Compares two result files entry by entry (same benchmark and size).
+    Args:
+        threshold (float): allowed relative slowdown, e.g. 0.10 = 10%.
+        mem_threshold (float): allowed relative growth of peak memory; defaults to threshold.
+    Returns:
+        (pd.DataFrame of all matched entries, list of regression descriptions)
+    """
+    mem_threshold = threshold if mem_threshold is None else mem_threshold
+    base = {(r['name'], r['bars']): r for r in baseline['results']}
+    rows, regressions = [], []
+    for r in current['results']:
+        b = base.get((r['name'], r['bars']))
+        if b is None:
+            continue
+        time_ratio = r['seconds'] / b['seconds'] if b['seconds'] else float('inf')
+        mem_ratio = r['peak_bytes'] / b['peak_bytes'] if b['peak_bytes'] else float('inf')
+        status = []
+        if time_ratio > 1 + threshold:
+            status.append('SLOWER')
+            regressions.append(f"{r['name']} @ {r['bars']:,} bars: {time_ratio:.2f}x time")
+        if mem_ratio > 1 + mem_threshold:
+            status.append('MORE MEMORY')
+            regressions.append(f"{r['name']} @ {r['bars']:,} bars: {mem_ratio:.2f}x peak memory")
+        rows.append({
+            'benchmark': r['name'],
+            'bars': r['bars'],
+            'base_s': b['seconds'],
+            'new_s': r['seconds'],
+            'time_ratio': time_ratio,
+            'mem_ratio': mem_ratio,
+            'status': ', '.join(status) or 'ok',
+        })
+    return pd.DataFrame(rows), regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the backtest hot paths")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks and save the results as JSON")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Number of bars per series")
+    run_parser.add_argument("--only", type=str, nargs="+", default=None, choices=list(BENCHMARKS), help="Subset of benchmarks")
+    run_parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions (best is kept)")
+    run_parser.add_argument("--no_caps", action="store_true", help="Also run the per-bar Python paths on the largest sizes")
+    run_parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic prices")
+    run_parser.add_argument("--out", type=str, required=True, help="JSON file to write")
+
+    cmp_parser = subparsers.add_parser("compare", help="Flag regressions between two result files")
+    cmp_parser.add_argument("baseline", type=str)
+    cmp_parser.add_argument("current", type=str)
+    cmp_parser.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown (0.10 = 10%%)")
+    cmp_parser.add_argument("--mem_threshold", type=float, default=None, help="Allowed peak memory growth; defaults to --threshold")
+
+    startup_parser = subparsers.add_parser("startup", help="Time CLI startup per mode against its target")
+    startup_parser.add_argument("--repeat", type=int, default=5, help="Runs per mode (best is kept)")
+    startup_parser.add_argument("--scale", type=float, default=1.0, help="Multiply every target (slower machines)")
+    startup_parser.add_argument("--out", type=str, default=None, help="Also save the timings as JSON")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "startup":
+        results, misses = measure_startup(repeat=args.repeat, scale=args.scale)
+        if args.out:
+            with open(args.out, 'w') as f:
+                json.dump({'python': platform.python_version(), 'results': results}, f, indent=2)
+        if misses:
+            print("Startup targets missed:")
+            for m in misses:
+                print("  " + m)
+            return 1
+        return 0
+
+    if args.command == "run":
+        report = run_benchmarks(args.sizes, names=args.only, repeat=args.repeat, caps=not args.no_caps, seed=args.seed)
+        out_dir = os.path.dirname(args.out)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print("Benchmark results saved to:", args.out)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    table, regressions = compare(baseline, current, threshold=args.threshold, mem_threshold=args.mem_threshold)
+    if not table.empty:
+        print(table.to_string(index=False, float_format=lambda x: f'{x:.4f}'))
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond the threshold:")
+        for r in regressions:
+            print("  -", r)
+        return 1
+    print("\nNo regressions beyond the threshold.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
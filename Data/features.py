@@ -0,0 +1,273 @@
+"""
+Feature-engineering pipeline (the importable version of feature_engineering.ipynb):
+    - computes, for every ticker at once on a (time x ticker) array of closes:
+      Return, CumReturn, SMA_50, SMA_200, Momentum (20), RSI_14 and the Bollinger
+      bands (20, 2 std) with their width, as the notebook does with pandas and `ta`
+    - writes the cleaned columns plus the features straight into the columnar store
+      (Data/store.py) that main.py loads, instead of rewriting market_data_features.csv
+    - incremental append: new bars only compute their own rows, starting from the tail
+      state saved in the store manifest (last closes, RSI averages, cumulative return)
+
+Usage:
+    python -m Data.features build --input Data/market_data_cleaned.csv
+    python -m Data.features append --input Data/new_bars.csv
+    python -m Data.features build --input Data/market_data_cleaned.csv --csv Data/market_data_features.csv
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+try:
+    from Data.store import ColumnStore, append_rows, default_store_dir, write_store
+except ModuleNotFoundError:
+    # Allow running this file directly by adding the project root to sys.path
+    from pathlib import Path
+    project_root = Path(__file__).resolve().parents[1]
+    if str(project_root) not in sys.path:
+        sys.path.append(str(project_root))
+    from Data.store import ColumnStore, append_rows, default_store_dir, write_store
+from Strategy.indicators import pct_change_matrix, rolling_mean_matrix, rolling_mean_std_matrix
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+CLEANED_CSV = os.path.join(DATA_DIR, 'market_data_cleaned.csv')
+FEATURES_CSV = os.path.join(DATA_DIR, 'market_data_features.csv')
+
+SMA_WINDOWS = (50, 200)
+MOMENTUM_LOOKBACK = 20
+RSI_WINDOW = 14
+BB_WINDOW = 20
+BB_DEV = 2
+
+# per-ticker feature columns, in the notebook's order ('<TICKER>_<FEATURE>')
+FEATURES = ('Return', 'CumReturn', 'SMA_50', 'SMA_200', 'Momentum', 'RSI_14', 'BB_High', 'BB_Low', 'BB_Width')
+
+# closes needed before a new bar to compute all of its features
+TAIL = max(max(SMA_WINDOWS) - 1, BB_WINDOW - 1, MOMENTUM_LOOKBACK)
+
+
+def detect_tickers(columns):
+    # ['EURUSD=X.Open', 'EURUSD=X.Close', 'GBPUSD=X.Close', ...] -> ['EURUSD=X', 'GBPUSD=X']
+    return [c[:-len('.Close')] for c in columns if c.endswith('.Close')]
+
+
+class FeatureState:
+    def __init__(self, tickers, tail, ema_up, ema_down, level, rows):
+        """
+        What the pipeline needs to continue after the last processed bar.
+        Args:
+            tickers (list): ticker order of the columns below.
+            tail (np.ndarray): last TAIL closes, shape (<= TAIL, tickers).
+            ema_up, ema_down (np.ndarray): Wilder averages of the RSI gains/losses.
+            level (np.ndarray): 1 + CumReturn at the last bar.
+            rows (int): bars processed so far (for the RSI warm-up).
+        """
+        self.tickers = list(tickers)
+        self.tail = np.asarray(tail, dtype=np.float64).reshape(-1, len(self.tickers))
+        self.ema_up = np.asarray(ema_up, dtype=np.float64)
+        self.ema_down = np.asarray(ema_down, dtype=np.float64)
+        self.level = np.asarray(level, dtype=np.float64)
+        self.rows = int(rows)
+
+    def to_dict(self):
+        # JSON-friendly (floats round-trip exactly; NaN is written as NaN)
+        return {
+            'tickers': self.tickers,
+            'tail': self.tail.tolist(),
+            'ema_up': self.ema_up.tolist(),
+            'ema_down': self.ema_down.tolist(),
+            'level': self.level.tolist(),
+            'rows': self.rows,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['tickers'], d['tail'], d['ema_up'], d['ema_down'], d['level'], d['rows'])
+
+
+def _wilder(values, previous=None):
+    # Wilder smoothing (ewm alpha=1/RSI_WINDOW, adjust=False) down the time axis of a 2-D
+    # array; `previous` is the last smoothed row, so a new chunk continues the recursion
+    alpha = 1 / RSI_WINDOW
+    if previous is None:
+        return pd.DataFrame(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    stacked = np.vstack([previous[None, :], values])
+    return pd.DataFrame(stacked).ewm(alpha=alpha, adjust=False).mean().to_numpy()[1:]
+
+
+def compute_features(close, state=None):
+    """
+    Features for a block of new bars.
+    Args:
+        close (np.ndarray): closes, shape (new bars, tickers).
+        state (FeatureState): state after the previous bars; None starts from scratch.
+    Returns:
+        (features, new_state): dict feature name -> (new bars x tickers) array, and the
+        state after the last of these bars.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    n, k = close.shape
+    tail = state.tail if state is not None else np.empty((0, k))
+    ext = np.vstack([tail, close])  # the rolling windows look back into the tail
+    new = slice(len(tail), None)
+
+    # Returns and cumulative return (pct_change, then (1 + r).cumprod() skipping NaN)
+    prev = np.vstack([np.full((1, k), np.nan), ext[:-1]])
+    ret = (ext / prev - 1)[new]
+    level = state.level if state is not None else np.ones(k)
+    growth = level * np.nancumprod(1 + ret, axis=0)
+    cum = np.where(np.isnan(ret), np.nan, growth - 1)
+    new_level = growth[-1] if n else level
+
+    sma = rolling_mean_matrix(ext, SMA_WINDOWS)[:, new]
+    momentum = pct_change_matrix(ext, [MOMENTUM_LOOKBACK])[0, new]
+    bb_mid, bb_std = rolling_mean_std_matrix(ext, [BB_WINDOW], ddof=0)
+    bb_high = (bb_mid + BB_DEV * bb_std)[0, new]
+    bb_low = (bb_mid - BB_DEV * bb_std)[0, new]
+
+    # RSI (ta.momentum.RSIIndicator): Wilder averages of gains and losses, NaN moves count as 0
+    diff = np.nan_to_num((ext - prev)[new], nan=0.0)
+    ema_up = _wilder(np.maximum(diff, 0.0), None if state is None else state.ema_up)
+    ema_down = _wilder(np.maximum(-diff, 0.0), None if state is None else state.ema_down)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(ema_down == 0, 100.0, 100 - 100 / (1 + ema_up / ema_down))
+    rows_before = state.rows if state is not None else 0
+    warmup = (rows_before + np.arange(n)) < RSI_WINDOW - 1
+    rsi[warmup] = np.nan
+
+    features = {
+        'Return': ret,
+        'CumReturn': cum,
+        'SMA_50': sma[0],
+        'SMA_200': sma[1],
+        'Momentum': momentum,
+        'RSI_14': rsi,
+        'BB_High': bb_high,
+        'BB_Low': bb_low,
+        'BB_Width': bb_high - bb_low,
+    }
+    tickers = state.tickers if state is not None else [None] * k
+    new_state = FeatureState(
+        tickers,
+        ext[-TAIL:],
+        ema_up[-1] if n else state.ema_up,
+        ema_down[-1] if n else state.ema_down,
+        new_level,
+        rows_before + n,
+    )
+    return features, new_state
+
+
+def feature_frame(df, tickers=None, state=None):
+    """
+    The cleaned columns plus every ticker's features, with the warm-up rows (any NaN)
+    dropped, as market_data_features.csv.
+    Args:
+        df (pd.DataFrame): cleaned data with '<TICKER>.Close' columns.
+        tickers (list): defaults to every ticker with a Close column (or the state's).
+        state (FeatureState): continue from this state (incremental append).
+    Returns:
+        (pd.DataFrame, FeatureState)
+    """
+    if state is not None:
+        tickers = state.tickers
+    tickers = list(tickers or detect_tickers(df.columns))
+    if not tickers:
+        raise ValueError("no '<TICKER>.Close' columns found")
+
+    close = df[[f'{t}.Close' for t in tickers]].to_numpy(dtype=np.float64)
+    features, new_state = compute_features(close, state)
+    new_state.tickers = tickers
+
+    # one block per ticker, in the notebook's column order, built in a single concat
+    columns = {f'{t}_{name}': features[name][:, j] for j, t in enumerate(tickers) for name in FEATURES}
+    out = pd.concat([df, pd.DataFrame(columns, index=df.index)], axis=1)
+    return out.dropna(), new_state
+
+
+def build(input_csv=CLEANED_CSV, store_dir=None, tickers=None, index_col='Date.'):
+    """
+    Runs the pipeline over the whole cleaned CSV and writes a fresh store.
+    Args:
+        input_csv (str): cleaned data (output of data_collection.ipynb).
+        store_dir (str): defaults to the store main.py reads for market_data_features.csv.
+    Returns:
+        (store_dir, features DataFrame)
+    """
+    store_dir = store_dir or default_store_dir(FEATURES_CSV)
+    df = pd.read_csv(input_csv, index_col=index_col, parse_dates=True).sort_index(kind='stable')
+    features, state = feature_frame(df, tickers)
+    write_store(features, store_dir, source={'kind': 'feature_pipeline', 'input': os.path.abspath(input_csv)},
+                extra={'feature_state': state.to_dict()})
+    return store_dir, features
+
+
+def append(new_rows, store_dir=None):
+    """
+    Computes the features of new cleaned bars from the saved tail state and appends
+    them to the store (nothing already stored is recomputed or rewritten).
+    Args:
+        new_rows (pd.DataFrame): cleaned bars with the same raw columns as the first build,
+            all dated after the last bar processed.
+    Returns:
+        (rows appended, rows in the store)
+    """
+    store_dir = store_dir or default_store_dir(FEATURES_CSV)
+    store = ColumnStore(store_dir)
+    if 'feature_state' not in store.manifest:
+        raise ValueError(f"{store_dir} was not written by the feature pipeline; run `build` first")
+    state = FeatureState.from_dict(store.manifest['feature_state'])
+
+    raw_columns = [c for c in store.columns if not any(c == f'{t}_{f}' for t in state.tickers for f in FEATURES)]
+    missing = [c for c in raw_columns if c not in new_rows.columns]
+    if missing:
+        raise ValueError(f"new rows are missing columns {missing}")
+
+    features, state = feature_frame(new_rows[raw_columns].sort_index(kind='stable'), state=state)
+    total = append_rows(store_dir, features[store.columns], extra={'feature_state': state.to_dict()})
+    return len(features), total
+
+
+def export_csv(store_dir=None, csv_path=FEATURES_CSV):
+    # writes the store back out as a CSV (for the notebooks), with the original index name
+    store_dir = store_dir or default_store_dir(FEATURES_CSV)
+    ColumnStore(store_dir).load().to_csv(csv_path)
+    return csv_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute the strategy features into the columnar data store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Compute every feature from the cleaned CSV and write a new store")
+    build_parser.add_argument("--input", type=str, default=CLEANED_CSV, help="Cleaned CSV; defaults to Data/market_data_cleaned.csv")
+    build_parser.add_argument("--tickers", type=str, default=None, help="Comma-separated tickers; defaults to every '<TICKER>.Close' column")
+
+    append_parser = subparsers.add_parser("append", help="Add new cleaned bars to an existing store")
+    append_parser.add_argument("--input", type=str, required=True, help="CSV with the new bars (same columns as the cleaned CSV)")
+
+    for p in (build_parser, append_parser):
+        p.add_argument("--store", type=str, default=None, help="Store directory; defaults to the one main.py reads")
+        p.add_argument("--csv", type=str, default=None, help="Also export the whole store to this CSV")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        tickers = args.tickers.split(",") if args.tickers else None
+        store_dir, features = build(args.input, args.store, tickers=tickers)
+        print(f"Feature store written: {store_dir} ({len(features)} rows, {features.shape[1]} columns)")
+    else:
+        new_rows = pd.read_csv(args.input, index_col='Date.', parse_dates=True)
+        store_dir = args.store or default_store_dir(FEATURES_CSV)
+        added, total = append(new_rows, store_dir)
+        print(f"Appended {added} rows to {store_dir} ({total} rows)")
+
+    if args.csv:
+        print("Exported to:", export_csv(args.store, args.csv))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,351 @@
+"""
+Offline ingestion and cleaning (the script version of the cleaning half of
+data_collection.ipynb):
+    - streams local raw files (CSV, or Parquet when pyarrow is installed) in chunks of rows
+    - cleans every ticker separately:
+        - duplicate and out-of-order timestamps are dropped (the first row of a timestamp wins)
+        - missing prices are dropped, or forward-filled up to a limit; other missing
+          numeric fields (Volume, Dividends, ...) become 0
+        - outliers are dropped with a causal Hampel-style filter: the log close is compared
+          with the median of the previous few closes, in units of the robust (median absolute
+          deviation) volatility of recent returns, so one bad tick is caught without a
+          whole-history z-score
+    - only a small tail per ticker is carried between chunks, so memory is bounded by the
+      chunk size and the output doesn't depend on it
+    - writes partitioned output, <out_dir>/<TICKER>/<YYYY-MM>.csv, and optionally one wide
+      CSV in the market_data_cleaned.csv layout (fine for small universes)
+
+Sources are pluggable: ingest() takes any object whose iter_chunks() yields
+(ticker, DataFrame) pairs, the frame holding that ticker's fields (Open, High, Low,
+Close, Volume, ...) on a date index. LocalFileSource reads local files, so nothing
+here needs network access.
+
+Usage:
+    python -m Data.ingest --input Data/market_data_not_cleaned.csv --wide_csv Data/market_data_cleaned.csv
+    python -m Data.ingest --input "raw/minute_*.csv" --ticker_col Ticker --index_col Datetime --chunk_rows 500000
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT_DIR = os.path.join(DATA_DIR, 'cleaned')
+
+PRICE_FIELDS = ('Open', 'High', 'Low', 'Close')
+NAN_POLICIES = ('drop', 'ffill')
+REPORT = 'ingest_report.csv'
+
+# closes in the outlier filter's reference level
+_MEDIAN_BARS = 5
+
+
+class LocalFileSource:
+    def __init__(self, paths, chunk_rows=100_000, index_col='Date.', ticker_col=None, date_format='ISO8601'):
+        """
+        Reads raw market data from local CSV or Parquet files, chunk by chunk.
+        Args:
+            paths (str or list): file paths or glob patterns, read in sorted order.
+            chunk_rows (int): rows read at once.
+            index_col (str): timestamp column.
+            ticker_col (str): for long files (one row per timestamp and ticker) the column
+                holding the ticker; None means wide files with '<TICKER>.<Field>' columns,
+                like market_data_not_cleaned.csv.
+            date_format (str): timestamp format for pd.to_datetime (None lets pandas guess).
+        """
+        patterns = [paths] if isinstance(paths, str) else list(paths)
+        self.paths = []
+        for pattern in patterns:
+            matches = sorted(glob.glob(pattern))
+            if not matches:
+                raise FileNotFoundError(f"No files match '{pattern}'")
+            self.paths += matches
+        self.chunk_rows = chunk_rows
+        self.index_col = index_col
+        self.ticker_col = ticker_col
+        self.date_format = date_format
+
+    def _read(self, path):
+        # raw chunks of one file
+        if path.endswith(('.parquet', '.pq')):
+            try:
+                import pyarrow.parquet as pq
+            except ImportError as e:
+                raise ImportError("reading Parquet files needs pyarrow (pip install pyarrow)") from e
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=self.chunk_rows):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(path, chunksize=self.chunk_rows)
+
+    def iter_chunks(self):
+        for path in self.paths:
+            for chunk in self._read(path):
+                chunk[self.index_col] = pd.to_datetime(chunk[self.index_col], format=self.date_format)
+                chunk = chunk.set_index(self.index_col)
+                if self.ticker_col is not None:
+                    for ticker, part in chunk.groupby(self.ticker_col, sort=False):
+                        yield ticker, part.drop(columns=self.ticker_col)
+                    continue
+                tickers = {}
+                for col in chunk.columns:
+                    ticker, _, field = col.rpartition('.')
+                    if ticker:
+                        tickers.setdefault(ticker, []).append((col, field))
+                for ticker, cols in tickers.items():
+                    part = chunk[[c for c, _ in cols]]
+                    part.columns = [f for _, f in cols]
+                    yield ticker, part
+
+
+def _ffill_limited(values, last, run, limit):
+    """
+    Forward-fills NaNs down each column of `values`, at most `limit` in a row, continuing
+    from the previous chunk (`last` = last valid value, `run` = NaNs in a row before this
+    chunk). Returns (filled, new last, new run).
+    """
+    n = len(values)
+    valid = ~np.isnan(values)
+    pos = np.arange(n)[:, None]
+    # position of the latest valid value at or before each row (-1 = before this chunk)
+    last_pos = np.maximum.accumulate(np.where(valid, pos, -1), axis=0)
+    from_carry = last_pos < 0
+    gap = np.where(from_carry, pos + 1 + run, pos - last_pos)
+    source = np.where(from_carry, last, values[np.maximum(last_pos, 0), np.arange(values.shape[1])])
+    fill = ~valid & (gap <= limit)
+    filled = np.where(fill, source, values)
+
+    new_last = np.where(valid.any(axis=0), values[np.maximum(last_pos[-1], 0), np.arange(values.shape[1])], last)
+    new_run = np.where(valid.any(axis=0), n - 1 - last_pos[-1], run + n)
+    return filled, new_last, new_run
+
+
+class TickerCleaner:
+    def __init__(self, ticker, nan_policy='drop', max_ffill=5, window=100, threshold=12.0, min_scale=1e-4):
+        """
+        Streaming cleaner for one ticker.
+        Args:
+            nan_policy (str): 'drop' rows with a missing price, or 'ffill' them from the
+                last valid price (at most max_ffill bars in a row, the rest is dropped).
+            window (int): trailing bars the return volatility is measured over.
+            threshold (float): flag a bar when its log close is further than this many robust
+                standard deviations (1.4826 * MAD of returns) from the median of the previous
+                5 closes.
+            min_scale (float): floor of that standard deviation in log price (1e-4 = 1bp), so
+                flat stretches where the MAD is 0 don't flag every small move.
+        """
+        if nan_policy not in NAN_POLICIES:
+            raise ValueError(f"nan_policy must be one of {NAN_POLICIES}, got '{nan_policy}'")
+        self.ticker = ticker
+        self.nan_policy = nan_policy
+        self.max_ffill = max_ffill
+        self.window = window
+        self.threshold = threshold
+        self.min_scale = min_scale
+
+        self.columns = None
+        self._last_date = None     # latest timestamp kept so far
+        self._last = None          # forward-fill state per price column
+        self._run = None
+        self._tail = np.empty(0)   # recent log closes (the outlier filter's history)
+        self.stats = dict.fromkeys(
+            ['rows_in', 'duplicates', 'out_of_order', 'empty', 'nan_filled', 'nan_dropped', 'outliers', 'rows_out'], 0)
+
+    def _dedup(self, frame):
+        dates = frame.index.values.astype('datetime64[ns]').view(np.int64)
+        start = np.iinfo(np.int64).min if self._last_date is None else self._last_date
+        prev_max = np.maximum.accumulate(np.concatenate(([start], dates)))[:-1]
+        self.stats['duplicates'] += int((dates == prev_max).sum())
+        self.stats['out_of_order'] += int((dates < prev_max).sum())
+        keep = dates > prev_max
+        if keep.any():
+            self._last_date = int(max(start, dates[keep][-1]))
+        return frame[keep]
+
+    def _fill_missing(self, frame):
+        empty = frame.isna().all(axis=1).to_numpy()
+        self.stats['empty'] += int(empty.sum())
+        frame = frame[~empty]
+
+        price_cols = [c for c in frame.columns if c in PRICE_FIELDS]
+        other_cols = [c for c in frame.columns if c not in PRICE_FIELDS]
+        prices = frame[price_cols].to_numpy(dtype=np.float64)
+        missing = np.isnan(prices)
+
+        if self.nan_policy == 'ffill' and missing.any():
+            if self._last is None:
+                self._last = np.full(len(price_cols), np.nan)
+                self._run = np.zeros(len(price_cols), dtype=np.int64)
+            prices, self._last, self._run = _ffill_limited(prices, self._last, self._run, self.max_ffill)
+            self.stats['nan_filled'] += int((missing & ~np.isnan(prices)).any(axis=1).sum())
+        elif self.nan_policy == 'ffill' and len(prices):
+            self._last = prices[-1].copy()
+            self._run = np.zeros(len(price_cols), dtype=np.int64)
+
+        bad = np.isnan(prices).any(axis=1)
+        self.stats['nan_dropped'] += int(bad.sum())
+        out = frame.copy()
+        out[price_cols] = prices
+        out[other_cols] = out[other_cols].fillna(0)
+        return out[~bad]
+
+    def _drop_outliers(self, frame):
+        col = 'Close' if 'Close' in frame.columns else next((c for c in PRICE_FIELDS if c in frame.columns), None)
+        if col is None or frame.empty:
+            return frame
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x = np.log(frame[col].to_numpy(dtype=np.float64))
+        ext = np.concatenate([self._tail, x])
+
+        # level: median of the previous few closes (short, so a trend doesn't lag behind it);
+        # scale: robust std of one-bar log returns over the previous `window` bars
+        s = pd.Series(ext)
+        dev = ext - s.rolling(_MEDIAN_BARS).median().shift(1).to_numpy()
+        returns = s.diff()
+        mad = (returns - returns.rolling(self.window).median()).abs().rolling(self.window).median().shift(1)
+        scale = np.maximum(1.4826 * mad.to_numpy(), self.min_scale)
+        flagged = (np.abs(dev) > self.threshold * scale)[len(self._tail):]
+
+        self._tail = ext[-(2 * self.window + _MEDIAN_BARS):]
+        self.stats['outliers'] += int(flagged.sum())
+        return frame[~flagged]
+
+    def clean(self, frame):
+        """Cleans the next chunk of this ticker's rows and returns the rows to keep."""
+        if self.columns is None:
+            self.columns = list(frame.columns)
+        frame = frame[self.columns]
+        self.stats['rows_in'] += len(frame)
+        frame = self._dedup(frame)
+        frame = self._fill_missing(frame)
+        frame = self._drop_outliers(frame)
+        self.stats['rows_out'] += len(frame)
+        return frame
+
+
+def _safe_name(ticker):
+    # ticker -> folder name ('EURUSD=X' stays, path separators don't)
+    return str(ticker).replace(os.sep, '_').replace('/', '_').replace(':', '_')
+
+
+class PartitionWriter:
+    def __init__(self, out_dir, index_name='Date.'):
+        """Appends cleaned rows to <out_dir>/<TICKER>/<YYYY-MM>.csv."""
+        self.out_dir = out_dir
+        self.index_name = index_name
+
+    def write(self, ticker, frame):
+        if frame.empty:
+            return
+        folder = os.path.join(self.out_dir, _safe_name(ticker))
+        os.makedirs(folder, exist_ok=True)
+        frame = frame.rename_axis(self.index_name)
+        months = frame.index.year * 100 + frame.index.month
+        for month, part in frame.groupby(months, sort=False):
+            path = os.path.join(folder, f'{month // 100:04d}-{month % 100:02d}.csv')
+            part.to_csv(path, mode='a', header=not os.path.exists(path))
+
+
+def ingest(source, out_dir=DEFAULT_OUT_DIR, wide_csv=None, index_name='Date.', **cleaning):
+    """
+    Streams a source through the per-ticker cleaners into partitioned output.
+    The output is written to a temporary folder and swapped in at the end, so a failed
+    run never leaves half a dataset behind.
+    Args:
+        source: object with iter_chunks() yielding (ticker, DataFrame) pairs (e.g. LocalFileSource).
+        out_dir (str): output folder (replaced).
+        wide_csv (str): also write every ticker side by side in one CSV (dates all tickers share).
+        cleaning: TickerCleaner options (nan_policy, max_ffill, window, threshold, min_scale).
+    Returns:
+        pd.DataFrame: per-ticker counts of what was dropped or filled (also saved as ingest_report.csv).
+    """
+    tmp_dir = f'{out_dir.rstrip(os.sep)}.tmp-{os.getpid()}'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        writer = PartitionWriter(tmp_dir, index_name=index_name)
+        cleaners = {}
+        for ticker, frame in source.iter_chunks():
+            cleaner = cleaners.get(ticker)
+            if cleaner is None:
+                cleaner = cleaners[ticker] = TickerCleaner(ticker, **cleaning)
+            writer.write(ticker, cleaner.clean(frame))
+
+        report = pd.DataFrame({t: c.stats for t, c in cleaners.items()}).T.rename_axis('Ticker')
+        report.to_csv(os.path.join(tmp_dir, REPORT))
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+
+    if wide_csv:
+        read_partitions(out_dir, tickers=list(cleaners), index_name=index_name).to_csv(wide_csv)
+    return report
+
+
+def read_partitions(out_dir=DEFAULT_OUT_DIR, tickers=None, start=None, end=None, how='inner', index_name='Date.'):
+    """
+    Reads cleaned partitions back as one wide frame ('<TICKER>.<Field>' columns).
+    Only the monthly files overlapping [start, end] are opened.
+    Args:
+        tickers (list): defaults to every ticker folder.
+        how (str): how to align the tickers' dates ('inner' keeps dates all of them have).
+    """
+    if tickers is None:
+        tickers = sorted(d for d in os.listdir(out_dir) if os.path.isdir(os.path.join(out_dir, d)))
+    first = None if start is None else pd.Timestamp(start).strftime('%Y-%m')
+    last = None if end is None else pd.Timestamp(end).strftime('%Y-%m')
+
+    frames = []
+    for ticker in tickers:
+        folder = os.path.join(out_dir, _safe_name(ticker))
+        months = sorted(f for f in os.listdir(folder) if f.endswith('.csv'))
+        months = [m for m in months if (first is None or m[:7] >= first) and (last is None or m[:7] <= last)]
+        if not months:
+            continue
+        df = pd.concat([pd.read_csv(os.path.join(folder, m), index_col=index_name, parse_dates=True) for m in months])
+        frames.append(df.add_prefix(f'{ticker}.'))
+    if not frames:
+        return pd.DataFrame()
+    wide = pd.concat(frames, axis=1, join=how).sort_index()
+    if start is not None:
+        wide = wide[wide.index >= start]
+    if end is not None:
+        wide = wide[wide.index <= end]
+    return wide
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Clean raw market data files in chunks into partitioned output")
+    parser.add_argument("--input", type=str, nargs="+", required=True, help="Raw CSV/Parquet files or glob patterns")
+    parser.add_argument("--out", type=str, default=DEFAULT_OUT_DIR, help="Output folder; defaults to Data/cleaned")
+    parser.add_argument("--wide_csv", type=str, default=None, help="Also write one wide CSV (e.g. Data/market_data_cleaned.csv)")
+    parser.add_argument("--chunk_rows", type=int, default=100_000, help="Rows read at once")
+    parser.add_argument("--index_col", type=str, default="Date.", help="Timestamp column")
+    parser.add_argument("--date_format", type=str, default="ISO8601", help="Timestamp format of the index column")
+    parser.add_argument("--ticker_col", type=str, default=None, help="Ticker column of long files; omit for '<TICKER>.<Field>' columns")
+    parser.add_argument("--nan_policy", type=str, default="drop", choices=NAN_POLICIES, help="Drop or forward-fill missing prices")
+    parser.add_argument("--max_ffill", type=int, default=5, help="Longest run of missing prices filled with --nan_policy ffill")
+    parser.add_argument("--window", type=int, default=100, help="Trailing bars of the outlier filter's volatility")
+    parser.add_argument("--threshold", type=float, default=12.0, help="Outlier threshold in robust standard deviations")
+    args = parser.parse_args(argv)
+
+    source = LocalFileSource(args.input, chunk_rows=args.chunk_rows, index_col=args.index_col, ticker_col=args.ticker_col,
+                             date_format=args.date_format)
+    report = ingest(source, args.out, wide_csv=args.wide_csv, nan_policy=args.nan_policy, max_ffill=args.max_ffill,
+                    window=args.window, threshold=args.threshold)
+    print(report.to_string())
+    print("Cleaned partitions saved to:", args.out)
+    if args.wide_csv:
+        print("Wide CSV saved to:", args.wide_csv)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+"""
+Bar frequency conversion for intraday and multi-timeframe backtests:
+    - Resampler maps every bar of an index to its higher-timeframe bucket once (bucket keys
+      from integer arithmetic on the int64 timestamps), so aggregating any number of columns
+      is one reduceat per column over the precomputed bucket starts, not a groupby each time
+    - ohlcv() aggregates the wide '<TICKER>.<Field>' frame: first Open, max High, min Low,
+      last Close, summed Volume. Values and labels match DataFrame.resample(rule) for the
+      buckets that have bars (empty buckets are left out instead of filled with NaN)
+    - align() maps values computed on the higher bars (e.g. signals on hourly closes) back
+      onto the lower bars. A bucket is only known once it is complete, so its value applies
+      from the first lower bar of the next bucket (no lookahead)
+    - BarAggregator builds the same buckets one bar at a time, for on_bar strategies
+
+Rules are pandas offsets. Fixed ones ('5min', 'h', '4h', 'D') are binned from midnight of
+the first day (pandas' default origin) and labelled by their start; calendar ones ('W',
+'ME', 'QE', 'YE', 'MS', ...) follow pandas' closed/label sides ('W' and month/quarter/year
+ends are labelled by their last day).
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+DAY_NS = 86_400_000_000_000
+
+# How each field of a '<TICKER>.<Field>' column is aggregated; other columns (derived
+# features) are dropped, they have to be recomputed on the new bars
+AGGREGATIONS = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+# Offsets pandas bins closed/labelled on the right (the bucket is named after its last day)
+_RIGHT_LABELLED = {'ME', 'M', 'QE', 'Q', 'YE', 'Y', 'A', 'BME', 'BM', 'BQE', 'BQ', 'BYE', 'BA', 'W'}
+
+
+def _wall_ns(index):
+    # int64 nanoseconds of the local wall time (buckets of a tz-aware index follow its own days)
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.asi8
+
+
+class BucketRule:
+    def __init__(self, rule):
+        """
+        Bucket keys of one pandas offset rule.
+        Args:
+            rule (str or DateOffset): e.g. '15min', 'h', 'D', 'W', 'ME'.
+        """
+        self.rule = rule
+        self.offset = to_offset(rule)
+        try:
+            self.step = self.offset.nanos
+        except ValueError:
+            self.step = None  # calendar offset (weeks, months, ...)
+        self.right = self.offset.rule_code.split('-')[0] in _RIGHT_LABELLED
+        self._day_keys = {}
+
+    def keys(self, ns, origin):
+        """
+        Bucket key of each timestamp: the int64 ns of the bucket's label.
+        Args:
+            ns (np.ndarray): int64 wall-time nanoseconds.
+            origin (int): midnight of the first day (ns); fixed rules are binned from it.
+        """
+        ns = np.asarray(ns, dtype=np.int64)
+        if self.step is not None:
+            return origin + (ns - origin) // self.step * self.step
+        # calendar rules only depend on the day: map each distinct day once
+        days, inverse = np.unique(ns // DAY_NS, return_inverse=True)
+        return np.array([self._day_key(int(d)) for d in days], dtype=np.int64)[inverse.reshape(ns.shape)]
+
+    def _day_key(self, day):
+        key = self._day_keys.get(day)
+        if key is None:
+            ts = pd.Timestamp(day * DAY_NS)
+            label = self.offset.rollforward(ts) if self.right else self.offset.rollback(ts)
+            key = self._day_keys[day] = pd.Timestamp(label).normalize().value
+        return key
+
+
+class Resampler:
+    def __init__(self, index, rule):
+        """
+        Precomputes the buckets of `rule` over a sorted DatetimeIndex.
+        Attributes:
+            starts (np.ndarray): position of the first bar of every bucket.
+            labels (pd.DatetimeIndex): bucket labels, as pandas' resample would name them.
+        """
+        index = pd.DatetimeIndex(index)
+        if not index.is_monotonic_increasing:
+            raise ValueError("the index must be sorted by time to resample it")
+        self.index = index
+        self.rule = BucketRule(rule)
+
+        ns = _wall_ns(index)
+        origin = int(ns[0] // DAY_NS * DAY_NS) if len(ns) else 0
+        keys = self.rule.keys(ns, origin)
+        new = np.empty(len(keys), dtype=bool)
+        new[:1] = True
+        np.not_equal(keys[1:], keys[:-1], out=new[1:])
+        self.starts = np.flatnonzero(new)
+        self.labels = pd.DatetimeIndex(keys[self.starts], tz=index.tz, name=index.name)
+        self._bucket = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def bucket(self):
+        # bucket number (0..n_buckets-1) of every bar, only built when align() needs it
+        if self._bucket is None:
+            self._bucket = np.repeat(np.arange(len(self.starts)), np.diff(self.starts, append=len(self.index)))
+        return self._bucket
+
+    def _reduce(self, ufunc, values):
+        return ufunc.reduceat(values, self.starts, axis=0) if len(values) else values[:0]
+
+    def max(self, values):
+        # NaNs are skipped, as in pandas (fmax/fmin only return NaN when every value is NaN)
+        return self._reduce(np.fmax, np.asarray(values, dtype=np.float64))
+
+    def min(self, values):
+        return self._reduce(np.fmin, np.asarray(values, dtype=np.float64))
+
+    def sum(self, values):
+        return self._reduce(np.add, np.nan_to_num(np.asarray(values, dtype=np.float64)))
+
+    def _valid_positions(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        pos = np.arange(len(values)).reshape((-1,) + (1,) * (values.ndim - 1))
+        return values, ~np.isnan(values), pos
+
+    def _ends(self, n):
+        return np.append(self.starts[1:], n)
+
+    def first(self, values):
+        # first non-NaN value of every bucket
+        values = np.asarray(values, dtype=np.float64)
+        if not np.isnan(values).any():
+            return values[self.starts]
+        values, valid, pos = self._valid_positions(values)
+        first = self._reduce(np.minimum, np.where(valid, pos, len(values)))
+        ends = self._ends(len(values)).reshape((-1,) + (1,) * (values.ndim - 1))
+        return self._take(values, first, first < ends)
+
+    def last(self, values):
+        # last non-NaN value of every bucket
+        values = np.asarray(values, dtype=np.float64)
+        if not np.isnan(values).any():
+            return values[self._ends(len(values)) - 1]
+        values, valid, pos = self._valid_positions(values)
+        last = self._reduce(np.maximum, np.where(valid, pos, -1))
+        starts = self.starts.reshape((-1,) + (1,) * (values.ndim - 1))
+        return self._take(values, last, last >= starts)
+
+    @staticmethod
+    def _take(values, positions, found):
+        out = np.take_along_axis(values, np.clip(positions, 0, max(len(values) - 1, 0)), axis=0)
+        out[~found] = np.nan
+        return out
+
+    def aggregate(self, values, how):
+        # how: 'first', 'last', 'max', 'min' or 'sum'
+        return getattr(self, how)(values)
+
+    def ohlcv(self, data, ticker=None):
+        """
+        Higher-timeframe bars of a wide frame.
+        Args:
+            data (pd.DataFrame): frame with '<TICKER>.Open/.High/.Low/.Close/.Volume' columns
+                on this resampler's index.
+            ticker (str or list): only these tickers (default: every ticker in the frame).
+        Returns:
+            pd.DataFrame indexed by the bucket labels, with the OHLCV columns aggregated
+            (per AGGREGATIONS) in their original order.
+        """
+        tickers = None if ticker is None else ([ticker] if isinstance(ticker, str) else list(ticker))
+        columns = {}
+        for col in data.columns:
+            name, _, field = col.rpartition('.')
+            if field in AGGREGATIONS and name and (tickers is None or name in tickers):
+                columns.setdefault(AGGREGATIONS[field], []).append(col)
+        out = {}
+        for how, cols in columns.items():
+            reduced = self.aggregate(data[cols].to_numpy(dtype=np.float64), how)
+            out.update(zip(cols, reduced.T))
+        ordered = [c for c in data.columns if c in out]
+        return pd.DataFrame({c: out[c] for c in ordered}, index=self.labels)
+
+    def align(self, values, fill=np.nan):
+        """
+        Values of the higher bars laid out on the lower bars: each lower bar gets the value
+        of the last complete bucket before its own, `fill` in the first bucket.
+        Args:
+            values (array-like): one value (or row) per bucket, e.g. signals computed on
+                the output of ohlcv().
+        Returns:
+            np.ndarray with one value (or row) per lower bar.
+        """
+        values = np.asarray(values)
+        if len(values) != len(self):
+            raise ValueError(f"expected {len(self)} bucket values, got {len(values)}")
+        out = values[np.maximum(self.bucket - 1, 0)]
+        if out.dtype.kind in 'iub' and isinstance(fill, float) and np.isnan(fill):
+            out = out.astype(np.float64)
+        out[self.bucket == 0] = fill
+        return out
+
+
+class BarAggregator:
+    def __init__(self, rule):
+        """
+        Streaming version of Resampler.ohlcv for one series: feed lower bars one at a time,
+        get each higher bar back when the first bar of the next bucket arrives (the same
+        point from which Resampler.align makes it visible).
+        """
+        self.rule = BucketRule(rule)
+        self._origin = None
+        self._key = None
+        self._bar = None
+
+    def update(self, date, open_, high=None, low=None, close=None, volume=0.0):
+        """
+        Adds one lower bar (a lone price is used as open/high/low/close).
+        Returns:
+            the completed higher bar as (label, open, high, low, close, volume), or None.
+        """
+        ns = _wall_ns([date])[0]
+        high = open_ if high is None else high
+        low = open_ if low is None else low
+        close = open_ if close is None else close
+        if self._origin is None:
+            self._origin = int(ns // DAY_NS * DAY_NS)
+        key = int(self.rule.keys(np.array([ns]), self._origin)[0])
+
+        done = None
+        if key != self._key:
+            done = self._emit()
+            self._key = key
+            self._bar = [open_, high, low, close, volume]
+        else:
+            bar = self._bar
+            bar[1] = np.fmax(bar[1], high)
+            bar[2] = np.fmin(bar[2], low)
+            bar[3] = close
+            bar[4] += volume
+        return done
+
+    def _emit(self):
+        if self._bar is None:
+            return None
+        return (pd.Timestamp(self._key), *self._bar)
@@ -0,0 +1,424 @@
+"""
+Columnar data store for the feature data:
+    - converts a CSV (e.g. market_data_features.csv) once into one .npy file per
+      column, the date index as int64 nanoseconds and a small manifest.json
+    - later loads memory-map only the requested columns (e.g. 'EURUSD=X.Close',
+      or every column of one ticker)
+    - the --start/--end range is found with a binary search on the sorted index,
+      so only that slice of each column is read
+    - the store is rebuilt automatically when the source CSV changes
+    - rows can be appended in place (append_rows), e.g. by the feature pipeline
+      (Data/features.py), which writes its stores directly instead of going through a CSV
+    - iter_chunks reads a date range block by block, each block with the rows before it
+      that rolling indicators need, for backtests over more rows than fit in memory
+    - every write_store goes into a new version folder (v-...) and the CURRENT file is
+      switched to it with one atomic rename, so a reader always finds a whole store (the
+      one before or the one after) and two processes building the same store at once
+      don't collide; writers take a lock file for the switch and for appends
+    - a replaced version is deleted by the first write more than VERSION_GRACE seconds
+      after it was replaced, so an open ColumnStore keeps working across a rewrite for at
+      least that long; after that, reopen the store (columns are read lazily, so load()
+      on a deleted version raises FileNotFoundError)
+"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no fcntl, lock with msvcrt instead
+    fcntl = None
+    import msvcrt
+
+MANIFEST = 'manifest.json'
+INDEX_FILE = 'index.npy'
+CURRENT = 'CURRENT'     # names the version folder readers use
+LOCK = '.lock'
+# Seconds a replaced version is kept, for readers that opened it before the switch; the
+# next write after that deletes it
+VERSION_GRACE = 60
+
+
+def default_store_dir(csv_path):
+    # Data/market_data_features.csv -> Data/.store/market_data_features/
+    folder, name = os.path.split(os.path.abspath(csv_path))
+    return os.path.join(folder, '.store', os.path.splitext(name)[0])
+
+
+def end_timestamp(end):
+    # An end given as a plain date ('2024-01-05') covers that whole day, so the intraday bars
+    # of the last day are kept; an end with a time is used as is
+    ts = pd.Timestamp(end)
+    if isinstance(end, str) and ts == ts.normalize() and not any(c in end for c in ': T'):
+        ts += pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+    return ts
+
+
+def store_version(store_dir):
+    # folder with the files of the store's current version: the one CURRENT names, or
+    # store_dir itself for a store written before there were versions
+    try:
+        with open(os.path.join(store_dir, CURRENT)) as f:
+            return os.path.join(store_dir, f.read().strip())
+    except FileNotFoundError:
+        return store_dir
+
+
+def _read_manifest(store_dir):
+    # (version folder, manifest) of the current version; resolved again if a writer switched
+    # versions and removed this one between reading CURRENT and opening the manifest
+    while True:
+        path = store_version(store_dir)
+        try:
+            with open(os.path.join(path, MANIFEST)) as f:
+                return path, json.load(f)
+        except FileNotFoundError:
+            if store_version(store_dir) == path:
+                raise
+
+
+@contextlib.contextmanager
+def _locked(store_dir):
+    # serializes the writers of one store; readers never wait for it
+    with open(os.path.join(store_dir, LOCK), 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass        # LK_LOCK gives up after ~10 s, keep waiting
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _source_stamp(csv_path):
+    st = os.stat(csv_path)
+    return {'path': os.path.abspath(csv_path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def build_store(csv_path, store_dir=None, index_col='Date.'):
+    """
+    Parses the CSV once and writes the columnar store.
+    Args:
+        csv_path (str): source CSV with a date index column.
+        store_dir (str): where to write; defaults to default_store_dir(csv_path).
+        index_col (str): name of the date column.
+    Returns:
+        str: the store directory.
+    """
+    store_dir = store_dir or default_store_dir(csv_path)
+    df = pd.read_csv(csv_path, index_col=index_col, parse_dates=True)
+    return write_store(df, store_dir, source=_source_stamp(csv_path))
+
+
+def write_store(df, store_dir, source=None, extra=None):
+    """
+    Writes a DataFrame (numeric columns, date index) as a columnar store.
+    Args:
+        df (pd.DataFrame): the data.
+        store_dir (str): where to write; an existing store there is replaced (readers that
+            already opened it keep reading the old version until the next write).
+        source (dict): what the store was built from; build_store() records the CSV's
+            size and mtime, other writers use {'kind': ...} and are never rebuilt from a CSV.
+        extra (dict): additional manifest entries (e.g. the feature pipeline's state).
+    Returns:
+        str: the store directory.
+    """
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index(kind='stable')  # binary search needs a sorted index
+
+    non_numeric = [c for c in df.columns if not pd.api.types.is_numeric_dtype(df[c])]
+    if non_numeric:
+        raise ValueError(f"Only numeric columns can be stored, got {non_numeric}")
+
+    # Write into a temporary folder, then make it the current version (see _publish),
+    # so a reader never sees half a store
+    os.makedirs(store_dir, exist_ok=True)
+    tmp_dir = os.path.join(store_dir, f'tmp-{os.getpid()}')
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    np.save(os.path.join(tmp_dir, INDEX_FILE), df.index.values.astype('datetime64[ns]').view(np.int64))
+    files = {}
+    for i, col in enumerate(df.columns):
+        # column names like 'EURUSD=X.Close' aren't safe file names, so files are numbered
+        files[col] = f'c{i:04d}.npy'
+        np.save(os.path.join(tmp_dir, files[col]), np.ascontiguousarray(df[col].to_numpy()))
+
+    manifest = {
+        'source': source,
+        'index_name': df.index.name,
+        'rows': len(df),
+        'columns': list(df.columns),
+        'files': files,
+        **(extra or {}),
+    }
+    _write_manifest(tmp_dir, manifest)
+    _publish(store_dir, tmp_dir)
+    return store_dir
+
+
+def _publish(store_dir, tmp_dir):
+    # Renames a finished temporary folder to a new version and points CURRENT at it (an
+    # atomic replace of a one-line file). Versions replaced more than VERSION_GRACE
+    # seconds ago are removed.
+    with _locked(store_dir):
+        previous = store_version(store_dir)
+        name = f'v-{time.time_ns()}-{os.getpid()}'
+        os.replace(tmp_dir, os.path.join(store_dir, name))
+        pointer = os.path.join(store_dir, f'{CURRENT}.{os.getpid()}.tmp')
+        with open(pointer, 'w') as f:
+            f.write(name)
+        os.replace(pointer, os.path.join(store_dir, CURRENT))
+
+        if previous != store_dir:
+            os.utime(previous)  # its mtime now says when it stopped being current
+        cutoff = time.time_ns() - VERSION_GRACE * 10**9
+        for entry in os.listdir(store_dir):
+            path = os.path.join(store_dir, entry)
+            if entry.startswith('v-') and entry != name and os.stat(path).st_mtime_ns < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        if previous == store_dir:
+            # a store from before versions: its files sat in store_dir itself
+            for entry in os.listdir(store_dir):
+                if entry == MANIFEST or entry.endswith('.npy'):
+                    os.remove(os.path.join(store_dir, entry))
+
+
+def _write_manifest(store_dir, manifest):
+    # write-then-rename, so the manifest is always either the old or the new one
+    tmp = os.path.join(store_dir, f'{MANIFEST}.{os.getpid()}.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(store_dir, MANIFEST))
+
+
+def _append_npy(path, values, rows):
+    # Writes `values` after the first `rows` entries of a 1-D .npy file, in place.
+    # Only the header (new shape) and the new rows are written; anything past `rows`
+    # (e.g. left over from an interrupted append) is overwritten.
+    with open(path, 'r+b') as f:
+        version = np.lib.format.read_magic(f)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        _, fortran_order, dtype = read_header(f)
+        offset = f.tell()
+
+        header = io.BytesIO()
+        np.lib.format.write_array_header_1_0(header, {
+            'descr': np.lib.format.dtype_to_descr(dtype),
+            'fortran_order': fortran_order,
+            'shape': (rows + len(values),),
+        })
+        if header.tell() != offset:
+            # header grew (very rare: numpy pads it for growth), rewrite the whole file
+            f.seek(offset)
+            old = np.frombuffer(f.read(rows * dtype.itemsize), dtype=dtype)
+            f.seek(0)
+            np.save(f, np.concatenate([old, np.asarray(values, dtype=dtype)]))
+            f.truncate()
+            return
+
+        f.seek(0)
+        f.write(header.getvalue())
+        f.seek(offset + rows * dtype.itemsize)
+        f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        f.truncate()
+
+
+def append_rows(store_dir, df, extra=None):
+    """
+    Appends rows to an existing store without rewriting it.
+    The manifest (row count, and `extra` entries such as pipeline state) is replaced
+    last, so readers only see the new rows once every column has been written.
+    Args:
+        df (pd.DataFrame): new rows with the store's columns, all dated after its last row.
+        extra (dict): manifest entries to update together with the row count.
+    Returns:
+        int: number of rows in the store afterwards.
+    """
+    with _locked(store_dir):
+        return _append_rows(store_version(store_dir), df, extra)
+
+
+def _append_rows(store_dir, df, extra):
+    # append_rows on the folder of the current version
+    with open(os.path.join(store_dir, MANIFEST)) as f:
+        manifest = json.load(f)
+    if list(df.columns) != manifest['columns']:
+        raise ValueError("appended rows must have exactly the store's columns, in the same order")
+    if df.empty:
+        return manifest['rows']
+
+    rows = manifest['rows']
+    index = df.index.values.astype('datetime64[ns]').view(np.int64)
+    if not (np.diff(index) > 0).all():
+        raise ValueError("appended rows must be sorted by date without duplicates")
+    if rows:
+        last = np.load(os.path.join(store_dir, INDEX_FILE), mmap_mode='r')[rows - 1]
+        if index[0] <= last:
+            raise ValueError("appended rows must all be dated after the last row of the store")
+
+    for col in df.columns:
+        _append_npy(os.path.join(store_dir, manifest['files'][col]), df[col].to_numpy(), rows)
+    _append_npy(os.path.join(store_dir, INDEX_FILE), index, rows)
+
+    manifest['rows'] = rows + len(df)
+    manifest.update(extra or {})
+    _write_manifest(store_dir, manifest)
+    return manifest['rows']
+
+
+def is_fresh(csv_path, store_dir):
+    # True when the store exists and was built from the current version of the CSV.
+    # Stores written by other producers (e.g. the feature pipeline) are their own source.
+    try:
+        _, manifest = _read_manifest(store_dir)
+    except (OSError, ValueError):
+        return False
+    source = manifest.get('source') or {}
+    if 'kind' in source:
+        return True
+    try:
+        return source == _source_stamp(csv_path)
+    except OSError:
+        return False
+
+
+class ColumnStore:
+    def __init__(self, store_dir):
+        """
+        Read side of the store. It reads the version that was current when it was
+        opened. After a rewrite that version is only guaranteed to exist for
+        VERSION_GRACE seconds (see _publish); a reader kept open longer should be
+        reopened, or load() and index can raise FileNotFoundError. iter_chunks maps every
+        column when it starts, so on POSIX an iteration already running isn't affected.
+        Args:
+            store_dir (str): directory written by build_store().
+        """
+        self.store_dir = store_dir
+        self.path, self.manifest = _read_manifest(store_dir)   # path: folder of that version's files
+        self.columns = self.manifest['columns']
+        self.index_name = self.manifest['index_name']
+        self.rows = self.manifest['rows']
+        self._index = None
+
+    @property
+    def index(self):
+        # int64 nanosecond timestamps, memory-mapped (only the rows the manifest commits to)
+        if self._index is None:
+            self._index = np.load(os.path.join(self.path, INDEX_FILE), mmap_mode='r')[:self.rows]
+        return self._index
+
+    def ticker_columns(self, ticker):
+        # every column of one ticker: raw OHLCV ('EURUSD=X.Close') and features ('EURUSD=X_SMA_50')
+        return [c for c in self.columns if c.startswith(f'{ticker}.') or c.startswith(f'{ticker}_')]
+
+    def row_range(self, start=None, end=None):
+        # [lo, hi) rows with start <= date <= end, found by binary search
+        lo = 0 if start is None else int(np.searchsorted(self.index, pd.Timestamp(start).value, side='left'))
+        hi = len(self.index) if end is None else int(np.searchsorted(self.index, end_timestamp(end).value, side='right'))
+        return lo, max(lo, hi)
+
+    def load(self, columns=None, ticker=None, start=None, end=None):
+        """
+        Loads a DataFrame with only the requested columns and dates.
+        Args:
+            columns (list): column names; defaults to every column (or the ticker's).
+            ticker (str or list): add every column of these tickers.
+            start, end (str): inclusive date range (YYYY-MM-DD, or with a time for intraday data).
+        Returns:
+            pd.DataFrame indexed by date.
+        """
+        selected = list(columns) if columns is not None else []
+        if ticker is not None:
+            for t in ([ticker] if isinstance(ticker, str) else ticker):
+                cols = self.ticker_columns(t)
+                if not cols:
+                    raise KeyError(f"No columns found for ticker '{t}'")
+                selected += [c for c in cols if c not in selected]
+        if columns is None and ticker is None:
+            selected = list(self.columns)
+
+        missing = [c for c in selected if c not in self.manifest['files']]
+        if missing:
+            raise KeyError(f"Columns not in store: {missing}")
+
+        lo, hi = self.row_range(start, end)
+        data = {}
+        for col in selected:
+            values = np.load(os.path.join(self.path, self.manifest['files'][col]), mmap_mode='r')
+            data[col] = np.array(values[lo:hi])  # reads only the slice from disk
+
+        index = pd.DatetimeIndex(np.asarray(self.index[lo:hi]).view('datetime64[ns]'), name=self.index_name)
+        return pd.DataFrame(data, index=index, columns=selected)
+
+    def iter_chunks(self, columns, chunk_rows, start=None, end=None, overlap=0):
+        """
+        Reads the columns block by block, for data that doesn't fit in memory at once.
+        Args:
+            columns (list): column names.
+            chunk_rows (int): new rows per block.
+            start, end (str): inclusive date range, as in load().
+            overlap (int): rows before each block that are yielded with it again (the
+                history a rolling indicator needs); never reaches back before `start`, so
+                the blocks together see the same rows as load(start=..., end=...).
+        Yields:
+            (frame, new): DataFrame of the overlap plus the block, and how many of its rows
+            (at the end) are new.
+        """
+        if chunk_rows <= 0:
+            raise ValueError("chunk_rows must be positive")
+        missing = [c for c in columns if c not in self.manifest['files']]
+        if missing:
+            raise KeyError(f"Columns not in store: {missing}")
+
+        # the memory maps are opened once; each block reads only its slice from disk
+        maps = {col: np.load(os.path.join(self.path, self.manifest['files'][col]), mmap_mode='r')
+                for col in columns}
+        lo, hi = self.row_range(start, end)
+        for block in range(lo, hi, chunk_rows):
+            first = max(block - overlap, lo)
+            last = min(block + chunk_rows, hi)
+            data = {col: np.array(values[first:last]) for col, values in maps.items()}
+            index = pd.DatetimeIndex(np.asarray(self.index[first:last]).view('datetime64[ns]'), name=self.index_name)
+            yield pd.DataFrame(data, index=index, columns=list(columns)), last - block
+
+
+def open_store(csv_path, store_dir=None, index_col='Date.'):
+    # ColumnStore of a CSV, building or refreshing it first if the CSV is newer than the store
+    store_dir = store_dir or default_store_dir(csv_path)
+    if not is_fresh(csv_path, store_dir):
+        try:
+            build_store(csv_path, store_dir, index_col=index_col)
+        except OSError:
+            # another process may have built it at the same time; its store is as good
+            if not is_fresh(csv_path, store_dir):
+                raise
+    return ColumnStore(store_dir)
+
+
+def load_features(csv_path, columns=None, ticker=None, start=None, end=None, store_dir=None, index_col='Date.'):
+    """
+    Loads feature data through the columnar store, building or refreshing it first if
+    the CSV is newer than the store. Same arguments as ColumnStore.load().
+    """
+    store = open_store(csv_path, store_dir=store_dir, index_col=index_col)
+    return store.load(columns=columns, ticker=ticker, start=start, end=end)
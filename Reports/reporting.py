@@ -1,9 +1,9 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional, Dict
 
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
-import seaborn as sns
 
 try:
     from Backtester.metrics import PerformanceMetrics
@@ -15,17 +15,33 @@ except ModuleNotFoundError:
     if str(project_root) not in sys.path:
         sys.path.append(str(project_root))
     from Backtester.metrics import PerformanceMetrics
+from Backtester.metrics import StreamingMetrics, infer_periods_per_year
+from Backtester.profiling import profiled
+
+# Points per plotted line after downsampling; a 12-inch, 150 dpi PNG is 1800 pixels wide,
+# so more points only cost rendering time
+MAX_POINTS = 2000
 
 
 def _ensure_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
 
 
+def _pyplot():
+    # matplotlib and seaborn load on the first plot, so metrics-only callers never import them
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    return plt, sns
+
+
+@profiled('report.equity_curve', count_rows=True)
 def plot_equity_curve(results_df: pd.DataFrame, title: str = "Portfolio Equity Curve", save_path: Optional[str] = None):
     if 'TotalValue' not in results_df.columns:
         raise ValueError("results_df must include 'TotalValue' column")
 
-    plt.figure(figsize=(12, 5))
+    plt, sns = _pyplot()
+
+    fig = plt.figure(figsize=(12, 5))
     sns.lineplot(x=results_df.index, y=results_df['TotalValue'])
     plt.title(title)
     plt.xlabel("Date")
@@ -34,19 +50,23 @@ def plot_equity_curve(results_df: pd.DataFrame, title: str = "Portfolio Equity C
 
     if save_path:
         _ensure_dir(os.path.dirname(save_path))
-        plt.savefig(save_path, dpi=150)
+        fig.savefig(save_path, dpi=150)
+        # saved: drop it from pyplot, or every call keeps a figure alive (it can still be shown)
+        plt.close(fig)
 
-    return plt.gcf()
+    return fig
 
 
+@profiled('report.drawdown', count_rows=True)
 def plot_drawdown(results_df: pd.DataFrame, title: str = "Drawdown", save_path: Optional[str] = None):
     if 'TotalValue' not in results_df.columns:
         raise ValueError("results_df must include 'TotalValue' column")
 
-    pm = PerformanceMetrics(results_df)
-    dd = pm.max_drawdown()
+    plt, sns = _pyplot()
 
-    plt.figure(figsize=(12, 3.5))
+    dd = drawdown_series(results_df)
+
+    fig = plt.figure(figsize=(12, 3.5))
     sns.lineplot(x=dd.index, y=dd.values, color='crimson')
     plt.fill_between(dd.index, dd.values, 0, color='crimson', alpha=0.2)
     plt.title(title)
@@ -56,14 +76,22 @@ def plot_drawdown(results_df: pd.DataFrame, title: str = "Drawdown", save_path:
 
     if save_path:
         _ensure_dir(os.path.dirname(save_path))
-        plt.savefig(save_path, dpi=150)
+        fig.savefig(save_path, dpi=150)
+        # saved: drop it from pyplot, or every call keeps a figure alive (it can still be shown)
+        plt.close(fig)
 
-    return plt.gcf()
+    return fig
 
 
+@profiled('report.metrics', count_rows=True)
 def export_performance_summary(results_df: pd.DataFrame, save_csv_path: Optional[str] = None) -> pd.DataFrame:
     pm = PerformanceMetrics(results_df)
-    metrics: Dict[str, float] = pm.compute_all_metrics()
+    return export_metrics(pm.compute_all_metrics(), save_csv_path=save_csv_path)
+
+
+def export_metrics(metrics: Dict[str, float], save_csv_path: Optional[str] = None) -> pd.DataFrame:
+    # One-row summary of a compute_all_metrics() dict (e.g. from StreamingMetrics), formatted
+    # like export_performance_summary
     df = pd.DataFrame([{k: v for k, v in metrics.items()}])
 
     # Nicely format percentage-like fields
@@ -81,8 +109,191 @@ def export_performance_summary(results_df: pd.DataFrame, save_csv_path: Optional
     return df
 
 
+@profiled('report.trade_log')
 def save_trade_log(trade_log_df: pd.DataFrame, save_csv_path: str) -> None:
     _ensure_dir(os.path.dirname(save_csv_path))
     trade_log_df.to_csv(save_csv_path, index=False)
 
 
+def drawdown_series(results_df: pd.DataFrame) -> pd.Series:
+    """
+    Drawdown of TotalValue from its running peak, the same values as
+    PerformanceMetrics(results_df).max_drawdown() without copying the frame.
+    """
+    # like PerformanceMetrics, start at the first bar that has a return
+    values = results_df['TotalValue'].to_numpy(dtype=np.float64)[1:]
+    peak = np.maximum.accumulate(values)
+    return pd.Series((values - peak) / peak, index=results_df.index[1:], name='TotalValue')
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling: picks n_out points that keep the visual
+    shape of a line (peaks and troughs survive, unlike taking every k-th point).
+    The first and last points are kept; every bucket in between keeps the point that
+    forms the largest triangle with the point kept before it and the next bucket's mean.
+    Returns:
+        np.ndarray of the kept positions (all of them when n_out >= len(x)).
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # n_out - 2 buckets over the points between the first and the last
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    mean_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts
+    # the "next bucket" of the last bucket is the last point
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # twice the triangle area, up to sign
+        area = np.abs((x[a] - next_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def _downsample(series: pd.Series, max_points: int) -> pd.Series:
+    if len(series) <= max_points:
+        return series
+    index = series.index
+    x = index.asi8 if isinstance(index, pd.DatetimeIndex) else np.arange(len(series))
+    return series.iloc[lttb(x - x[0], series.to_numpy(dtype=np.float64), max_points)]
+
+
+def _load(results):
+    # a results frame, or the path of a results_timeseries.csv
+    if isinstance(results, pd.DataFrame):
+        return results
+    return pd.read_csv(results, index_col=0, parse_dates=True)
+
+
+class ReportRenderer:
+    def __init__(self, dpi: int = 150, max_points: int = MAX_POINTS):
+        """
+        Renders report PNGs with matplotlib's object-oriented Agg API.
+        One Figure is created per renderer and cleared between plots, so rendering
+        thousands of runs doesn't accumulate pyplot figures. Lines longer than
+        max_points are downsampled with LTTB first.
+        """
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        self.dpi = dpi
+        self.max_points = max_points
+        self.fig = Figure()
+        FigureCanvasAgg(self.fig)
+
+    def _save(self, save_path: str) -> str:
+        self.fig.tight_layout()
+        _ensure_dir(os.path.dirname(save_path) or '.')
+        self.fig.savefig(save_path, dpi=self.dpi)
+        self.fig.clear()
+        return save_path
+
+    def equity_curve(self, results_df: pd.DataFrame, save_path: str, title: str = "Portfolio Equity Curve") -> str:
+        equity = _downsample(results_df['TotalValue'], self.max_points)
+        self.fig.set_size_inches(12, 5)
+        ax = self.fig.add_subplot()
+        ax.plot(equity.index, equity.to_numpy(), color='C0')
+        ax.set(title=title, xlabel="Date", ylabel="Total Value")
+        return self._save(save_path)
+
+    def drawdown(self, results_df: pd.DataFrame, save_path: str, title: str = "Drawdown",
+                 dd: Optional[pd.Series] = None) -> str:
+        # dd: a drawdown_series already computed for this run
+        dd = _downsample(drawdown_series(results_df) if dd is None else dd, self.max_points)
+        self.fig.set_size_inches(12, 3.5)
+        ax = self.fig.add_subplot()
+        ax.plot(dd.index, dd.to_numpy(), color='crimson')
+        ax.fill_between(dd.index, dd.to_numpy(), 0, color='crimson', alpha=0.2)
+        ax.set(title=title, xlabel="Date", ylabel="Drawdown")
+        return self._save(save_path)
+
+    def render(self, results_df: pd.DataFrame, outdir: str, title: str = "Portfolio Equity Curve") -> list:
+        # equity_curve.png and drawdown.png of one run
+        return [
+            self.equity_curve(results_df, os.path.join(outdir, 'equity_curve.png'), title=title),
+            self.drawdown(results_df, os.path.join(outdir, 'drawdown.png')),
+        ]
+
+    def comparison(self, runs: Dict[str, pd.DataFrame], save_path: str, title: str = "Run Comparison") -> pd.DataFrame:
+        """
+        One figure comparing several runs: equity curves rebased to 1.0 on top, drawdowns
+        below. Each run's drawdown is computed once and used both for its line and for the
+        Max Drawdown column of the returned table (one row of metrics per run).
+        """
+        self.fig.set_size_inches(12, 8)
+        ax_equity, ax_dd = self.fig.subplots(2, 1, sharex=True, gridspec_kw={'height_ratios': [2, 1]})
+        rows = {}
+        for name, results_df in runs.items():
+            values = results_df['TotalValue']
+            dd = drawdown_series(results_df)
+            rebased = _downsample(values / values.iloc[0], self.max_points)
+            ax_equity.plot(rebased.index, rebased.to_numpy(), label=name)
+            shown = _downsample(dd, self.max_points)
+            ax_dd.plot(shown.index, shown.to_numpy(), label=name)
+
+            metrics = StreamingMetrics.from_values(values.to_numpy(dtype=np.float64),
+                                                   periods_per_year=infer_periods_per_year(results_df.index)).compute_all_metrics()
+            metrics['Max Drawdown'] = float(dd.min()) if len(dd) else float('nan')
+            rows[name] = metrics
+        ax_equity.set(title=title, ylabel="Growth of 1")
+        ax_equity.legend(loc='best', fontsize='small')
+        ax_dd.set(xlabel="Date", ylabel="Drawdown")
+        self._save(save_path)
+        return pd.DataFrame.from_dict(rows, orient='index').rename_axis('Run')
+
+
+# One renderer per worker process, created by the pool initializer
+_worker_renderer = None
+
+
+def _init_worker(dpi, max_points):
+    global _worker_renderer
+    _worker_renderer = ReportRenderer(dpi=dpi, max_points=max_points)
+
+
+def _render_task(task):
+    results, outdir, title, plots, summary = task
+    results_df = _load(results)
+    written = []
+    if plots:
+        written += _worker_renderer.render(results_df, outdir, title=title)
+    if summary:
+        path = os.path.join(outdir, 'performance_summary.csv')
+        export_performance_summary(results_df, save_csv_path=path)
+        written.append(path)
+    return written
+
+
+def render_reports(runs, processes: Optional[int] = None, plots: bool = True, summary: bool = True,
+                   dpi: int = 150, max_points: int = MAX_POINTS) -> list:
+    """
+    Renders the reports of many runs, in a process pool when there are several.
+    Args:
+        runs: list of (results, outdir, title); results is a results DataFrame or the path
+            of a results_timeseries.csv (paths are cheaper to hand to the workers).
+        processes (int): worker processes; None uses os.cpu_count(), 1 renders here.
+        plots (bool): write equity_curve.png and drawdown.png.
+        summary (bool): write performance_summary.csv.
+    Returns:
+        list with the written paths of each run.
+    """
+    tasks = [(results, outdir, title, plots, summary) for results, outdir, title in runs]
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(tasks) <= 1:
+        _init_worker(dpi, max_points)
+        return [_render_task(task) for task in tasks]
+    workers = min(processes, len(tasks))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(dpi, max_points)) as pool:
+        return list(pool.map(_render_task, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
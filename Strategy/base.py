@@ -0,0 +1,109 @@
+"""
+Signal-only strategy protocol:
+    - signals(prices, indicators=None) takes read-only float64 NumPy views of the prices,
+      shape (time,) or (time, columns), and returns only an int8 array of the same shape
+      (+1 = buy, -1 = sell, 0 = hold). No DataFrame is copied and no indicator column is
+      added to one
+    - indicators: pass a dict to get the intermediate series back (e.g. the SMAs or the
+      Bollinger bands, one array per name) for debugging or plots; None skips them
+    - SignalStrategy implements the protocol column by column (subclasses only write
+      _signals for one price series) and keeps the old DataFrame API on top of it:
+      generate_signals(df, price_col) returns a copy of the frame with the
+      '<col>_<indicator>' and '<col>_Signal' columns, as the strategies always did
+    - signal_array(strategy, data, price_col) is what the engines call: the NumPy path for
+      SignalStrategy subclasses, frame_signals(data, price_col) for strategies that need
+      more of the frame than the prices (e.g. Strategy.timeframe.HigherTimeframe, which
+      resamples by date) but still return only the int8 array, and generate_signals (and
+      one column picked out of its frame) for any other strategy object
+"""
+
+import numpy as np
+
+
+def price_view(values):
+    # float64 view of the prices that can't be written to (a copy only when the dtype differs)
+    view = np.asarray(values, dtype=np.float64).view()
+    view.flags.writeable = False
+    return view
+
+
+def _price_cols(data, price_col):
+    cols = [price_col] if isinstance(price_col, str) else list(price_col)
+    missing = [c for c in cols if c not in data.columns]
+    if missing:
+        raise ValueError(f"Column '{missing[0]}' not found in dataframe")
+    return cols
+
+
+class SignalStrategy:
+    """
+    Base class of the signal-only strategies. Subclasses implement _signals(price,
+    indicators) for one 1-D price view; everything else is shared.
+    """
+
+    def _signals(self, price, indicators):
+        # int8 signals of one price series; fill `indicators` (a dict) when it isn't None
+        raise NotImplementedError
+
+    def signals(self, prices, indicators=None):
+        """
+        Signals of one or more price series.
+        Args:
+            prices (array-like): prices, shape (time,) or (time, columns).
+            indicators (dict): optional; filled with name -> array (shaped like prices) of
+                the intermediate series.
+        Returns:
+            np.ndarray of int8, shaped like prices.
+        """
+        prices = price_view(prices)
+        if prices.ndim == 1:
+            return np.asarray(self._signals(prices, indicators), dtype=np.int8)
+
+        out = np.empty(prices.shape, dtype=np.int8)
+        per_column = []
+        for j in range(prices.shape[1]):
+            found = None if indicators is None else {}
+            out[:, j] = self._signals(prices[:, j], found)
+            per_column.append(found)
+        if indicators is not None:
+            for name in per_column[0] if per_column else ():
+                indicators[name] = np.column_stack([found[name] for found in per_column])
+        return out
+
+    def generate_signals(self, df, price_col):
+        """
+        DataFrame API: a copy of `df` with '<col>_<indicator>' and '<col>_Signal' columns
+        for every price column (a name or a list of names).
+        """
+        price_cols = _price_cols(df, price_col)
+        indicators = {}
+        signals = self.signals(df[price_cols].to_numpy(dtype=np.float64), indicators=indicators)
+
+        data = df.copy()
+        for j, col in enumerate(price_cols):
+            for name, values in indicators.items():
+                data[f"{col}_{name}"] = values[:, j]
+            data[f"{col}_Signal"] = signals[:, j]
+        return data
+
+
+def signal_array(strategy, data, price_col):
+    """
+    Signals of any strategy as an array: 1-D for one price column, (time, columns) for a list.
+    SignalStrategy subclasses get NumPy views of the price columns only, strategies with
+    frame_signals get the frame (and return an array), other strategies go through their
+    generate_signals frame.
+    """
+    if isinstance(strategy, SignalStrategy):
+        cols = _price_cols(data, price_col)
+        if isinstance(price_col, str):
+            return strategy.signals(data[price_col].to_numpy(dtype=np.float64))
+        return strategy.signals(data[cols].to_numpy(dtype=np.float64))
+    if hasattr(strategy, 'frame_signals'):
+        _price_cols(data, price_col)
+        return strategy.frame_signals(data, price_col)
+
+    df_signals = strategy.generate_signals(data, price_col=price_col)
+    if isinstance(price_col, str):
+        return df_signals[f"{price_col}_Signal"].to_numpy()
+    return df_signals[[f'{c}_Signal' for c in price_col]].to_numpy()
@@ -0,0 +1,155 @@
+"""
+Signal cache:
+    - signals only depend on the prices and the strategy parameters, so runs that
+      only change the cost model or the capital can reuse them
+    - key = strategy class + its parameters + price column(s) + a hash of the input data
+    - in-memory LRU tier, plus an optional on-disk tier (one .npy per key) that
+      evicts the least recently used files once it grows past a size limit
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def _array_bytes(values):
+    # raw bytes for numeric/datetime arrays, pandas' row hashes for anything else (e.g. strings)
+    if values.dtype.kind in 'biufcmM':
+        return np.ascontiguousarray(values).view(np.uint8)
+    return pd.util.hash_array(values).view(np.uint8)
+
+
+def data_fingerprint(data, columns):
+    """
+    Hash of the index and the given columns of a DataFrame (values and dtypes).
+    Two frames with the same prices on the same dates get the same fingerprint.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(_array_bytes(data.index.to_numpy()))
+    for col in columns:
+        values = data[col].to_numpy()
+        h.update(col.encode())
+        h.update(values.dtype.str.encode())
+        h.update(_array_bytes(values))
+    return h.hexdigest()
+
+
+def strategy_params(strategy):
+    # Public attributes are the parameters; underscore attributes are runtime state (e.g. on_bar buffers)
+    return {k: v for k, v in sorted(vars(strategy).items()) if not k.startswith('_')}
+
+
+class SignalCache:
+    def __init__(self, max_entries=128, cache_dir=None, max_disk_bytes=512 * 1024 ** 2):
+        """
+        Args:
+            max_entries (int): signal arrays kept in memory (least recently used go first).
+            cache_dir (str): folder for the on-disk tier; None keeps the cache in memory only.
+            max_disk_bytes (int): size limit of the on-disk tier.
+        """
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, strategy, data, price_col):
+        cols = [price_col] if isinstance(price_col, str) else list(price_col)
+        payload = {
+            'strategy': f'{type(strategy).__module__}.{type(strategy).__qualname__}',
+            'params': strategy_params(strategy),
+            'price_col': cols,
+            'data': data_fingerprint(data, cols),
+        }
+        return hashlib.blake2b(json.dumps(payload, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.npy')
+
+    def get(self, key):
+        # Returns the cached signal array or None
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._memory[key]
+
+        if self.cache_dir:
+            path = self._path(key)
+            try:
+                signals = np.load(path)
+            except (OSError, ValueError):
+                signals = None
+            if signals is not None:
+                os.utime(path)  # mark as recently used for eviction
+                self._remember(key, signals)
+                self.hits += 1
+                return signals
+
+        self.misses += 1
+        return None
+
+    def put(self, key, signals):
+        signals = np.asarray(signals)
+        self._remember(key, signals)
+        if self.cache_dir:
+            path = self._path(key)
+            tmp = f'{path}.{os.getpid()}.tmp'
+            with open(tmp, 'wb') as f:
+                np.save(f, signals)
+            os.replace(tmp, path)
+            self._evict_disk()
+
+    def get_or_compute(self, strategy, data, price_col, compute):
+        """
+        Returns the signals for (strategy, data, price_col), calling compute() only on a miss.
+        compute must return the signal values as an array aligned with data.index.
+        """
+        key = self.key(strategy, data, price_col)
+        signals = self.get(key)
+        if signals is None:
+            signals = np.asarray(compute())
+            self.put(key, signals)
+        return signals
+
+    def _remember(self, key, signals):
+        signals.setflags(write=False)  # shared between callers, so nobody may modify it in place
+        self._memory[key] = signals
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        # drop least recently used files until the tier fits in max_disk_bytes
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npy'):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        self._memory.clear()
+        if self.cache_dir:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.npy'):
+                    os.remove(os.path.join(self.cache_dir, name))
@@ -0,0 +1,178 @@
+"""
+Batched indicators for many windows at once.
+
+Each function takes one price series and a list of windows and returns a
+2-D (window x time) matrix, so a parameter grid reuses one pass over the data.
+A (time x ticker) panel works too and gives a (window x time x ticker) array:
+    - rolling means and standard deviations come from cumulative-sum prefix
+      arrays (one cumsum for all windows instead of one rolling pass per window)
+    - pct-change momentum for many lookbacks is one shifted division per lookback
+
+Values match pandas `rolling(w).mean()`, `rolling(w).std()` and `pct_change(w)`:
+NaN until a window is full and whenever the window contains a NaN. Rolling
+results can differ from pandas in the last few bits because pandas uses an
+online sum instead of prefix differences.
+
+Because of that, the strategies compare indicators with exceeds()/at_least(), which
+treat values closer than TIE_TOLERANCE (relative) as equal. Exact ties are common
+(flat stretches, prices quoted to a few decimals), and the batch, pandas, chunked and
+bar-by-bar paths would otherwise break them in different directions.
+"""
+
+import numpy as np
+
+
+# Relative difference under which two indicator values count as equal. Far above the
+# round-off of the rolling sums (~1e-15 relative), far below the smallest real gap between
+# two SMAs of prices quoted to 4-5 decimals
+TIE_TOLERANCE = 1e-10
+
+
+def exceeds(a, b, rtol=TIE_TOLERANCE):
+    """
+    a > b by more than the tie tolerance (relative to the larger magnitude); False where
+    either side is NaN. Works on scalars and broadcasts over arrays.
+    """
+    return (a - b) > rtol * np.maximum(abs(a), abs(b))
+
+
+def at_least(a, b, rtol=TIE_TOLERANCE):
+    # a >= b with ties inside the tolerance counted as equal; False where either side is NaN
+    return ~exceeds(b, a, rtol) & (a == a) & (b == b)
+
+
+def _as_windows(windows):
+    windows = np.atleast_1d(np.asarray(windows, dtype=np.int64))
+    if (windows < 1).any():
+        raise ValueError("windows must be positive integers")
+    return windows
+
+
+def _prefix_sums(values, squares=False):
+    # Prefix sums (along time, axis 0) of each series shifted by its first finite value
+    # (keeps the sums small, which avoids cancellation in the variance), with NaNs counted
+    # separately (nan_count is None when there are none).
+    values = np.asarray(values, dtype=np.float64)
+    isnan = np.isnan(values)
+    has_nan = bool(isnan.any())
+    first = np.argmax(~isnan, axis=0) if len(values) else 0
+    shift = np.nan_to_num(np.take_along_axis(values, np.expand_dims(first, 0), axis=0)[0]) if len(values) else 0.0
+    x = values - shift
+    if has_nan:
+        x[isnan] = 0.0
+
+    nan_count = _cumsum0(isnan.astype(np.int64)) if has_nan else None
+    s1 = _cumsum0(x)
+    s2 = _cumsum0(np.square(x, out=x)) if squares else None
+    return shift, nan_count, s1, s2
+
+
+def _cumsum0(x):
+    # [0, x0, x0 + x1, ...] along axis 0, accumulated straight into the output
+    out = np.empty((len(x) + 1,) + x.shape[1:], dtype=x.dtype)
+    out[0] = 0
+    np.cumsum(x, axis=0, out=out[1:])
+    return out
+
+
+def _window_sum(prefix, w, n, out=None):
+    # prefix[t + 1] - prefix[t + 1 - w] for t >= w - 1, laid out on the full time axis
+    # (NaN before that); written into `out` when given, to avoid temporaries
+    if out is None:
+        out = np.empty((n,) + prefix.shape[1:])
+    out[:w - 1] = np.nan
+    if w <= n:
+        np.subtract(prefix[w:], prefix[:n - w + 1], out=out[w - 1:])
+    return out
+
+
+def _window_has_nan(nan_count, w, n):
+    # None when the series has no NaN (then only the warm-up is invalid, and _window_sum
+    # already leaves it NaN)
+    if nan_count is None:
+        return None
+    bad = np.ones((n,) + nan_count.shape[1:], dtype=bool)
+    if w <= n:
+        bad[w - 1:] = (nan_count[w:] - nan_count[:n - w + 1]) > 0
+    return bad
+
+
+def rolling_mean_matrix(values, windows):
+    """
+    Simple moving averages for several windows.
+    Args:
+        values (array-like): price series of length N, or an (N x tickers) panel.
+        windows (list of int): window lengths.
+    Returns:
+        np.ndarray of shape (len(windows), N), or (len(windows), N, tickers) for a panel.
+    """
+    windows = _as_windows(windows)
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    shift, nan_count, s1, _ = _prefix_sums(values)
+
+    out = np.empty((len(windows),) + values.shape)
+    for row, w in enumerate(windows):
+        mean = _window_sum(s1, w, n, out=out[row])
+        mean /= w
+        mean += shift
+        bad = _window_has_nan(nan_count, w, n)
+        if bad is not None:
+            np.copyto(mean, np.nan, where=bad)
+    return out
+
+
+def rolling_mean_std_matrix(values, windows, ddof=1):
+    """
+    Rolling means and standard deviations for several windows, sharing one set of
+    prefix sums.
+    Returns:
+        (means, stds), each of shape (len(windows), N) (or (len(windows), N, tickers)).
+    """
+    windows = _as_windows(windows)
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    shift, nan_count, s1, s2 = _prefix_sums(values, squares=True)
+
+    means = np.empty((len(windows),) + values.shape)
+    stds = np.empty((len(windows),) + values.shape)
+    for row, w in enumerate(windows):
+        # window sums, turned into mean and std in place
+        mean = _window_sum(s1, w, n, out=means[row])
+        std = _window_sum(s2, w, n, out=stds[row])
+        bad = _window_has_nan(nan_count, w, n)
+
+        if w - ddof > 0:
+            # var = (sum2 - sum1 * sum1 / w) / (w - ddof)
+            sq = mean * mean
+            sq /= w
+            std -= sq
+            std /= w - ddof
+            np.maximum(std, 0.0, out=std)  # clamp tiny negative round-off
+            np.sqrt(std, out=std)
+        else:
+            std[:] = np.nan
+
+        mean /= w
+        mean += shift
+        if bad is not None:
+            np.copyto(mean, np.nan, where=bad)
+            np.copyto(std, np.nan, where=bad)
+    return means, stds
+
+
+def pct_change_matrix(values, lookbacks):
+    """
+    Percentage change over several lookbacks (price[t] / price[t - lookback] - 1).
+    Returns:
+        np.ndarray of shape (len(lookbacks), N) (or (len(lookbacks), N, tickers)).
+    """
+    lookbacks = _as_windows(lookbacks)
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+
+    out = np.full((len(lookbacks),) + values.shape, np.nan)
+    for row, lb in enumerate(lookbacks):
+        if lb < n:
+            out[row, lb:] = values[lb:] / values[:n - lb] - 1
+    return out
@@ -10,45 +10,160 @@ Two popular ways to measure this:
 For simplicity, I will start with the Bollinger Band approach and then the RSI approach.
 """
 
+import itertools
+
 import pandas as pd
 import numpy as np
 
-class BollingerMeanReversionStrategy:
+from Strategy.base import SignalStrategy
+from Strategy.indicators import at_least, exceeds, rolling_mean_std_matrix
+from Strategy.state import resolve_positions, transitions
+from Strategy.streaming import RollingWindow
+
+class BollingerMeanReversionStrategy(SignalStrategy):
     """
     Mean Reversion strategy using Bollinger Bands.
         - Buy when price is below lower band (oversold)
         - Sell when price is above upper band (overbought)
+    With exit='mean' a position opened at a band is closed when the price gets back to the
+    rolling mean instead of waiting for the opposite band. That depends on the position
+    held, so the signals come from the Strategy.state kernel: the Signal column is +1 on
+    the bar the long opens and -1 on the bar it closes (the buy/sell convention of the
+    backtest), and a Position column holds the full long/flat/short state (+1/0/-1).
     """
 
-    def __init__(self, window = 20, num_std = 2):
+    def __init__(self, window = 20, num_std = 2, exit = 'band'):
+        if exit not in ('band', 'mean'):
+            raise ValueError(f"exit must be 'band' or 'mean', got '{exit}'")
         self.window = window
         self.num_std = num_std
+        self.exit = exit
 
-    def generate_signals(self, df, price_col='EURUSD=X.Close'):
-        df = df.copy()
+    @property
+    def warmup(self):
+        # bars of history before a bar that its signal depends on (chunked backtests);
+        # None with exit='mean', where the position depends on the whole path
+        return self.window - 1 if self.exit == 'band' else None
 
-        if price_col not in df.columns:
-            raise ValueError(f"Column '{price_col}' not found in dataframe")
+    def generate_signals(self, df, price_col='EURUSD=X.Close'):
+        return super().generate_signals(df, price_col)
 
-        price_series = df[price_col].astype(float)
+    def _signals(self, price, indicators):
+        price_series = pd.Series(price, copy=False)
 
         # Compute Bollinger bands
-        rolling_mean = price_series.rolling(window=self.window).mean()
-        rolling_std = price_series.rolling(window=self.window).std()
+        rolling_mean = price_series.rolling(window=self.window).mean().to_numpy()
+        rolling_std = price_series.rolling(window=self.window).std().to_numpy()
         upper_band = rolling_mean + (self.num_std * rolling_std)
         lower_band = rolling_mean - (self.num_std * rolling_std)
 
-        df[f'{price_col}_rolling_mean'] = rolling_mean
-        df[f'{price_col}_rolling_std'] = rolling_std
-        df[f'{price_col}_upper_band'] = upper_band
-        df[f'{price_col}_lower_band'] = lower_band
+        if indicators is not None:
+            indicators['rolling_mean'] = rolling_mean
+            indicators['rolling_std'] = rolling_std
+            indicators['upper_band'] = upper_band
+            indicators['lower_band'] = lower_band
+
+        if self.exit == 'mean':
+            positions = self._positions(price, rolling_mean, lower_band, upper_band)
+            if indicators is not None:
+                indicators['Position'] = positions
+            return transitions(np.maximum(positions, 0))
+
+        # +1 below the lower band, -1 above the upper band (that test wins if both hold)
+        return np.where(exceeds(price, upper_band), -1, np.where(exceeds(lower_band, price), 1, 0)).astype(np.int8)
+
+    @staticmethod
+    def _positions(price, mean, lower_band, upper_band):
+        # long from a close below the lower band until a close at or above the mean,
+        # short from a close above the upper band until a close at or below the mean
+        # (a close equal to the mean within the tie tolerance counts as at the mean)
+        positions, _ = resolve_positions(
+            long_entry=exceeds(lower_band, price),
+            long_exit=at_least(price, mean),
+            short_entry=exceeds(price, upper_band),
+            short_exit=at_least(mean, price),
+        )
+        return positions
+
+    @classmethod
+    def generate_signal_grid(cls, df, price_col, param_grid):
+        """
+        Signals for every (window, num_std) combination in one go.
+        The rolling mean/std of each window is computed once and shared by all num_std
+        values; the band tests are one broadcast comparison.
+        Args:
+            df (pd.DataFrame): price data.
+            price_col (str): column with the prices.
+            param_grid (dict): {'window': [...], 'num_std': [...], 'exit': [...]}; a
+                missing key uses the default value.
+        Returns:
+            (params, signals): list of param dicts (product order, window outer) and an
+            int8 array of shape (len(params), len(df)) with values +1/0/-1.
+        """
+        windows = list(param_grid.get('window', [cls().window]))
+        num_stds = list(param_grid.get('num_std', [cls().num_std]))
+        exits = list(param_grid.get('exit', [cls().exit]))
+
+        price = df[price_col].to_numpy(dtype=float)
+        means, stds = rolling_mean_std_matrix(price, sorted(set(windows)))
+        row = {w: i for i, w in enumerate(sorted(set(windows)))}
+        rows = [row[w] for w in windows]
+        mean = means[rows][:, None, :]
+        std = stds[rows][:, None, :]
+        k = np.asarray(num_stds, dtype=float)[None, :, None]
+
+        upper_band = mean + (k * std)
+        lower_band = mean - (k * std)
+        signals = []
+        for exit in exits:
+            if exit == 'mean':
+                # every (window, num_std) combination is one (time-major) column of the state kernel
+                columns = [np.broadcast_to(a, upper_band.shape).reshape(-1, len(price)).T
+                           for a in (mean, lower_band, upper_band)]
+                positions = cls._positions(price[:, None], *columns)
+                signals.append(transitions(np.maximum(positions, 0)).T)
+            else:
+                band = exceeds(lower_band, price).astype(np.int8) - exceeds(price, upper_band).astype(np.int8)
+                signals.append(band.reshape(-1, len(price)))
+        params = [{'window': w, 'num_std': n, 'exit': e} for e, w, n in itertools.product(exits, windows, num_stds)]
+        return params, np.concatenate(signals)
+
+    def reset(self):
+        # Clears the bar-by-bar state used by on_bar
+        self._window = RollingWindow(self.window)
+        self._position = 0
 
-        signal_col = f"{price_col}_Signal"
-        df[signal_col] = 0
-        df.loc[price_series < lower_band, signal_col] = 1
-        df.loc[price_series > upper_band, signal_col] = -1
+    def on_bar(self, price):
+        """
+        Incremental version of generate_signals: feed one new price, get its signal.
+        The rolling mean/std come from running sums, so each bar is O(1).
+        """
+        if getattr(self, '_window', None) is None:
+            self.reset()
+        price = float(price)
+        self._window.push(price)
+        rolling_mean, rolling_std = self._window.mean(), self._window.std()
+        if self.exit == 'mean':
+            return self._step_position(price, rolling_mean, rolling_std)
+        if exceeds(price, rolling_mean + (self.num_std * rolling_std)):
+            return -1
+        if exceeds(rolling_mean - (self.num_std * rolling_std), price):
+            return 1
+        return 0
 
-        return df
+    def _step_position(self, price, rolling_mean, rolling_std):
+        # one bar of the Strategy.state machine: exits first, then entries (with the tie
+        # tolerance of the batch path)
+        position = self._position
+        if (position == 1 and at_least(price, rolling_mean)) or (position == -1 and at_least(rolling_mean, price)):
+            position = 0
+        if exceeds(rolling_mean - (self.num_std * rolling_std), price):
+            position = 1
+        elif exceeds(price, rolling_mean + (self.num_std * rolling_std)):
+            position = -1
+        signal = (position == 1) - (self._position == 1)
+        self._position = position
+        return signal
 
 #output : Process finished with exit code 0, meaning no errors - 08/10/25
 
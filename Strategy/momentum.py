@@ -12,12 +12,22 @@ You can measure this “momentum” as percentage return over a lookback window,
 Then you can:
 - Buy (long) when momentum > 0 (price increasing)
 - Sell (short) when momentum < 0 (price decreasing)
+- Stay out (0) while the momentum is unknown, i.e. during the first `lookback` bars
 """
 
 import pandas as pd
 import numpy as np
 
-class MomentumStrategy:
+from Strategy.base import SignalStrategy
+from Strategy.indicators import pct_change_matrix
+from Strategy.streaming import Lag
+
+def _direction(momentum):
+    # +1 above 0, -1 at or below 0, 0 where the momentum is NaN (warmup, missing prices)
+    return np.where(momentum > 0, 1, np.where(np.isnan(momentum), 0, -1)).astype(np.int8)
+
+
+class MomentumStrategy(SignalStrategy):
     """
     - Calculate rolling returns over a lookback period.
     - Go long if momentum > 0, short if momentum < 0.
@@ -25,27 +35,58 @@ class MomentumStrategy:
     def __init__(self, lookback = 20): #lookback defined as 20days to look back
         self.lookback = lookback
 
-    def generate_signals(self, data, price_col=None):
-        df=data.copy()
+    @property
+    def warmup(self):
+        # bars of history before a bar that its signal depends on (chunked backtests)
+        return self.lookback
 
+    def generate_signals(self, data, price_col=None):
         # Auto-detect price column
         if price_col is None:
-            price_col = [c for c in df.columns if c.endswith('.Close')]
+            price_col = [c for c in data.columns if c.endswith('.Close')]
             if not price_col:
                 raise KeyError("No '.Close' column found in dataframe.")
-        elif isinstance(price_col, str):
-            price_col = [price_col]  # convert single string to list
-
+        return super().generate_signals(data, price_col)
 
-        for col in price_col:
-            momentum_col = f"{col}_Momentum"
-            signal_col = f"{col}_Signal"
+    def _signals(self, price, indicators):
+        # Calculate percentage momentum
+        momentum = pd.Series(price, copy=False).pct_change(self.lookback).to_numpy()
+        if indicators is not None:
+            indicators['Momentum'] = momentum
 
-            # Calculate percentage momentum
-            df[momentum_col] = df[col].pct_change(self.lookback)
+        # Generate signals (0 while the momentum is still unknown, so nothing is opened in the warmup)
+        return _direction(momentum)
 
-            # Generate signals
-            df[signal_col] = np.where(df[momentum_col] > 0, 1, -1)
+    @classmethod
+    def generate_signal_grid(cls, data, price_col, param_grid):
+        """
+        Signals for every lookback in one go.
+        Args:
+            data (pd.DataFrame): price data.
+            price_col (str): column with the prices.
+            param_grid (dict): {'lookback': [...]}.
+        Returns:
+            (params, signals): list of param dicts and an int8 array of shape
+            (len(params), len(data)) with values +1/0/-1 (0 in the warmup).
+        """
+        lookbacks = list(param_grid.get('lookback', [cls().lookback]))
+        momentum = pct_change_matrix(data[price_col].to_numpy(dtype=float), lookbacks)
+        signals = _direction(momentum)
+        return [{'lookback': lb} for lb in lookbacks], signals
 
-        return df
+    def reset(self):
+        # Clears the bar-by-bar state used by on_bar
+        self._lag = Lag(self.lookback)
 
+    def on_bar(self, price):
+        """
+        Incremental version of generate_signals: feed one new price, get its signal.
+        Only the last `lookback` prices are kept, so each bar is O(1).
+        """
+        if getattr(self, '_lag', None) is None:
+            self.reset()
+        price = float(price)
+        momentum = price / self._lag.push(price) - 1
+        if momentum != momentum:
+            return 0    # no price `lookback` bars back yet
+        return 1 if momentum > 0 else -1
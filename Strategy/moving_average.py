@@ -1,35 +1,88 @@
+import itertools
+
+import numpy as np
 import pandas as pd
 
-class MovingAverageCrossover:
+from Strategy.base import SignalStrategy
+from Strategy.indicators import exceeds, rolling_mean_matrix
+from Strategy.streaming import RollingWindow
+
+class MovingAverageCrossover(SignalStrategy):
     def __init__(self,short_window=50,long_window=200):
         self.short_window = short_window
         self.long_window = long_window
 
-    def generate_signals(self,df, price_col):
+    @property
+    def warmup(self):
+        # bars of history before a bar that its signal depends on (chunked backtests)
+        return max(self.short_window, self.long_window) - 1
+
+    def _signals(self, price, indicators):
         #Generate trading signals based on moving average crossover. (Simple Moving Average)
         #Buy when short MA > long MA, sell when short MA < long MA.
+        series = pd.Series(price, copy=False)
+        short_ma = series.rolling(window=self.short_window).mean().to_numpy()
+        long_ma = series.rolling(window=self.long_window).mean().to_numpy()
+        if indicators is not None:
+            indicators['SMA_short'] = short_ma
+            indicators['SMA_long'] = long_ma
 
-        data = df.copy()
+        # 0 until both SMAs exist (NaN comparisons are False), then +/-1 based on the crossover;
+        # equal SMAs (within the tie tolerance) stay 0
+        return exceeds(short_ma, long_ma).astype(np.int8) - exceeds(long_ma, short_ma).astype(np.int8)
 
-        if isinstance(price_col, str):
-            price_cols = [price_col]
-        else:
-            price_cols = price_col
+    @classmethod
+    def generate_signal_grid(cls, df, price_col, param_grid):
+        """
+        Signals for every (short_window, long_window) combination in one go.
+        The SMA of every distinct window is computed once and the crossover rule is a
+        single broadcast comparison of the short-SMA rows against the long-SMA rows.
+        Args:
+            df (pd.DataFrame): price data.
+            price_col (str): column with the prices.
+            param_grid (dict): {'short_window': [...], 'long_window': [...]}; a missing
+                key uses the default value.
+        Returns:
+            (params, signals): list of param dicts (product order, short outer) and an
+            int8 array of shape (len(params), len(df)) with values +1/0/-1.
+        """
+        shorts = list(param_grid.get('short_window', [cls().short_window]))
+        longs = list(param_grid.get('long_window', [cls().long_window]))
 
-        for col in price_cols:
-            short_col = f"{col}_SMA_short"
-            long_col = f"{col}_SMA_long"
-            signal_col = f"{col}_Signal"
+        windows = sorted(set(shorts) | set(longs))
+        sma = rolling_mean_matrix(df[price_col].to_numpy(dtype=float), windows)
+        row = {w: i for i, w in enumerate(windows)}
+        short_sma = sma[[row[w] for w in shorts]][:, None, :]
+        long_sma = sma[[row[w] for w in longs]][None, :, :]
 
-            data[short_col] = data[col].rolling(window=self.short_window).mean()
-            data[long_col] = data[col].rolling(window=self.long_window).mean()
+        # NaN comparisons are False, so bars before both SMAs exist stay 0, and ties are decided
+        # with the same tolerance as generate_signals (prefix sums round differently from pandas)
+        signals = exceeds(short_sma, long_sma).astype(np.int8) - exceeds(long_sma, short_sma).astype(np.int8)
+        params = [{'short_window': s, 'long_window': l} for s, l in itertools.product(shorts, longs)]
+        return params, signals.reshape(len(params), -1)
 
-            # Initialize signals as 0, then set +/-1 based on crossover
-            data[signal_col] = 0
-            data.loc[data[short_col] > data[long_col], signal_col] = 1
-            data.loc[data[short_col] < data[long_col], signal_col] = -1
+    def reset(self):
+        # Clears the bar-by-bar state used by on_bar
+        self._short = RollingWindow(self.short_window)
+        self._long = RollingWindow(self.long_window)
 
-        return data
+    def on_bar(self, price):
+        """
+        Incremental version of generate_signals: feed one new price, get its signal.
+        Keeps two running windows, so each bar is O(1) and gives the same signal as the
+        batch path on the same history.
+        """
+        if getattr(self, '_short', None) is None:
+            self.reset()
+        self._short.push(price)
+        self._long.push(price)
+        short_ma, long_ma = self._short.mean(), self._long.mean()
+        # running sums round differently from the batch SMAs: ties use the same tolerance
+        if exceeds(short_ma, long_ma):
+            return 1
+        if exceeds(long_ma, short_ma):
+            return -1
+        return 0
 
 #output : Process finished with exit code 0, meaning no errors - 08/10/25
 #backtest code for this strategy is working
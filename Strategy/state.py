@@ -0,0 +1,185 @@
+"""
+Path-dependent position state without a bar loop.
+
+Rules like "stay long until the price crosses back above the mean" or "act on the bar
+the short SMA crosses the long SMA, not on every bar it is above it" depend on the
+position held so far, so a plain element-wise comparison can't express them. Here a
+strategy only declares boolean entry/exit conditions and the state machine
+    flat --long_entry--> long --long_exit--> flat
+    flat --short_entry--> short --short_exit--> flat
+    long --short_entry--> short, short --long_entry--> long (reversals)
+is resolved over whole arrays:
+    - the side held is the side of the last entry, unless an exit of that side came after it
+      (running maxima of "bar of the last entry" / "bar of the last exit" per side)
+    - holding periods count bars from the last bar a position was opened
+    - arrays are processed in chunks; the position and bars held at the end of a chunk
+      are carried into the next one, so long series (or live batches) don't need one
+      big set of temporaries
+On each bar exits are applied before entries: a long with long_exit and long_entry on
+the same bar is closed and reopened (a new trade). Conflicting entries on the same bar
+(long_entry and short_entry) are ignored.
+
+resolve_positions_reference is the same machine as a plain Python loop, kept as the
+definition the vectorized kernel is checked against.
+"""
+
+import numpy as np
+
+# Rows per chunk in resolve_positions
+CHUNK_ROWS = 1 << 16
+
+
+def crossed_above(a, b):
+    """
+    True on the bars where `a` moves from <= b to > b (the transition only, not the level).
+    a and b are arrays (or a scalar for b) with time on axis 0; the first bar is False.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    above = a > b
+    out = np.zeros(above.shape, dtype=bool)
+    # a NaN bar is neither above nor below, so the bar after it can't be a cross
+    out[1:] = above[1:] & (a <= b)[:-1]
+    return out
+
+
+def crossed_below(a, b):
+    # True on the bars where `a` moves from >= b to < b
+    a = np.asarray(a, dtype=np.float64)
+    below = a < b
+    out = np.zeros(below.shape, dtype=bool)
+    out[1:] = below[1:] & (a >= b)[:-1]
+    return out
+
+
+def _last_true(flags, before):
+    # Per bar, the (chunk-local) index of the last True at or before it; `before` where none
+    # (int32 is enough for chunk-local indices and halves the memory traffic)
+    idx = np.arange(len(flags), dtype=np.int32).reshape((-1,) + (1,) * (flags.ndim - 1))
+    return np.maximum.accumulate(np.where(flags, idx, np.asarray(before, dtype=np.int32)), axis=0)
+
+
+def _condition(flags, shape):
+    # a missing condition is never true
+    if flags is None:
+        return np.zeros(shape, dtype=bool)
+    return np.asarray(flags, dtype=bool)
+
+
+class PositionState:
+    def __init__(self, position=0, held=0):
+        """
+        Carry of the state machine between chunks.
+        Args:
+            position (int or np.ndarray): side held before the first bar (+1/0/-1), one per
+                column for 2-D conditions.
+            held (int or np.ndarray): bars that position has been held.
+        """
+        self.position = position
+        self.held = held
+
+    def update(self, long_entry, long_exit=None, short_entry=None, short_exit=None):
+        """
+        Resolves one chunk of bars and carries its final state forward.
+        Args:
+            long_entry, long_exit, short_entry, short_exit (np.ndarray of bool): conditions,
+                shape (time,) or (time, columns); None = never.
+        Returns:
+            (positions, held): int8 side (+1/0/-1) and int64 bars held (1 on the entry bar,
+            0 when flat), both shaped like the conditions.
+        """
+        long_entry = np.asarray(long_entry, dtype=bool)
+        shape = long_entry.shape
+        long_exit = _condition(long_exit, shape)
+        short_entry = _condition(short_entry, shape)
+        short_exit = _condition(short_exit, shape)
+        n = shape[0]
+        if n == 0:
+            return np.zeros(shape, dtype=np.int8), np.zeros(shape, dtype=np.int64)
+
+        carry = np.broadcast_to(np.asarray(self.position, dtype=np.int8), shape[1:])
+        held_before = np.broadcast_to(np.asarray(self.held, dtype=np.int64), shape[1:])
+
+        # side of every bar's entry (0 = none, or conflicting entries)
+        side = long_entry.astype(np.int8) - short_entry.astype(np.int8)
+
+        # the carried position acts as an entry at bar -1
+        last_entry = _last_true(side != 0, -1)
+        entered = np.take_along_axis(side, np.maximum(last_entry, 0), axis=0)
+        positions = np.where(last_entry >= 0, entered, carry).astype(np.int8)
+
+        # ...unless an exit of that side came later (an exit on the entry bar came first)
+        closed_long = (positions == 1) & (_last_true(long_exit, -1) > last_entry)
+        closed_short = (positions == -1) & (_last_true(short_exit, -1) > last_entry)
+        positions[closed_long | closed_short] = 0
+
+        # a trade starts where the side changes, or where it was closed and reopened on one bar
+        previous = np.concatenate([carry[None], positions[:-1]])
+        opened = (positions != previous) | ((positions == 1) & long_exit) | ((positions == -1) & short_exit)
+        # a position carried in started `held_before` bars before this chunk
+        start = _last_true(opened, -held_before).astype(np.int64)
+        idx = np.arange(n).reshape((-1,) + (1,) * (len(shape) - 1))
+        held = np.where(positions != 0, idx - start + 1, 0)
+
+        self.position = positions[-1].copy()
+        self.held = held[-1].copy()
+        return positions, held
+
+
+def resolve_positions(long_entry, long_exit=None, short_entry=None, short_exit=None,
+                      chunk_rows=CHUNK_ROWS):
+    """
+    Positions and holding periods implied by entry/exit conditions over a whole series.
+    Args:
+        long_entry, long_exit, short_entry, short_exit (array-like of bool): conditions
+            with time on axis 0 (shape (time,) or (time, columns)); None = never.
+        chunk_rows (int): bars resolved per chunk.
+    Returns:
+        (positions, held): int8 (+1/0/-1) and int64 arrays shaped like long_entry.
+    """
+    long_entry = np.asarray(long_entry, dtype=bool)
+    conditions = [long_entry] + [None if c is None else np.asarray(c, dtype=bool)
+                                 for c in (long_exit, short_entry, short_exit)]
+    positions = np.empty(long_entry.shape, dtype=np.int8)
+    held = np.empty(long_entry.shape, dtype=np.int64)
+
+    state = PositionState()
+    for lo in range(0, len(long_entry), chunk_rows):
+        hi = lo + chunk_rows
+        positions[lo:hi], held[lo:hi] = state.update(*(None if c is None else c[lo:hi] for c in conditions))
+    return positions, held
+
+
+def transitions(positions, initial=0):
+    """
+    Orders implied by a position series for the +1 = buy / -1 = sell signal convention of
+    Portfolio.update_positions: +1 on bars where the position goes up (flat -> long,
+    short -> flat/long), -1 where it goes down, 0 otherwise.
+    """
+    positions = np.asarray(positions, dtype=np.int8)
+    previous = np.concatenate([np.full((1,) + positions.shape[1:], initial, dtype=np.int8), positions[:-1]])
+    return np.sign(positions - previous).astype(np.int8)
+
+
+def resolve_positions_reference(long_entry, long_exit=None, short_entry=None, short_exit=None):
+    # The state machine one bar at a time (1-D conditions), the definition resolve_positions matches
+    n = len(long_entry)
+    never = [False] * n
+    long_exit = never if long_exit is None else long_exit
+    short_entry = never if short_entry is None else short_entry
+    short_exit = never if short_exit is None else short_exit
+
+    positions, held = [], []
+    position, bars = 0, 0
+    for t in range(n):
+        # exits first, on the position held coming into the bar
+        if (position == 1 and long_exit[t]) or (position == -1 and short_exit[t]):
+            position, bars = 0, 0
+        # then entries; both at once cancel out
+        if long_entry[t] and not short_entry[t] and position != 1:
+            position, bars = 1, 0
+        elif short_entry[t] and not long_entry[t] and position != -1:
+            position, bars = -1, 0
+        bars = bars + 1 if position != 0 else 0
+        positions.append(position)
+        held.append(bars)
+    return np.array(positions, dtype=np.int8), np.array(held, dtype=np.int64)
@@ -0,0 +1,104 @@
+"""
+Running state for the strategies' bar-by-bar (on_bar) mode.
+
+RollingWindow keeps a fixed-size ring buffer with a running sum and sum of
+squares, so the rolling mean/std of the latest window costs O(1) per bar
+instead of re-running `rolling()` over the whole history. It follows pandas'
+rolling rules: NaN until the window is full and while it holds a NaN.
+"""
+
+import math
+
+
+class RollingWindow:
+    def __init__(self, size):
+        """
+        Args:
+            size (int): window length.
+        """
+        if size < 1:
+            raise ValueError("window size must be at least 1")
+        self.size = size
+        self._buf = [math.nan] * size
+        self._pos = 0          # next slot to overwrite
+        self._count = 0        # values pushed so far, capped at size
+        self._nans = 0         # NaNs currently in the window
+        self._shift = None     # first finite value; sums are kept on (x - shift) to avoid cancellation
+        self._sum = 0.0
+        self._sumsq = 0.0
+
+    def push(self, x):
+        x = float(x)
+        if self._shift is None and not math.isnan(x):
+            self._shift = x
+
+        # drop the value leaving the window
+        if self._count == self.size:
+            old = self._buf[self._pos]
+            if math.isnan(old):
+                self._nans -= 1
+            else:
+                d = old - self._shift
+                self._sum -= d
+                self._sumsq -= d * d
+        else:
+            self._count += 1
+
+        # add the new value
+        self._buf[self._pos] = x
+        if math.isnan(x):
+            self._nans += 1
+        else:
+            d = x - self._shift
+            self._sum += d
+            self._sumsq += d * d
+
+        self._pos += 1
+        if self._pos == self.size:
+            self._pos = 0
+            self._resum()
+
+    def _resum(self):
+        # Once per full turn of the ring, re-anchor the shift on the newest value and recompute
+        # the sums exactly, so round-off can't build up and the sums stay small as prices
+        # drift (O(size) every size bars = O(1) per bar)
+        finite = [v for v in self._buf if not math.isnan(v)]
+        if not finite:
+            return
+        self._shift = self._buf[self.size - 1] if not math.isnan(self._buf[self.size - 1]) else finite[-1]
+        diffs = [v - self._shift for v in finite]
+        self._sum = math.fsum(diffs)
+        self._sumsq = math.fsum(d * d for d in diffs)
+
+    @property
+    def ready(self):
+        # True when the window is full and holds no NaN
+        return self._count == self.size and self._nans == 0
+
+    def mean(self):
+        if not self.ready:
+            return math.nan
+        return self._shift + self._sum / self.size
+
+    def std(self, ddof=1):
+        if not self.ready or self.size - ddof <= 0:
+            return math.nan
+        var = (self._sumsq - self._sum * self._sum / self.size) / (self.size - ddof)
+        return math.sqrt(max(var, 0.0))  # clamp tiny negative round-off
+
+
+class Lag:
+    """Ring buffer that returns the value pushed `periods` bars ago (NaN until there is one)."""
+
+    def __init__(self, periods):
+        if periods < 1:
+            raise ValueError("periods must be at least 1")
+        self._buf = [math.nan] * periods
+        self._pos = 0
+
+    def push(self, x):
+        # stores x and returns the value from `periods` bars ago
+        old = self._buf[self._pos]
+        self._buf[self._pos] = float(x)
+        self._pos = (self._pos + 1) % len(self._buf)
+        return old
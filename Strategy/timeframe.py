@@ -0,0 +1,74 @@
+"""
+Multi-timeframe signals: a strategy runs on higher-timeframe bars (e.g. hourly) while the
+backtest executes on the lower bars it was given (e.g. minutes).
+    - frame_signals resamples the frame once with Data.resample.Resampler (bucket starts
+      precomputed, one reduceat per column), runs the wrapped strategy on the higher bars and
+      maps its signals back onto the lower bars as an int8 array (what the engines use, via
+      Strategy.base.signal_array); generate_signals adds them to a copy of the frame
+    - a higher bar's signal applies from the first lower bar after that bar closed, so the
+      lower bars never see a higher bar that was still forming
+    - on_bar keeps the current higher bar in a BarAggregator and only calls the wrapped
+      strategy's on_bar when a higher bar completes: O(1) per lower bar, no re-aggregation
+      of the history, and the same signals as generate_signals
+"""
+
+import numpy as np
+
+from Data.resample import BarAggregator, Resampler
+from Strategy.base import signal_array
+from Strategy.cache import strategy_params
+
+
+class HigherTimeframe:
+    # PaperTrader passes each bar's date to on_bar
+    needs_dates = True
+
+    def __init__(self, strategy, rule):
+        """
+        Args:
+            strategy (object): strategy (see Strategy.base.signal_array, and on_bar/reset for
+                bar-by-bar use), run on the higher bars.
+            rule (str): pandas offset of the higher timeframe, e.g. '1h', 'D', 'W'.
+        """
+        self._strategy = strategy
+        self.rule = rule
+        # public attributes are the signal cache key: the wrapped strategy and its parameters
+        self.params = {'strategy': type(strategy).__qualname__, **strategy_params(strategy)}
+
+    def frame_signals(self, df, price_col):
+        """
+        Signals on the lower bars of `df`, without copying it.
+        Returns:
+            np.ndarray of int8: shape (time,) for one price column, (time, columns) for a list.
+        """
+        resampler = Resampler(df.index, self.rule)
+        higher = signal_array(self._strategy, resampler.ohlcv(df), price_col)
+        signals = resampler.align(np.asarray(higher, dtype=np.int8).reshape(len(resampler), -1), fill=0)
+        return signals[:, 0] if isinstance(price_col, str) else signals
+
+    def generate_signals(self, df, price_col):
+        # DataFrame API: a copy of `df` with a '<col>_Signal' column per price column
+        price_cols = [price_col] if isinstance(price_col, str) else list(price_col)
+        signals = self.frame_signals(df, price_col).reshape(len(df), -1)
+
+        data = df.copy()
+        for j, col in enumerate(price_cols):
+            data[f"{col}_Signal"] = signals[:, j]
+        return data
+
+    def reset(self):
+        # Clears the bar-by-bar state used by on_bar
+        self._strategy.reset()
+        self._bars = BarAggregator(self.rule)
+        self._signal = 0
+
+    def on_bar(self, price, date):
+        """
+        Feeds one lower bar; returns the signal of the last completed higher bar.
+        """
+        if getattr(self, '_bars', None) is None:
+            self.reset()
+        completed = self._bars.update(date, price)
+        if completed is not None:
+            self._signal = self._strategy.on_bar(completed[4])  # the higher bar's close
+        return self._signal
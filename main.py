@@ -1,77 +1,593 @@
 import os
+import sys
 import argparse
-import pandas as pd
-from Strategy.moving_average import MovingAverageCrossover
-from Strategy.momentum import MomentumStrategy
-from Strategy.mean_reversion import BollingerMeanReversionStrategy
-from Backtester.backtest import Backtest
-from Reports.reporting import (
-    plot_equity_curve,
-    plot_drawdown,
-    export_performance_summary,
-    save_trade_log,
-)
-
-parser = argparse.ArgumentParser(description="Run backtest and generate reports")
-parser.add_argument("--ticker", type=str, default="EURUSD=X", help="Ticker symbol matching '<TICKER>.Close' column")
-parser.add_argument("--strategy", type=str, default="moving_average", choices=["moving_average", "momentum", "mean_reversion"], help="Strategy to run")
-parser.add_argument("--short_window", type=int, default=50, help="Short window for moving average")
-parser.add_argument("--long_window", type=int, default=200, help="Long window for moving average")
-parser.add_argument("--lookback", type=int, default=20, help="Lookback for momentum strategy")
-parser.add_argument("--mr_window", type=int, default=20, help="Window for Bollinger mean reversion")
-parser.add_argument("--mr_std", type=float, default=2.0, help="Std dev for Bollinger mean reversion")
-parser.add_argument("--initial_capital", type=float, default=100000, help="Starting capital")
-parser.add_argument("--transaction_cost", type=float, default=0.001, help="Transaction cost (e.g., 0.001 = 0.1%)")
-parser.add_argument("--start", type=str, default=None, help="Start date (YYYY-MM-DD)")
-parser.add_argument("--end", type=str, default=None, help="End date (YYYY-MM-DD)")
-parser.add_argument("--data", type=str, default=None, help="Path to CSV; defaults to Data/market_data_features.csv")
-parser.add_argument("--outdir", type=str, default=None, help="Output directory; defaults to Reports/outputs")
-args = parser.parse_args()
-
-# Load your feature-engineered data (resolve relative to this file)
+
+# pandas, the engine and the plotting stack are imported inside the commands that use
+# them, so `--help` and metrics-only runs (--no_plots) don't pay for matplotlib/seaborn
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-data_path = args.data or os.path.join(BASE_DIR, "Data", "market_data_features.csv")
-data = pd.read_csv(data_path, index_col="Date.", parse_dates=True)
-
-# Optional date filtering
-if args.start:
-    data = data[data.index >= args.start]
-if args.end:
-    data = data[data.index <= args.end]
-
-# Initialize your strategy
-if args.strategy == "moving_average":
-    strategy = MovingAverageCrossover(short_window=args.short_window, long_window=args.long_window)
-elif args.strategy == "momentum":
-    strategy = MomentumStrategy(lookback=args.lookback)
-else:
-    strategy = BollingerMeanReversionStrategy(window=args.mr_window, num_std=args.mr_std)
-
-# Run backtest
-bt = Backtest(data, strategy, ticker=args.ticker, initial_capital=args.initial_capital, transaction_cost=args.transaction_cost)
-results = bt.run()
-bt.summary()
-
-# Reporting outputs
-reports_dir = args.outdir or os.path.join("Reports", "outputs")
-equity_path = os.path.join(reports_dir, "equity_curve.png")
-drawdown_path = os.path.join(reports_dir, "drawdown.png")
-summary_csv_path = os.path.join(reports_dir, "performance_summary.csv")
-trades_csv_path = os.path.join(reports_dir, "trade_log.csv")
-
-# Plots
-plot_equity_curve(results, save_path=equity_path)
-plot_drawdown(results, save_path=drawdown_path)
-
-# Summary export
-summary_df = export_performance_summary(results, save_csv_path=summary_csv_path)
-
-# Trades export
-trade_log_df = bt.portfolio.get_trade_log()
-save_trade_log(trade_log_df, trades_csv_path)
-
-# Save results timeseries
-os.makedirs(reports_dir, exist_ok=True)
-results.to_csv(os.path.join(reports_dir, "results_timeseries.csv"))
-
-print("Reports saved to:", reports_dir)
+COMMANDS = ("run", "sweep", "walkforward", "ensemble", "report", "serve", "submit")
+
+
+def build_parser():
+    # Options shared by every subcommand
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--ticker", type=str, default="EURUSD=X", help="Ticker symbol matching '<TICKER>.Close' column; for `run`, a comma-separated list trades several tickers on one cash balance")
+    common.add_argument("--strategy", type=str, default="moving_average", choices=["moving_average", "momentum", "mean_reversion"], help="Strategy to run")
+    common.add_argument("--initial_capital", type=float, default=100000, help="Starting capital")
+    common.add_argument("--transaction_cost", type=float, default=0.001, help="Transaction cost (e.g., 0.001 = 0.1%%)")
+    common.add_argument("--start", type=str, default=None, help="Start date (YYYY-MM-DD)")
+    common.add_argument("--end", type=str, default=None, help="End date (YYYY-MM-DD, the whole day; add a time for intraday data)")
+    common.add_argument("--resample", type=str, default=None, metavar="RULE",
+                        help="Aggregate the bars to a pandas offset first (e.g. 15min, 1h, D, W); keeps the OHLCV columns only")
+    common.add_argument("--data", type=str, default=None, help="Path to CSV; defaults to Data/market_data_features.csv")
+    common.add_argument("--no_store", action="store_true", help="Parse the CSV directly instead of using the columnar store in Data/.store")
+    common.add_argument("--outdir", type=str, default=None, help="Output directory; defaults to Reports/outputs")
+    common.add_argument("--no_plots", "--no-plots", action="store_true", help="Write the CSV outputs only (matplotlib is never imported)")
+
+    parser = argparse.ArgumentParser(description="Run backtest and generate reports")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run", parents=[common], help="Run one backtest and write reports (default)")
+    run_parser.add_argument("--short_window", type=int, default=50, help="Short window for moving average")
+    run_parser.add_argument("--long_window", type=int, default=200, help="Long window for moving average")
+    run_parser.add_argument("--lookback", type=int, default=20, help="Lookback for momentum strategy")
+    run_parser.add_argument("--mr_window", type=int, default=20, help="Window for Bollinger mean reversion")
+    run_parser.add_argument("--mr_std", type=float, default=2.0, help="Std dev for Bollinger mean reversion")
+    run_parser.add_argument("--mr_exit", type=str, default="band", choices=["band", "mean"],
+                            help="Close mean-reversion positions at the opposite band or back at the rolling mean")
+    run_parser.add_argument("--engine", type=str, default="loop", choices=["loop", "vectorized"], help="Execution engine: bar-by-bar loop or NumPy vectorized")
+    run_parser.add_argument("--signal_timeframe", type=str, default=None, metavar="RULE",
+                            help="Compute the signals on higher-timeframe bars (e.g. 1h) and execute them on the loaded bars")
+    run_parser.add_argument("--orders", type=str, default=None, choices=["market", "limit", "stop"],
+                            help="Trade through the order simulator: signals become orders filled on later bars (default: fill at the signal bar's close)")
+    run_parser.add_argument("--order_offset", type=float, default=0.0, help="Limit/stop distance from the signal close (0.001 = 0.1%%)")
+    run_parser.add_argument("--order_expiry", type=int, default=None, help="Bars a limit/stop order rests before it expires (default: until cancelled)")
+    run_parser.add_argument("--slippage_bps", type=float, default=0.0, help="Fixed slippage of market/stop fills in basis points")
+    run_parser.add_argument("--slippage_range", type=float, default=None,
+                            help="Volume-based slippage instead: this share of the bar's high-low range, scaled by the square root of the volume taken")
+    run_parser.add_argument("--max_participation", type=float, default=None, help="Largest share of a bar's volume filled (the rest fills on later bars)")
+    run_parser.add_argument("--sizing", type=str, default=None, choices=["fixed", "vol_target", "kelly"],
+                            help="Trade target weights instead (-1 signals go short): fixed fraction, volatility target or fractional Kelly")
+    run_parser.add_argument("--fraction", type=float, default=None, help="Equity per position for --sizing fixed (default 1.0), Kelly share for --sizing kelly (default 0.5)")
+    run_parser.add_argument("--vol_target", type=float, default=0.10, help="Annualized volatility per position for --sizing vol_target")
+    run_parser.add_argument("--sizing_lookback", type=int, default=None, help="Bars in the volatility / Kelly estimates (defaults 20 / 60)")
+    run_parser.add_argument("--max_leverage", type=float, default=1.0, help="Cap on gross exposure (long + short) as a multiple of equity")
+    run_parser.add_argument("--long_only", action="store_true", help="With --sizing, -1 signals go flat instead of short")
+    run_parser.add_argument("--hold_signals", action="store_true", help="With --sizing, keep the last non-zero signal through 0 signals")
+    run_parser.add_argument("--borrow_rate", type=float, default=0.0, help="Annual borrow fee on short positions (sizing mode)")
+    run_parser.add_argument("--margin_rate", type=float, default=0.0, help="Annual interest on borrowed cash (sizing mode)")
+    run_parser.add_argument("--min_trade_weight", type=float, default=0.01,
+                            help="With --sizing, skip rebalancing trades smaller than this share of equity (0 = rebalance every bar)")
+    run_parser.add_argument("--chunk_rows", type=int, default=None, metavar="N",
+                            help="Out-of-core mode: stream the data from the columnar store N bars at a time and write the results incrementally (one ticker, no orders/sizing, no plots)")
+    run_parser.add_argument("--signal_cache", type=str, default=None, metavar="DIR", help="Reuse signals across runs from this on-disk cache (e.g. when only costs or capital change)")
+    run_parser.add_argument("--bootstrap", type=int, default=0, metavar="N", help="Resample the run into N Monte Carlo paths and write confidence intervals of the metrics")
+    run_parser.add_argument("--bootstrap_method", type=str, default="block", choices=["block", "resample", "reshuffle"],
+                            help="block: block bootstrap of the bar returns; resample/reshuffle: draw or reorder the round-trip trade returns")
+    run_parser.add_argument("--block_size", type=int, default=20, help="Block length (bars) for --bootstrap_method block")
+    run_parser.add_argument("--seed", type=int, default=None, help="Seed of the Monte Carlo paths")
+    run_parser.add_argument("--profile", action="store_true", help="Time each phase of the run and write profile.json / profile_phases.csv next to the reports")
+    run_parser.add_argument("--profile_memory", action="store_true", help="Also record allocations and peak memory per phase (implies --profile; slower)")
+    run_parser.add_argument("--cprofile", action="store_true", help="Also capture a cProfile of the run (implies --profile)")
+
+    sweep_parser = subparsers.add_parser("sweep", parents=[common], help="Run a parameter grid over a process pool")
+    sweep_parser.add_argument("--grid", type=str, action="append", required=True, metavar="NAME=V1,V2,...",
+                              help="Parameter values to sweep, e.g. --grid short_window=10,20,50 --grid long_window=100,200")
+    sweep_parser.add_argument("--processes", type=int, default=None, help="Worker processes; defaults to the CPU count")
+    sweep_parser.add_argument("--rank_by", type=str, default="Sharpe Ratio", help="Metric used to rank the runs")
+    sweep_parser.add_argument("--top", type=int, default=10, help="Number of top runs to print")
+    sweep_parser.add_argument("--engine", type=str, default="vectorized", choices=["loop", "vectorized"], help="Execution engine used for each run")
+
+    wf_parser = subparsers.add_parser("walkforward", parents=[common], help="Optimize on rolling train windows, trade the winners out of sample")
+    wf_parser.add_argument("--grid", type=str, action="append", required=True, metavar="NAME=V1,V2,...",
+                           help="Candidate parameter values, e.g. --grid short_window=10,20,50 --grid long_window=100,200")
+    wf_parser.add_argument("--train", type=str, required=True, help="Train window: number of bars (e.g. 500) or a pandas offset (e.g. 730D)")
+    wf_parser.add_argument("--test", type=str, required=True, help="Test window: number of bars or a pandas offset")
+    wf_parser.add_argument("--step", type=str, default=None, help="How far each fold moves forward; defaults to --test")
+    wf_parser.add_argument("--anchored", action="store_true", help="Expanding train windows that all start at the first bar")
+    wf_parser.add_argument("--processes", type=int, default=None, help="Worker processes for the folds; defaults to the CPU count")
+    wf_parser.add_argument("--rank_by", type=str, default="Sharpe Ratio", help="Metric that picks the winner on each train window")
+
+    ensemble_parser = subparsers.add_parser("ensemble", parents=[common], help="Run several strategies as sleeves of one portfolio and allocate the capital between them")
+    ensemble_parser.add_argument("--sleeve", type=str, action="append", default=[], metavar="STRATEGY[:NAME=VALUE,...]",
+                                 help="Sleeve strategy and parameters, e.g. --sleeve moving_average:short_window=20,long_window=100 (repeatable; "
+                                      "default: moving_average, momentum and mean_reversion with their default parameters). "
+                                      "With a comma-separated --ticker, every sleeve runs on every ticker")
+    ensemble_parser.add_argument("--allocator", type=str, default="risk_parity", choices=["equal", "inverse_vol", "risk_parity"],
+                                 help="How the capital is split between the sleeves")
+    ensemble_parser.add_argument("--lookback", type=int, default=60, help="Bars of sleeve returns in the covariance estimate (inverse_vol/risk_parity)")
+    ensemble_parser.add_argument("--rebalance", type=str, default="ME",
+                                 help="Rebalance every N bars (e.g. 20) or at the end of every pandas period (e.g. W, ME, QE); 'none' keeps the starting weights")
+    ensemble_parser.add_argument("--rebalance_cost", type=float, default=0.0, help="Cost of moving capital between sleeves, per unit of turnover")
+
+    report_parser = subparsers.add_parser("report", help="Rebuild the plots and the summary of a saved run")
+    report_parser.add_argument("--results", type=str, nargs="+", default=[os.path.join("Reports", "outputs", "results_timeseries.csv")],
+                               help="results_timeseries.csv written by `run` (Date index, TotalValue column); several files render in parallel")
+    report_parser.add_argument("--outdir", type=str, default=None,
+                               help="Output directory; defaults to the folder of --results (with several files, one subfolder per run)")
+    report_parser.add_argument("--title", type=str, default="Portfolio Equity Curve", help="Title of the equity curve")
+    report_parser.add_argument("--no_plots", "--no-plots", action="store_true", help="Write performance_summary.csv only")
+    report_parser.add_argument("--processes", type=int, default=None, help="Worker processes for several --results; defaults to the CPU count")
+    report_parser.add_argument("--compare", action="store_true",
+                               help="Also write comparison.png and comparison_summary.csv with all the runs side by side")
+    report_parser.add_argument("--max_points", type=int, default=None, help="Points per plotted line after downsampling (default 2000)")
+
+    serve_parser = subparsers.add_parser("serve", parents=[common], help="Keep the data loaded and run queued backtest jobs from local clients")
+    serve_parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on")
+    serve_parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    serve_parser.add_argument("--processes", type=int, default=None, help="Worker processes (jobs run at once); defaults to the CPU count")
+    serve_parser.add_argument("--max_queue", type=int, default=64, help="Jobs waiting for a worker before submits have to wait")
+
+    submit_parser = subparsers.add_parser("submit", help="Send one backtest job to a running `serve` and print its events")
+    submit_parser.add_argument("--host", type=str, default="127.0.0.1", help="Address of the server")
+    submit_parser.add_argument("--port", type=int, default=8765, help="Port of the server")
+    submit_parser.add_argument("--strategy", type=str, default="moving_average", choices=["moving_average", "momentum", "mean_reversion"], help="Strategy to run")
+    submit_parser.add_argument("--param", type=str, action="append", default=[], metavar="NAME=VALUE",
+                               help="Strategy parameter, e.g. --param short_window=20 (repeatable)")
+    submit_parser.add_argument("--ticker", type=str, default="EURUSD=X", help="Ticker symbol matching '<TICKER>.Close' column")
+    submit_parser.add_argument("--start", type=str, default=None, help="Start date (YYYY-MM-DD)")
+    submit_parser.add_argument("--end", type=str, default=None, help="End date (YYYY-MM-DD, the whole day)")
+    submit_parser.add_argument("--engine", type=str, default="vectorized", choices=["loop", "vectorized"], help="Execution engine")
+    submit_parser.add_argument("--initial_capital", type=float, default=100000, help="Starting capital")
+    submit_parser.add_argument("--transaction_cost", type=float, default=0.001, help="Transaction cost (e.g., 0.001 = 0.1%%)")
+    submit_parser.add_argument("--status", action="store_true", help="Print the server's queue status instead of submitting a job")
+    return parser
+
+
+def parse_args(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # Plain `python main.py --strategy ...` keeps working as the `run` subcommand
+    if not argv or argv[0] not in COMMANDS + ("-h", "--help"):
+        argv = ["run"] + argv
+    return build_parser().parse_args(argv)
+
+
+def parse_grid(items):
+    # ["short_window=10,20", "long_window=100"] -> {'short_window': [10, 20], 'long_window': [100]}
+    grid = {}
+    for item in items:
+        name, _, values = item.partition("=")
+        if not name or not values:
+            raise ValueError(f"Grid entries must look like NAME=V1,V2,... got '{item}'")
+        parsed = []
+        for v in values.split(","):
+            try:
+                parsed.append(int(v))
+            except ValueError:
+                try:
+                    parsed.append(float(v))
+                except ValueError:
+                    parsed.append(v)  # e.g. exit=band,mean
+        grid[name] = parsed
+    return grid
+
+
+def parse_window(value):
+    # "500" -> 500 bars, anything else is kept as a pandas offset string ("730D")
+    if value is None:
+        return None
+    return int(value) if value.isdigit() else value
+
+
+def load_data(args, ticker=None):
+    # Load your feature-engineered data (resolve relative to this file)
+    data_path = args.data or os.path.join(BASE_DIR, "Data", "market_data_features.csv")
+    if not args.no_store:
+        # The CSV is converted once into per-column binary files; later runs only read the
+        # ticker's columns and the date slice
+        from Data.store import load_features
+        data = load_features(data_path, ticker=ticker, start=args.start, end=args.end)
+    else:
+        import pandas as pd
+        from Data.store import end_timestamp
+        data = pd.read_csv(data_path, index_col="Date.", parse_dates=True)
+
+        # Optional date filtering
+        if args.start:
+            data = data[data.index >= pd.Timestamp(args.start)]
+        if args.end:
+            data = data[data.index <= end_timestamp(args.end)]
+
+    if args.resample:
+        from Data.resample import Resampler
+        data = Resampler(data.index, args.resample).ohlcv(data)
+    return data
+
+
+def run(args):
+    # A comma-separated --ticker runs every ticker on one shared cash balance
+    tickers = [t.strip() for t in args.ticker.split(",") if t.strip()]
+    ticker = tickers if len(tickers) > 1 else args.ticker
+    if args.chunk_rows:
+        return run_chunked(args, tickers)
+
+    profiler = None
+    if args.profile or args.profile_memory or args.cprofile:
+        from Backtester.profiling import Profiler
+        profiler = Profiler(trace_memory=args.profile_memory, cprofile=args.cprofile).start()
+        with profiler.phase("load_data"):
+            data = load_data(args, ticker=ticker)
+    else:
+        data = load_data(args, ticker=ticker)
+
+    strategy = make_strategy(args)
+    if args.signal_timeframe:
+        from Strategy.timeframe import HigherTimeframe
+        strategy = HigherTimeframe(strategy, args.signal_timeframe)
+
+    signal_cache = None
+    if args.signal_cache:
+        from Strategy.cache import SignalCache
+        signal_cache = SignalCache(cache_dir=args.signal_cache)
+
+    broker = None
+    if args.orders:
+        from Backtester.execution import Broker, FixedSlippage, VolumeSlippage
+        slippage = VolumeSlippage(range_fraction=args.slippage_range) if args.slippage_range else FixedSlippage(args.slippage_bps)
+        broker = Broker(slippage=slippage, max_participation=args.max_participation, order_type=args.orders,
+                        offset=args.order_offset, expire_after=args.order_expiry)
+
+    sizer = None
+    if args.sizing:
+        from Backtester.sizing import SIZERS
+        options = {"allow_short": not args.long_only, "hold": args.hold_signals, "max_leverage": args.max_leverage}
+        if args.sizing == "vol_target":
+            from Backtester.metrics import infer_periods_per_year
+            options["target"] = args.vol_target
+            options["periods_per_year"] = infer_periods_per_year(data.index)
+        if args.fraction is not None:
+            options["fraction"] = args.fraction
+        if args.sizing_lookback is not None and args.sizing != "fixed":
+            options["lookback"] = args.sizing_lookback
+        sizer = SIZERS[args.sizing](**options)
+
+    # Run backtest
+    from Backtester.backtest import Backtest
+    from Reports.reporting import export_performance_summary, save_trade_log
+    bt = Backtest(data, strategy, ticker=ticker, initial_capital=args.initial_capital, transaction_cost=args.transaction_cost, engine=args.engine, signal_cache=signal_cache, profiler=profiler, execution=broker,
+                  sizing=sizer, borrow_rate=args.borrow_rate, margin_rate=args.margin_rate,
+                  min_trade_weight=args.min_trade_weight)
+    results = bt.run()
+    bt.summary()
+
+    # Reporting outputs
+    reports_dir = args.outdir or os.path.join("Reports", "outputs")
+    summary_csv_path = os.path.join(reports_dir, "performance_summary.csv")
+    trades_csv_path = os.path.join(reports_dir, "trade_log.csv")
+
+    # Plots
+    if not args.no_plots:
+        save_plots(results, reports_dir, profiler=profiler)
+
+    # Summary export
+    summary_df = export_performance_summary(results, save_csv_path=summary_csv_path, profiler=profiler)
+
+    # Trades export
+    trade_log_df = bt.portfolio.get_trade_log()
+    save_trade_log(trade_log_df, trades_csv_path, profiler=profiler)
+
+    # Save results timeseries
+    os.makedirs(reports_dir, exist_ok=True)
+    results.to_csv(os.path.join(reports_dir, "results_timeseries.csv"))
+    if broker is not None:
+        broker.get_order_log().to_csv(os.path.join(reports_dir, "order_log.csv"), index=False)
+    if sizer is not None:
+        bt.portfolio.get_exposure().to_csv(os.path.join(reports_dir, "exposure.csv"))
+
+    print("Reports saved to:", reports_dir)
+
+    if args.bootstrap:
+        bootstrap(args, results, trade_log_df, reports_dir)
+
+    if profiler is not None:
+        profiler.stop()
+        for path in profiler.save(reports_dir):
+            print("Profile saved to:", path)
+
+
+def run_chunked(args, tickers):
+    # Out-of-core run: blocks of --chunk_rows bars go from the store through the strategy and
+    # the vectorized engine straight into the output CSVs
+    if len(tickers) > 1:
+        raise SystemExit("--chunk_rows runs a single ticker")
+    if args.no_store or args.resample or args.signal_timeframe or args.orders or args.sizing or args.signal_cache or args.bootstrap:
+        raise SystemExit("--chunk_rows can't be combined with --no_store, --resample, --signal_timeframe, "
+                         "--orders, --sizing, --signal_cache or --bootstrap")
+    if args.chunk_rows < 0:
+        raise SystemExit("--chunk_rows must be positive")
+    strategy = make_strategy(args)
+    if getattr(strategy, 'warmup', None) is None:
+        raise SystemExit(f"--chunk_rows needs signals that depend on a fixed number of past bars; "
+                         f"{type(strategy).__name__} with these settings depends on the whole history")
+
+    from Backtester.chunked import ChunkedBacktest
+    from Data.store import open_store
+    from Reports.reporting import export_metrics
+
+    data_path = args.data or os.path.join(BASE_DIR, "Data", "market_data_features.csv")
+    store = open_store(data_path)
+
+    profiler = None
+    if args.profile or args.profile_memory or args.cprofile:
+        from Backtester.profiling import Profiler
+        profiler = Profiler(trace_memory=args.profile_memory, cprofile=args.cprofile).start()
+
+    reports_dir = args.outdir or os.path.join("Reports", "outputs")
+    bt = ChunkedBacktest(store, strategy, ticker=tickers[0],
+                         initial_capital=args.initial_capital, transaction_cost=args.transaction_cost,
+                         chunk_rows=args.chunk_rows, start=args.start, end=args.end, profiler=profiler)
+    result = bt.run(os.path.join(reports_dir, "results_timeseries.csv"), os.path.join(reports_dir, "trade_log.csv"))
+
+    summary_df = export_metrics(result.metrics.compute_all_metrics(),
+                                save_csv_path=os.path.join(reports_dir, "performance_summary.csv"))
+    print(f"Bars: {result.bars}, trades: {result.trades}, final cash: {result.cash:.2f}, units held: {result.units}")
+    print(summary_df.to_string(index=False))
+    print("Reports saved to:", reports_dir)
+    if not args.no_plots:
+        print("Plots are not drawn in chunked mode; run `python main.py report` on results_timeseries.csv")
+
+    if profiler is not None:
+        profiler.stop()
+        for path in profiler.save(reports_dir):
+            print("Profile saved to:", path)
+
+
+def make_strategy(args):
+    # Initialize your strategy (only its module is imported)
+    if args.strategy == "moving_average":
+        from Strategy.moving_average import MovingAverageCrossover
+        return MovingAverageCrossover(short_window=args.short_window, long_window=args.long_window)
+    if args.strategy == "momentum":
+        from Strategy.momentum import MomentumStrategy
+        return MomentumStrategy(lookback=args.lookback)
+    from Strategy.mean_reversion import BollingerMeanReversionStrategy
+    return BollingerMeanReversionStrategy(window=args.mr_window, num_std=args.mr_std, exit=args.mr_exit)
+
+
+def save_plots(results, reports_dir, title="Portfolio Equity Curve", profiler=None, max_points=None):
+    # equity_curve.png and drawdown.png; the plotting stack is only imported here
+    from Backtester.profiling import NULL_PROFILER
+    from Reports.reporting import ReportRenderer, MAX_POINTS
+
+    profiler = profiler or NULL_PROFILER
+    renderer = ReportRenderer(max_points=max_points or MAX_POINTS)
+    with profiler.phase("report.equity_curve", items=len(results)):
+        renderer.equity_curve(results, os.path.join(reports_dir, "equity_curve.png"), title=title)
+    with profiler.phase("report.drawdown", items=len(results)):
+        renderer.drawdown(results, os.path.join(reports_dir, "drawdown.png"))
+
+
+def bootstrap(args, results, trade_log_df, reports_dir):
+    from Backtester.metrics import YEAR, infer_periods_per_year
+    from Backtester.montecarlo import monte_carlo, equity_returns, trade_returns
+
+    if args.bootstrap_method == "block":
+        returns, per_year = equity_returns(results), infer_periods_per_year(results.index)
+    else:
+        # trade returns are annualized with the number of round trips per year
+        returns = trade_returns(trade_log_df)
+        years = (results.index[-1] - results.index[0]) / YEAR
+        per_year = len(returns) / years if years > 0 else 1
+    mc = monte_carlo(returns, n_paths=args.bootstrap, method=args.bootstrap_method, block_size=args.block_size,
+                     seed=args.seed, periods_per_year=per_year)
+
+    summary = mc.summary()
+    print(summary.to_string())
+    summary_path = os.path.join(reports_dir, "bootstrap_summary.csv")
+    summary.to_csv(summary_path)
+    print("Bootstrap summary saved to:", summary_path)
+
+
+def sweep(args):
+    from Backtester.sweep import run_sweep
+
+    data = load_data(args, ticker=args.ticker)
+    ranked = run_sweep(
+        data,
+        args.strategy,
+        parse_grid(args.grid),
+        ticker=args.ticker,
+        initial_capital=args.initial_capital,
+        transaction_cost=args.transaction_cost,
+        engine=args.engine,
+        processes=args.processes,
+        rank_by=args.rank_by,
+    )
+    print(ranked.head(args.top).to_string(index=False))
+
+    reports_dir = args.outdir or os.path.join("Reports", "outputs")
+    os.makedirs(reports_dir, exist_ok=True)
+    sweep_csv_path = os.path.join(reports_dir, "sweep_results.csv")
+    ranked.to_csv(sweep_csv_path, index=False)
+    print("Sweep results saved to:", sweep_csv_path)
+
+
+def walkforward(args):
+    from Backtester.walkforward import walk_forward
+
+    data = load_data(args, ticker=args.ticker)
+    result = walk_forward(
+        data,
+        args.strategy,
+        parse_grid(args.grid),
+        train=parse_window(args.train),
+        test=parse_window(args.test),
+        step=parse_window(args.step),
+        anchored=args.anchored,
+        ticker=args.ticker,
+        initial_capital=args.initial_capital,
+        transaction_cost=args.transaction_cost,
+        rank_by=args.rank_by,
+        processes=args.processes,
+    )
+    print(result.folds.to_string(index=False))
+
+    reports_dir = args.outdir or os.path.join("Reports", "outputs")
+    os.makedirs(reports_dir, exist_ok=True)
+    result.equity.to_csv(os.path.join(reports_dir, "walkforward_equity.csv"))
+    result.folds.to_csv(os.path.join(reports_dir, "walkforward_folds.csv"), index=False)
+    if not args.no_plots:
+        from Reports.reporting import ReportRenderer
+        ReportRenderer().equity_curve(result.equity, os.path.join(reports_dir, "walkforward_equity.png"),
+                                      title="Walk-Forward Out-of-Sample Equity")
+    from Reports.reporting import export_performance_summary
+    export_performance_summary(result.equity, save_csv_path=os.path.join(reports_dir, "walkforward_summary.csv"))
+    print("Walk-forward reports saved to:", reports_dir)
+
+
+def parse_sleeve(spec):
+    # "moving_average:short_window=20,long_window=100" -> ('moving_average', {'short_window': 20, 'long_window': 100})
+    name, _, params = spec.partition(":")
+    items = [item for item in params.split(",") if item]
+    return name, {key: values[0] for key, values in parse_grid(items).items()}
+
+
+def ensemble(args):
+    from Backtester.allocation import ALLOCATORS
+    from Backtester.ensemble import Ensemble, Sleeve
+    from Backtester.sweep import STRATEGIES
+
+    tickers = [t.strip() for t in args.ticker.split(",") if t.strip()]
+    specs = [parse_sleeve(spec) for spec in args.sleeve] or [(name, {}) for name in STRATEGIES]
+    for name, _ in specs:
+        if name not in STRATEGIES:
+            raise SystemExit(f"--sleeve strategy must be one of {list(STRATEGIES)}, got '{name}'")
+    sleeves = [Sleeve(STRATEGIES[name](**params), ticker=ticker) for ticker in tickers for name, params in specs]
+
+    allocator = ALLOCATORS[args.allocator]()
+    if allocator.lookback is not None:
+        allocator.lookback = args.lookback
+    rebalance = None if args.rebalance.lower() == "none" else parse_window(args.rebalance)
+
+    # one load for every sleeve; sleeves of the same strategy share one indicator pass
+    data = load_data(args, ticker=tickers if len(tickers) > 1 else tickers[0])
+    result = Ensemble(sleeves, allocator=allocator, rebalance=rebalance, initial_capital=args.initial_capital,
+                      transaction_cost=args.transaction_cost, rebalance_cost=args.rebalance_cost).run(data)
+
+    summary = result.summary()
+    print(summary.to_string())
+    print("Last target weights:")
+    print(result.weights.iloc[-1].to_string())
+
+    reports_dir = args.outdir or os.path.join("Reports", "outputs")
+    os.makedirs(reports_dir, exist_ok=True)
+    result.equity.to_csv(os.path.join(reports_dir, "ensemble_equity.csv"))
+    result.sleeves.to_csv(os.path.join(reports_dir, "ensemble_sleeves.csv"))
+    result.weights.assign(Turnover=result.turnover).to_csv(os.path.join(reports_dir, "ensemble_weights.csv"))
+    summary.to_csv(os.path.join(reports_dir, "ensemble_summary.csv"))
+    if not args.no_plots:
+        from Reports.reporting import ReportRenderer
+        runs = {"Ensemble": result.equity, **{name: result.sleeves[[name]].set_axis(["TotalValue"], axis=1)
+                                              for name in result.sleeves}}
+        ReportRenderer().comparison(runs, os.path.join(reports_dir, "ensemble_comparison.png"),
+                                    title=f"Ensemble ({args.allocator}) vs Sleeves")
+    print("Ensemble reports saved to:", reports_dir)
+
+
+def serve(args):
+    import asyncio
+    from Backtester.server import serve as serve_jobs
+
+    # every column is loaded (and shared with the workers) once; jobs pick their ticker
+    data = load_data(args)
+
+    def ready(server):
+        print(f"Serving {len(data)} bars x {len(data.columns)} columns on {server.host}:{server.port} "
+              f"with {server.processes} workers (Ctrl-C to stop)")
+
+    try:
+        asyncio.run(serve_jobs(data, processes=args.processes, max_queue=args.max_queue, host=args.host,
+                               port=args.port, ready=ready))
+    except KeyboardInterrupt:
+        print("Server stopped")
+
+
+def submit(args):
+    import asyncio
+    import json
+    from Backtester.server import JobClient, submit as submit_job
+
+    if args.status:
+        async def status():
+            async with JobClient(args.host, args.port) as client:
+                return await client.status()
+        print(json.dumps(asyncio.run(status()), indent=2))
+        return
+
+    params = {name: values[0] for name, values in parse_grid(args.param).items()}
+    job = {"strategy": args.strategy, "params": params, "ticker": args.ticker, "start": args.start, "end": args.end,
+           "engine": args.engine, "initial_capital": args.initial_capital, "transaction_cost": args.transaction_cost}
+    try:
+        submit_job(job, host=args.host, port=args.port, on_event=lambda event: print(json.dumps(event)))
+    except RuntimeError as exc:
+        raise SystemExit(str(exc))
+
+
+def report(args):
+    # Plots and summary of saved runs, without running them again
+    if len(args.results) == 1 and not args.compare:
+        import pandas as pd
+        from Reports.reporting import export_performance_summary
+
+        path = args.results[0]
+        results = pd.read_csv(path, index_col=0, parse_dates=True)
+        reports_dir = args.outdir or os.path.dirname(os.path.abspath(path))
+        summary = export_performance_summary(results, save_csv_path=os.path.join(reports_dir, "performance_summary.csv"))
+        print(summary.to_string(index=False))
+        if not args.no_plots:
+            save_plots(results, reports_dir, title=args.title, max_points=args.max_points)
+        print("Reports saved to:", reports_dir)
+        return
+
+    from Reports.reporting import render_reports, MAX_POINTS
+
+    max_points = args.max_points or MAX_POINTS
+    runs = [(path, report_dir(args.outdir, path), f"{args.title} - {run_name(path)}") for path in args.results]
+    written = render_reports(runs, processes=args.processes, plots=not args.no_plots, max_points=max_points)
+    print(f"Reports of {len(written)} runs saved to:", args.outdir or "the folder of each --results")
+
+    if args.compare:
+        import pandas as pd
+        from Reports.reporting import ReportRenderer
+
+        compare_dir = args.outdir or os.path.dirname(os.path.abspath(args.results[0]))
+        frames = {run_name(path): pd.read_csv(path, index_col=0, parse_dates=True) for path in args.results}
+        table = ReportRenderer(max_points=max_points).comparison(frames, os.path.join(compare_dir, "comparison.png"))
+        table.to_csv(os.path.join(compare_dir, "comparison_summary.csv"))
+        print(table.to_string())
+        print("Comparison saved to:", compare_dir)
+
+
+def run_name(path):
+    # runs are named after the folder their results_timeseries.csv sits in
+    return os.path.basename(os.path.dirname(os.path.abspath(path))) or os.path.splitext(os.path.basename(path))[0]
+
+
+def report_dir(outdir, path):
+    # next to the CSV by default, else one subfolder of --outdir per run
+    if outdir is None:
+        return os.path.dirname(os.path.abspath(path))
+    return os.path.join(outdir, run_name(path))
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "sweep":
+        sweep(args)
+    elif args.command == "walkforward":
+        walkforward(args)
+    elif args.command == "ensemble":
+        ensemble(args)
+    elif args.command == "report":
+        report(args)
+    elif args.command == "serve":
+        serve(args)
+    elif args.command == "submit":
+        submit(args)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
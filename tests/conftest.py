@@ -0,0 +1,34 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Tests import the project packages (Backtester, Strategy, Data) from the repository root
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+PRICE_COL = 'SYN.Close'
+
+
+def quantized_prices(n_bars, seed=0, decimals=4, freq='h'):
+    # FX-like random walk rounded to a pip, so equal SMAs and prices on the mean are common
+    rng = np.random.default_rng(seed)
+    prices = np.round(1.10 * np.exp(np.cumsum(rng.normal(0, 0.0005, n_bars))), decimals)
+    index = pd.date_range('2020-01-01', periods=n_bars, freq=freq, name='Date.')
+    return pd.DataFrame({PRICE_COL: prices}, index=index)
+
+
+@pytest.fixture
+def quantized():
+    return quantized_prices(20_000)
+
+
+@pytest.fixture
+def flat():
+    # a walk that then stops moving: the indicators have to settle exactly on the last price
+    data = quantized_prices(1_000)
+    data.iloc[300:, 0] = data.iloc[299, 0]
+    return data
@@ -0,0 +1,65 @@
+"""
+A chunked (out-of-core) run must trade exactly like the full run over the same bars,
+however the range is cut into blocks.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import quantized_prices
+import Backtester.vectorized as vectorized
+from Backtester.chunked import ChunkedBacktest
+from Data.store import ColumnStore, write_store
+from Strategy.base import signal_array
+from Strategy.mean_reversion import BollingerMeanReversionStrategy
+from Strategy.momentum import MomentumStrategy
+from Strategy.moving_average import MovingAverageCrossover
+
+STRATEGIES = [MovingAverageCrossover(5, 20), MovingAverageCrossover(50, 200), MomentumStrategy(20),
+              BollingerMeanReversionStrategy(20, 2)]
+
+
+@pytest.fixture(scope='module')
+def stores(tmp_path_factory):
+    # one store per length: tiny blocks are only run over the short series (every block
+    # is written out separately)
+    stores = {}
+    for n_bars in (2_000, 20_000):
+        data = quantized_prices(n_bars)
+        store_dir = tmp_path_factory.mktemp(f'store{n_bars}')
+        write_store(data, str(store_dir))
+        stores[n_bars] = data, ColumnStore(str(store_dir))
+    return stores
+
+
+@pytest.mark.parametrize('strategy', STRATEGIES, ids=lambda s: f'{type(s).__name__}{s.warmup}')
+@pytest.mark.parametrize('n_bars, chunk_rows', [(2_000, 1), (2_000, 7), (20_000, 333), (20_000, 5000)])
+def test_chunked_matches_full_run(stores, tmp_path, strategy, n_bars, chunk_rows):
+    data, column_store = stores[n_bars]
+    price_col = 'SYN.Close'
+    full = vectorized.simulate(data[price_col].to_numpy(), signal_array(strategy, data, price_col))
+
+    bt = ChunkedBacktest(column_store, strategy, ticker='SYN', chunk_rows=chunk_rows)
+    result = bt.run(str(tmp_path / 'results.csv'), str(tmp_path / 'trades.csv'))
+    equity = pd.read_csv(tmp_path / 'results.csv', index_col=0, float_precision='round_trip')['TotalValue']
+
+    assert result.bars == len(data)
+    assert result.trades == len(full.trades)
+    np.testing.assert_array_equal(equity.to_numpy(), full.total_value)
+
+
+def test_strategy_without_warmup_is_rejected(stores):
+    _, column_store = stores[2_000]
+    with pytest.raises(ValueError, match='no finite warmup'):
+        ChunkedBacktest(column_store, BollingerMeanReversionStrategy(20, 2, exit='mean'), ticker='SYN')
+    with pytest.raises(ValueError, match='chunk_rows must be positive'):
+        ChunkedBacktest(column_store, MomentumStrategy(20), ticker='SYN', chunk_rows=-5)
+
+
+@pytest.mark.parametrize('argv', [['--strategy', 'mean_reversion', '--mr_exit', 'mean', '--chunk_rows', '100'],
+                                  ['--chunk_rows', '-5']], ids=['no_warmup', 'negative_chunk_rows'])
+def test_cli_refuses_bad_chunked_runs(argv, tmp_path):
+    # a clean CLI error (SystemExit with a message) before any data is read
+    import main
+    with pytest.raises(SystemExit, match='--chunk_rows'):
+        main.run(main.parse_args(['run', '--data', str(tmp_path / 'missing.csv'), *argv]))
@@ -0,0 +1,19 @@
+"""
+Saving a plot must not leave a pyplot figure behind (a sweep saves thousands).
+"""
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from conftest import PRICE_COL, quantized_prices
+from Reports.reporting import plot_drawdown, plot_equity_curve
+
+
+def test_saved_plots_are_closed(tmp_path):
+    results = quantized_prices(500).rename(columns={PRICE_COL: 'TotalValue'})
+    before = plt.get_fignums()
+    for _ in range(3):
+        plot_equity_curve(results, save_path=str(tmp_path / 'equity_curve.png'))
+        plot_drawdown(results, save_path=str(tmp_path / 'drawdown.png'))
+    assert plt.get_fignums() == before
+    assert (tmp_path / 'equity_curve.png').stat().st_size > 0
@@ -0,0 +1,72 @@
+"""
+The job server end to end: a real JobServer with worker processes on synthetic data,
+driven over its socket by JobClient.
+"""
+import asyncio
+
+import pytest
+
+from conftest import quantized_prices
+from Backtester.server import JobClient, JobServer
+
+JOB = {'strategy': 'momentum', 'params': {'lookback': 20}, 'ticker': 'SYN'}
+
+
+def run_with_server(scenario, n_bars=50_000):
+    # starts a server on a free port, runs scenario(server) against it, and shuts it down
+    async def main():
+        server = await JobServer(quantized_prices(n_bars), processes=2, port=0).start()
+        try:
+            return await scenario(server)
+        finally:
+            await server.close()
+
+    return asyncio.run(main())
+
+
+async def _run_pair(server, a, b):
+    async with JobClient(port=server.port) as client:
+        return await asyncio.gather(client.run(a), client.run(b))
+
+
+def test_identical_submits_run_once():
+    async def scenario(server):
+        async with JobClient(port=server.port) as first, JobClient(port=server.port) as second:
+            # all submitted before the first one can finish: one job, four subscribers
+            results = await asyncio.gather(*(client.run(JOB) for client in (first, second, first, second)))
+            status = await first.status()
+        return results, status
+
+    results, status = run_with_server(scenario)
+    assert len({r['job_id'] for r in results}) == 1
+    assert all(r['metrics'] == results[0]['metrics'] for r in results)
+    assert results[0]['bars'] == 50_000
+    assert status['completed'] == 1 and status['deduplicated'] == 3 and status['failed'] == 0
+
+    # a different job is not deduplicated against it
+    other = run_with_server(lambda server: _run_pair(server, JOB, {**JOB, 'params': {'lookback': 50}}))
+    assert other[0]['job_id'] != other[1]['job_id']
+
+
+@pytest.mark.parametrize('job, message', [
+    ({**JOB, 'strategy': 'no_such_strategy'}, 'strategy must be one of'),
+    ({**JOB, 'params': {'no_such_param': 1}}, 'no_such_param'),
+    ({**JOB, 'ticker': 'NOPE'}, "'NOPE.Close' not found"),
+    ({**JOB, 'engine': 'gpu'}, 'engine must be one of'),
+    ({**JOB, 'start': '2020-01-01 10:00', 'end': '2020-01-01 10:00'}, 'fewer than two bars'),
+], ids=['strategy', 'params', 'ticker', 'engine', 'too_few_bars'])
+def test_bad_jobs_get_error_events(job, message):
+    async def scenario(server):
+        async with JobClient(port=server.port) as client:
+            with pytest.raises(RuntimeError, match=message):
+                await client.run(job)
+            # the connection and the workers still serve the next job
+            result = await client.run(JOB)
+            status = await client.status()
+        return result, status
+
+    result, status = run_with_server(scenario, n_bars=2_000)
+    assert result['event'] == 'result' and result['bars'] == 2_000
+    assert status['completed'] == 1
+    # a bad spec is refused before it is queued; only the short range reaches a worker
+    assert status['failed'] == (1 if message == 'fewer than two bars' else 0)
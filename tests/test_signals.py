@@ -0,0 +1,43 @@
+"""
+The batched signal grids (prefix-sum indicators) must give the same signals as each
+strategy on its own (pandas rolling windows), including on exact ties.
+"""
+import numpy as np
+import pytest
+
+from conftest import PRICE_COL
+from Strategy.base import signal_array
+from Strategy.mean_reversion import BollingerMeanReversionStrategy
+from Strategy.momentum import MomentumStrategy
+from Strategy.moving_average import MovingAverageCrossover
+
+GRIDS = [
+    (MovingAverageCrossover, {'short_window': [5, 10, 50], 'long_window': [20, 100, 200]}),
+    (BollingerMeanReversionStrategy, {'window': [10, 20], 'num_std': [1.5, 2], 'exit': ['band', 'mean']}),
+    (MomentumStrategy, {'lookback': [5, 20, 60]}),
+]
+
+
+def assert_grid_matches_single(data, cls, grid):
+    params, signals = cls.generate_signal_grid(data, PRICE_COL, grid)
+    for row, p in zip(signals, params):
+        single = signal_array(cls(**p), data, PRICE_COL)
+        mismatched = np.flatnonzero(row != single)
+        assert mismatched.size == 0, f"{cls.__name__}({p}) differs on bars {mismatched[:10]}"
+
+
+@pytest.mark.parametrize('cls, grid', GRIDS, ids=lambda v: getattr(v, '__name__', ''))
+def test_grid_matches_single_on_quantized_prices(quantized, cls, grid):
+    assert_grid_matches_single(quantized, cls, grid)
+
+
+@pytest.mark.parametrize('cls, grid', GRIDS, ids=lambda v: getattr(v, '__name__', ''))
+def test_grid_matches_single_on_flat_prices(flat, cls, grid):
+    assert_grid_matches_single(flat, cls, grid)
+
+
+def test_flat_prices_give_no_signal(flat):
+    # once both windows only hold the flat stretch the SMAs are equal: no crossover
+    _, signals = MovingAverageCrossover.generate_signal_grid(flat, PRICE_COL, {'short_window': [5], 'long_window': [20]})
+    assert not signals[0, 320:].any()
+    assert not signal_array(MovingAverageCrossover(5, 20), flat, PRICE_COL)[320:].any()
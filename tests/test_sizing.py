@@ -0,0 +1,43 @@
+"""
+Position sizing: nothing is opened before a strategy's indicators exist, and the
+minimum trade size skips small rebalances without leaving positions open.
+"""
+import numpy as np
+import pandas as pd
+
+from conftest import quantized_prices
+from Backtester.backtest import Backtest
+from Backtester.portfolio import TargetPortfolio
+from Backtester.sizing import FixedFractional
+from Strategy.momentum import MomentumStrategy
+
+
+def test_momentum_warmup_opens_nothing():
+    data = quantized_prices(500)
+    bt = Backtest(data, MomentumStrategy(20), ticker='SYN', sizing=FixedFractional(allow_short=True))
+    bt.run()
+    trades = bt.portfolio.get_trade_log()
+    assert not trades.empty
+    assert trades['Date'].min() >= data.index[20]
+
+
+def test_min_trade_weight():
+    prices = np.array([1.0])
+    pf = TargetPortfolio(['SYN'], initial_capital=100_000, transaction_cost=0.0, min_trade_weight=0.01)
+    pf.rebalance(pd.Timestamp('2020-01-01'), np.array([0.5]), prices)
+    assert pf.units[0] == 50_000
+    # a 0.5% move of the target is skipped...
+    pf.rebalance(pd.Timestamp('2020-01-02'), np.array([0.505]), prices)
+    assert pf.units[0] == 50_000
+    # ...a 2% one is not
+    pf.rebalance(pd.Timestamp('2020-01-03'), np.array([0.52]), prices)
+    assert pf.units[0] == 52_000
+
+    # closing always trades, however small the position
+    small = TargetPortfolio(['SYN'], initial_capital=100_000, transaction_cost=0.0, min_trade_weight=0.01)
+    small.rebalance(pd.Timestamp('2020-01-01'), np.array([0.005]), prices)
+    assert small.units[0] == 0
+    small.units[0] = 100
+    small.cash -= 100
+    small.rebalance(pd.Timestamp('2020-01-02'), np.array([0.0]), prices)
+    assert small.units[0] == 0
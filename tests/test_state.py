@@ -0,0 +1,65 @@
+"""
+The vectorized state machine (resolve_positions) against its bar-by-bar definition
+(resolve_positions_reference), for any chunking.
+"""
+import itertools
+
+import numpy as np
+import pytest
+
+from Strategy.state import resolve_positions, resolve_positions_reference
+
+CHUNK_ROWS = [1, 2, 7, 64, 1 << 16]
+NAMES = ('long_exit', 'short_entry', 'short_exit')
+
+
+def random_conditions(rng, shape, density):
+    return {name: rng.random(shape) < density for name in ('long_entry',) + NAMES}
+
+
+def reference_columns(conditions):
+    # the reference is 1-D: run it on every column of 2-D conditions
+    shape = conditions['long_entry'].shape
+    if len(shape) == 1:
+        return resolve_positions_reference(**conditions)
+    columns = [resolve_positions_reference(**{k: None if v is None else v[:, j] for k, v in conditions.items()})
+               for j in range(shape[1])]
+    return np.stack([c[0] for c in columns], axis=1), np.stack([c[1] for c in columns], axis=1)
+
+
+@pytest.mark.parametrize('chunk_rows', CHUNK_ROWS)
+@pytest.mark.parametrize('shape', [(500,), (300, 6)], ids=['1d', '2d'])
+@pytest.mark.parametrize('density', [0.02, 0.2, 0.6])
+def test_matches_reference(chunk_rows, shape, density):
+    rng = np.random.default_rng(int(density * 100) + len(shape))
+    conditions = random_conditions(rng, shape, density)
+    positions, held = resolve_positions(**conditions, chunk_rows=chunk_rows)
+    expected_positions, expected_held = reference_columns(conditions)
+    np.testing.assert_array_equal(positions, expected_positions)
+    np.testing.assert_array_equal(held, expected_held)
+
+
+# every way of leaving out the optional conditions (None = never true)
+MISSING = [combo for r in range(1, len(NAMES) + 1) for combo in itertools.combinations(NAMES, r)]
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 13, 1 << 16])
+@pytest.mark.parametrize('missing', MISSING, ids=lambda m: '-'.join(m))
+@pytest.mark.parametrize('shape', [(400,), (200, 3)], ids=['1d', '2d'])
+def test_missing_conditions(chunk_rows, missing, shape):
+    rng = np.random.default_rng(len(missing))
+    conditions = random_conditions(rng, shape, 0.1)
+    for name in missing:
+        conditions[name] = None
+    positions, held = resolve_positions(**conditions, chunk_rows=chunk_rows)
+    expected_positions, expected_held = reference_columns(conditions)
+    np.testing.assert_array_equal(positions, expected_positions)
+    np.testing.assert_array_equal(held, expected_held)
+
+
+def test_empty_and_always():
+    assert resolve_positions(np.zeros(0, dtype=bool))[0].shape == (0,)
+    # an entry on every bar without exits is one trade held from the first bar
+    positions, held = resolve_positions(np.ones(50, dtype=bool), chunk_rows=8)
+    np.testing.assert_array_equal(positions, 1)
+    np.testing.assert_array_equal(held, np.arange(1, 51))
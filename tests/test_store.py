@@ -0,0 +1,79 @@
+"""
+Rewriting a columnar store must never leave readers without a whole store, and several
+processes building the same store at once must all succeed.
+"""
+import json
+import multiprocessing
+import os
+
+import numpy as np
+import pandas as pd
+
+from conftest import PRICE_COL, quantized_prices
+import Data.store as store
+from Data.store import CURRENT, MANIFEST, ColumnStore, append_rows, is_fresh, open_store, write_store
+
+
+def _build(csv_path, store_dir):
+    return len(open_store(csv_path, store_dir=store_dir).load())
+
+
+def test_concurrent_first_builds(tmp_path):
+    data = quantized_prices(5_000)
+    csv_path = str(tmp_path / 'prices.csv')
+    data.to_csv(csv_path)
+    store_dir = str(tmp_path / 'store')
+
+    with multiprocessing.get_context('spawn').Pool(4) as pool:
+        rows = pool.starmap(_build, [(csv_path, store_dir)] * 8)
+
+    assert rows == [len(data)] * 8
+    assert is_fresh(csv_path, store_dir)
+    pd.testing.assert_frame_equal(ColumnStore(store_dir).load(), data, check_freq=False)
+
+
+def test_open_reader_survives_rewrite(tmp_path):
+    # within VERSION_GRACE of the rewrite; past it the next write deletes the old version
+    # (test_replaced_versions_are_removed_after_grace)
+    store_dir = str(tmp_path / 'store')
+    old = quantized_prices(1_000, seed=1)
+    write_store(old, store_dir)
+    reader = ColumnStore(store_dir)
+
+    new = quantized_prices(2_000, seed=2)
+    write_store(new, store_dir)
+    # the reader keeps its version, a new reader gets the new one
+    np.testing.assert_array_equal(reader.load()[PRICE_COL].to_numpy(), old[PRICE_COL].to_numpy())
+    assert ColumnStore(store_dir).rows == len(new)
+
+
+def test_replaced_versions_are_removed_after_grace(tmp_path, monkeypatch):
+    store_dir = str(tmp_path / 'store')
+    for seed in range(3):
+        write_store(quantized_prices(100, seed=seed), store_dir)
+    assert len([e for e in os.listdir(store_dir) if e.startswith('v-')]) == 3
+
+    monkeypatch.setattr(store, 'VERSION_GRACE', -1)  # anything replaced counts as old
+    write_store(quantized_prices(100, seed=3), store_dir)
+    assert [e for e in os.listdir(store_dir) if e.startswith('v-')] == [open(os.path.join(store_dir, CURRENT)).read()]
+
+
+def test_unversioned_store_is_read_and_replaced(tmp_path):
+    # a store written before versions: manifest and columns directly in store_dir
+    store_dir = str(tmp_path / 'store')
+    data = quantized_prices(500)
+    write_store(data, store_dir)
+    version = os.path.join(store_dir, open(os.path.join(store_dir, CURRENT)).read())
+    for entry in os.listdir(version):
+        os.replace(os.path.join(version, entry), os.path.join(store_dir, entry))
+    os.rmdir(version)
+    os.remove(os.path.join(store_dir, CURRENT))
+
+    assert ColumnStore(store_dir).rows == 500
+    append_rows(store_dir, quantized_prices(520).iloc[500:])
+    assert ColumnStore(store_dir).rows == 520
+
+    write_store(data, store_dir)
+    assert not os.path.exists(os.path.join(store_dir, MANIFEST))
+    with open(os.path.join(store_dir, CURRENT)) as f:
+        assert json.load(open(os.path.join(store_dir, f.read(), MANIFEST)))['rows'] == 500
@@ -0,0 +1,39 @@
+"""
+Bar-by-bar mode: feeding the prices one at a time through on_bar must give the same
+signals as the batch path over the same history, ties included.
+"""
+import numpy as np
+import pytest
+
+from conftest import PRICE_COL
+from Strategy.base import signal_array
+from Strategy.mean_reversion import BollingerMeanReversionStrategy
+from Strategy.momentum import MomentumStrategy
+from Strategy.moving_average import MovingAverageCrossover
+
+STRATEGIES = [
+    lambda: MovingAverageCrossover(5, 20),
+    lambda: MovingAverageCrossover(50, 200),
+    lambda: MomentumStrategy(20),
+    lambda: BollingerMeanReversionStrategy(20, 2),
+    lambda: BollingerMeanReversionStrategy(20, 2, exit='mean'),
+]
+IDS = ['ma_5_20', 'ma_50_200', 'momentum_20', 'bollinger_band', 'bollinger_mean']
+
+
+def assert_on_bar_matches_batch(data, make_strategy):
+    batch = signal_array(make_strategy(), data, PRICE_COL)
+    strategy = make_strategy()
+    streamed = np.array([strategy.on_bar(price) for price in data[PRICE_COL].to_numpy()])
+    mismatched = np.flatnonzero(streamed != batch)
+    assert mismatched.size == 0, f"on_bar differs on bars {mismatched[:10]}"
+
+
+@pytest.mark.parametrize('make_strategy', STRATEGIES, ids=IDS)
+def test_on_bar_matches_batch_on_quantized_prices(quantized, make_strategy):
+    assert_on_bar_matches_batch(quantized, make_strategy)
+
+
+@pytest.mark.parametrize('make_strategy', STRATEGIES, ids=IDS)
+def test_on_bar_matches_batch_on_flat_prices(flat, make_strategy):
+    assert_on_bar_matches_batch(flat, make_strategy)
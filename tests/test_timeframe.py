@@ -0,0 +1,31 @@
+"""
+HigherTimeframe: the array path the engines use gives the signals of the DataFrame API
+and of on_bar, without going through a copy of the frame.
+"""
+import numpy as np
+import pytest
+
+from conftest import PRICE_COL, quantized_prices
+from Strategy.base import signal_array
+from Strategy.mean_reversion import BollingerMeanReversionStrategy
+from Strategy.moving_average import MovingAverageCrossover
+from Strategy.timeframe import HigherTimeframe
+
+
+@pytest.mark.parametrize('strategy', [MovingAverageCrossover(5, 20), BollingerMeanReversionStrategy(20, 2)],
+                         ids=['ma', 'bollinger'])
+def test_frame_signals_match_frame_and_on_bar(strategy, monkeypatch):
+    data = quantized_prices(5_000, freq='15min')
+    wrapped = HigherTimeframe(strategy, '1h')
+    frame = wrapped.generate_signals(data, PRICE_COL)[f'{PRICE_COL}_Signal'].to_numpy()
+
+    # the engines must not build the frame
+    monkeypatch.setattr(HigherTimeframe, 'generate_signals', None)
+    signals = signal_array(wrapped, data, PRICE_COL)
+    assert signals.dtype == np.int8 and signals.shape == (len(data),)
+    np.testing.assert_array_equal(signals, frame)
+    assert signal_array(wrapped, data, [PRICE_COL]).shape == (len(data), 1)
+
+    wrapped.reset()
+    streamed = [wrapped.on_bar(p, d) for d, p in zip(data.index, data[PRICE_COL])]
+    np.testing.assert_array_equal(streamed, signals)